@@ -19,8 +19,17 @@ Demo Flow:
 """
 
 import os
+import sys
 import google.generativeai as genai
 from datetime import datetime
+from pathlib import Path
+
+# Shared helpers live in the repo-level utilities/ folder
+sys.path.append(str(Path(__file__).resolve().parents[3] / "utilities"))
+from llm_backends import create_backend
+from model_registry import warm_up
+from rate_scheduler import estimate_tokens
+from resilient_call import caller_for
 
 
 MODEL_ID = 'gemini-2.5-flash-lite'
@@ -36,6 +45,8 @@ except Exception:
 _api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
 if _api_key:
     genai.configure(api_key=_api_key)
+    # Connect now (once per process - Streamlit reruns keep imported modules) so the first message is fast
+    warm_up(MODEL_ID)
     
 # Define WCC knowledge and personality
 wcc_system_prompt = '''You are a helpful and enthusiastic assistant for the Women Coding Community (WCC).
@@ -113,7 +124,7 @@ def create_streamlit_app():
         with st.chat_message("user"):
             st.markdown(prompt)
         
-        # Generate AI response
+        # Generate AI response (streamed)
         with st.chat_message("assistant"):
             with st.spinner("Thinking..."):
                 # Configure model with user settings
@@ -123,11 +134,9 @@ def create_streamlit_app():
                     top_p=top_p
                 )
                 
-                model_ui = genai.GenerativeModel(
-                    MODEL_ID,
-                    generation_config=generation_config,
-                    system_instruction=wcc_system_prompt
-                )
+                # Gemini unless LLM_BACKEND says otherwise; its models are shared per
+                # settings combination - not rebuilt for every message
+                backend = create_backend(generation_config=generation_config, gemini_model=MODEL_ID)
                 
                 # Create conversation context
                 context = "\\n".join([
@@ -136,12 +145,24 @@ def create_streamlit_app():
                 ])
                 
                 full_prompt = f"Conversation context:\\n{context}\\n\\nUser: {prompt}"
-                response = model_ui.generate_content(full_prompt)
-                
-                st.markdown(response.text)
+                # Streaming call - returns as soon as the first chunk arrives; waits its turn
+                # under the rate limits and retries until the stream starts (utilities/)
+                response = caller_for(backend.kind).call(
+                    lambda timeout: backend.stream(full_prompt, wcc_system_prompt, timeout),
+                    hedge=False,
+                    tokens=estimate_tokens(wcc_system_prompt + full_prompt, max_tokens)
+                )
+            
+            # Render tokens in place as they arrive
+            placeholder = st.empty()
+            reply = ""
+            for text in response:
+                reply += text
+                placeholder.markdown(reply + "▌")
+            placeholder.markdown(reply)
         
         # Add assistant response to chat history
-        st.session_state.messages.append({"role": "assistant", "content": response.text})
+        st.session_state.messages.append({"role": "assistant", "content": reply})
     
     # Display current settings
     st.sidebar.markdown("---")
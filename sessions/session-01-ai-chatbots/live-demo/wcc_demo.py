@@ -16,8 +16,16 @@ Each step builds on the previous one, showing clear code differences!
 """
 
 import os
+import sys
 import google.generativeai as genai
 from datetime import datetime
+from pathlib import Path
+
+# Shared helpers live in the repo-level utilities/ folder
+sys.path.append(str(Path(__file__).resolve().parents[3] / "utilities"))
+from conversation_memory import ConversationMemory
+from llm_backends import create_backend
+from model_registry import get_model, warm_up
 
 
 MODEL_ID = 'gemini-2.5-flash-lite'
@@ -32,6 +40,7 @@ except Exception:
 # Configure Gemini API (done once at startup)
 api_key = os.getenv('GEMINI_API_KEY') or 'your-gemini-api-key-here'
 genai.configure(api_key=api_key)
+warm_up(MODEL_ID)  # open the API connection in the background while the demo starts
 
 print("🚀 WCC AI Learning Series - Session 1 Demo")
 print("=" * 50)
@@ -154,18 +163,17 @@ def step_3_conversation_memory():
                 MODEL_ID,
                 system_instruction=WCC_SYSTEM_PROMPT
             )
-            self.conversation_history = []
+            # Recent turns word for word, older ones folded into a summary -
+            # so long chats don't resend (and pay for) everything every turn
+            self.memory = ConversationMemory(create_backend('gemini', gemini_model=MODEL_ID), max_tokens=2000)
         
         def chat(self, user_input):
             """Send message and get response with context"""
-            # Add user message to history
-            self.conversation_history.append({"role": "user", "parts": [user_input]})
-            
-            # Generate response with full history
-            response = self.model.generate_content(self.conversation_history)
+            # Generate response with the remembered conversation
+            response = self.model.generate_content(self.memory.prompt(user_input))
             
-            # Add assistant response to history
-            self.conversation_history.append({"role": "model", "parts": [response.text]})
+            # Remember the exchange (summarizing runs in the background)
+            self.memory.add_turn(user_input, response.text)
             
             return response.text
     
@@ -232,7 +240,8 @@ def step_4_model_parameters():
             max_output_tokens=100,
         )
         
-        model_temp = genai.GenerativeModel(
+        # Shared model per temperature (see utilities/model_registry.py)
+        model_temp = get_model(
             MODEL_ID,
             generation_config=generation_config
         )
@@ -298,7 +307,7 @@ def step_5_streamlit_interface():
         with st.chat_message("user"):
             st.markdown(prompt)
         
-        # Generate AI response
+        # Generate AI response (streamed)
         with st.chat_message("assistant"):
             with st.spinner("Thinking..."):
                 # Configure model with user settings
@@ -308,7 +317,8 @@ def step_5_streamlit_interface():
                     top_p=top_p
                 )
                 
-                model_ui = genai.GenerativeModel(
+                # Shared per settings combination - not rebuilt for every message
+                model_ui = get_model(
                     MODEL_ID,
                     generation_config=generation_config,
                     system_instruction=WCC_SYSTEM_PROMPT
@@ -321,12 +331,19 @@ def step_5_streamlit_interface():
                 ])
                 
                 full_prompt = f"Conversation context:\n{context}\n\nUser: {prompt}"
-                response = model_ui.generate_content(full_prompt)
-                
-                st.markdown(response.text)
+                # Streaming call - returns as soon as the first chunk arrives
+                response = model_ui.generate_content(full_prompt, stream=True)
+            
+            # Render tokens in place as they arrive
+            placeholder = st.empty()
+            reply = ""
+            for chunk in response:
+                reply += chunk.text
+                placeholder.markdown(reply + "▌")
+            placeholder.markdown(reply)
         
         # Add assistant response to chat history
-        st.session_state.messages.append({"role": "assistant", "content": response.text})
+        st.session_state.messages.append({"role": "assistant", "content": reply})
     
     # Display current settings
     st.sidebar.markdown("---")
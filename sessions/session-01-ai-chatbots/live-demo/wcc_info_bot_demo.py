@@ -4,13 +4,25 @@ A chatbot that answers questions about Women Coding Community
 Uses Gemini API with function calling for web search
 """
 
+import hashlib
 import json
 import os
+import sys
 import requests
-from typing import Dict, Any
+from pathlib import Path
+from typing import Dict, Any, Optional
 import google.generativeai as genai
 from datetime import datetime
 
+# Shared helpers live in the repo-level utilities/ folder
+sys.path.append(str(Path(__file__).resolve().parents[3] / "utilities"))
+from llm_backends import LLMBackend, create_backend
+from model_registry import warm_up
+from rate_scheduler import estimate_tokens
+from resilient_call import caller_for
+from semantic_cache import SemanticCache, contains_pii
+from single_flight import shared_flight
+
 # Load .env if available (dev convenience)
 try:
     from dotenv import load_dotenv
@@ -22,11 +34,21 @@ except Exception:
 _api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
 if _api_key:
     genai.configure(api_key=_api_key)
+    warm_up('gemini-2.5-flash-lite')
 
 class WCCInfoBot:
-    def __init__(self):
-        """Initialize the WCC Info Bot with Gemini API"""
-        self.model = genai.GenerativeModel('gemini-2.5-flash-lite')
+    def __init__(self, semantic_cache: Optional[SemanticCache] = None, backend: Optional[LLMBackend] = None):
+        """
+        Initialize the WCC Info Bot with Gemini API
+        
+        semantic_cache (optional) answers paraphrases of questions answered before
+        without calling the model, e.g. WCCInfoBot(SemanticCache())
+        backend (optional) is the model backend, see utilities/llm_backends.py
+        """
+        # Gemini unless LLM_BACKEND says otherwise (e.g. 'local' for the offline stand-in server)
+        self.backend = backend or create_backend(gemini_model='gemini-2.5-flash-lite')
+        self.caller = caller_for(self.backend.kind)
+        self.semantic_cache = semantic_cache
         
         # WCC Knowledge Base (hardcoded for Session 1)
         self.wcc_knowledge = {
@@ -86,6 +108,8 @@ INSTRUCTIONS:
 
 Current date: {datetime.now().strftime('%Y-%m-%d')}
 """
+        # Cached answers are only reused with the same model and system prompt (which includes the date)
+        self.cache_scope = hashlib.sha256(f"{self.backend.kind}:{self.backend.model_id}\0{self.system_prompt}".encode('utf-8')).hexdigest()
 
     def search_web(self, query: str) -> str:
         """
@@ -128,6 +152,22 @@ Current date: {datetime.now().strftime('%Y-%m-%d')}
             search_keywords = ["latest", "upcoming", "current", "recent", "new", "today", "this week"]
             needs_search = any(keyword in user_input.lower() for keyword in search_keywords)
             
+            # Answers that don't depend on live search results can come from the cache;
+            # messages with personal details are kept out of it (save() writes questions to disk)
+            use_cache = self.semantic_cache is not None and not needs_search and not contains_pii(user_input)
+            if use_cache:
+                hit = self.semantic_cache.lookup(user_input, scope=self.cache_scope)
+                if hit:
+                    return {
+                        "response": hit.response,
+                        "search_used": False,
+                        "search_query": None,
+                        "search_result": None,
+                        "cached": True,
+                        "similarity": hit.similarity,
+                        "timestamp": datetime.now().isoformat()
+                    }
+            
             search_result = ""
             if needs_search:
                 search_result = self.search_web(user_input)
@@ -138,10 +178,19 @@ Current date: {datetime.now().strftime('%Y-%m-%d')}
             # Generate response with Gemini
             full_prompt = f"{enhanced_prompt}\n\nUser question: {user_input}\n\nPlease provide a helpful response about WCC:"
             
-            response = self.model.generate_content(full_prompt)
+            # Deadline, retries on transient errors and a circuit breaker (utilities/resilient_call.py);
+            # identical prompts in flight at the same time share one call (utilities/single_flight.py)
+            flight_key = hashlib.sha256(f"{self.cache_scope}\0{full_prompt}".encode('utf-8')).hexdigest()
+            response_text = shared_flight.do(flight_key, lambda: self.caller.call(
+                lambda timeout: self.backend.generate(full_prompt, timeout=timeout),
+                tokens=estimate_tokens(full_prompt)
+            ).text)
+            
+            if use_cache and not self.semantic_cache.read_only:
+                self.semantic_cache.add(user_input, response_text, scope=self.cache_scope)
             
             return {
-                "response": response.text,
+                "response": response_text,
                 "search_used": needs_search,
                 "search_query": user_input if needs_search else None,
                 "search_result": search_result if needs_search else None,
@@ -180,6 +229,8 @@ Current date: {datetime.now().strftime('%Y-%m-%d')}
             
             if result.get('search_used'):
                 print(f"[Used search for: {result['search_query']}]")
+            elif result.get('cached'):
+                print(f"[Answered from cache, similarity {result['similarity']:.2f}]")
             
             print("-" * 50 + "\n")
             
@@ -254,7 +305,8 @@ if __name__ == "__main__":
         demo_basic_usage()
     elif choice == "3":
         api_key = os.getenv("GEMINI_API_KEY") #input("Enter your Gemini API key: ").strip()
-        if api_key:
+        # The offline stand-in (LLM_BACKEND=local) needs no key
+        if api_key or os.getenv("LLM_BACKEND", "gemini") != "gemini":
             # Configure session with provided key, then start bot
             try:
                 genai.configure(api_key=api_key)
@@ -4,9 +4,16 @@ This is a simple chatbot that uses Gemini API to respond to user input.
 """
 
 import os
+from typing import Iterator
+
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+MODEL_ID = "gemini-2.5-flash-lite"
+
+# Messages of earlier conversation sent with each new message
+MAX_HISTORY_MESSAGES = 20
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -31,11 +38,8 @@ class SimpleBot:
         Args:
             system_prompt: Optional system prompt to set bot personality
         """
-        self.model = genai.GenerativeModel(
-            "gemini-2.5-flash-lite",
-            system_instruction=system_prompt or "You are a helpful assistant."
-        )
         self.system_prompt = system_prompt or "You are a helpful assistant."
+        self.model = genai.GenerativeModel(MODEL_ID, system_instruction=self.system_prompt)
         self.conversation_history = []
 
     def chat(self, user_message: str) -> str:
@@ -48,31 +52,38 @@ class SimpleBot:
         Returns:
             The bot's response
         """
-        try:
-            # Add user message to history
-            self.conversation_history.append(
-                {"role": "user", "parts": [user_message]}
-            )
+        return "".join(self.chat_stream(user_message))
 
-            # Generate response using conversation history
-            response = self.model.generate_content(
-                self.conversation_history
-            )
+    def chat_stream(self, user_message: str) -> Iterator[str]:
+        """
+        Send a message and yield the response as it is generated.
 
-            # Extract response text
-            bot_response = response.text
+        Args:
+            user_message: The user's input message
 
-            # Add bot response to history
-            self.conversation_history.append(
-                {"role": "model", "parts": [bot_response]}
+        Yields:
+            Chunks of the bot's response, as they arrive
+        """
+        try:
+            response = self.model.generate_content(
+                self.conversation_history + [{"role": "user", "parts": [user_message]}],
+                stream=True
             )
+            chunks = []
+            for chunk in response:
+                chunks.append(chunk.text)
+                yield chunk.text
 
-            return bot_response
+            # Remember the exchange once it has been shown
+            self.conversation_history.append({"role": "user", "parts": [user_message]})
+            self.conversation_history.append({"role": "model", "parts": ["".join(chunks)]})
+            # Only the latest messages, so long chats don't resend everything every turn
+            del self.conversation_history[:-MAX_HISTORY_MESSAGES]
 
         except Exception as e:
             error_msg = f"Error: {str(e)}"
             print(error_msg)
-            return error_msg
+            yield error_msg
 
     def clear_history(self):
         """Clear conversation history"""
@@ -104,9 +115,11 @@ def main():
                 print("Conversation history cleared.\n")
                 continue
 
-            # Get response from bot
-            response = bot.chat(user_input)
-            print(f"\nBot: {response}\n")
+            # Stream the response from the bot as it arrives
+            print("\nBot: ", end="", flush=True)
+            for chunk in bot.chat_stream(user_input):
+                print(chunk, end="", flush=True)
+            print("\n")
 
         except KeyboardInterrupt:
             print("\n\nGoodbye! ")
@@ -0,0 +1,113 @@
+"""
+Chatbot with Conversation Memory (course repo version)
+The same CLI as chatbot.py, built on the repo's shared helpers in utilities/:
+any model backend (LLM_BACKEND=local runs offline) and token-budgeted
+conversation memory that summarizes older turns.
+
+Runs from inside the course repo only - copy chatbot.py for a standalone project.
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import Iterator
+
+from dotenv import load_dotenv
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent.parent / "utilities"))
+
+from conversation_memory import ConversationMemory
+from llm_backends import create_backend
+
+MODEL_ID = "gemini-2.5-flash-lite"
+
+# Load environment variables from .env file
+load_dotenv()
+
+# The Gemini backend needs a key; LLM_BACKEND=local or openai do not
+if os.getenv("LLM_BACKEND", "gemini") == "gemini":
+    import google.generativeai as genai
+
+    API_KEY = os.getenv("GEMINI_API_KEY")
+    if not API_KEY:
+        raise ValueError(
+            "GEMINI_API_KEY not found in environment variables. "
+            "Please set it in your .env file or environment."
+        )
+    genai.configure(api_key=API_KEY)
+
+
+class MemoryBot:
+    """A chatbot that keeps recent turns word for word and older ones as a summary"""
+
+    def __init__(self, system_prompt: str = None, backend=None, max_history_tokens: int = 2000):
+        """
+        Initialize the chatbot.
+
+        Args:
+            system_prompt: Optional system prompt to set bot personality
+            backend: Optional model backend (default: Gemini, or LLM_BACKEND)
+            max_history_tokens: Most tokens of earlier conversation sent with each message
+        """
+        self.system_prompt = system_prompt or "You are a helpful assistant."
+        self.backend = backend or create_backend(gemini_model=MODEL_ID)
+        self.memory = ConversationMemory(self.backend, max_tokens=max_history_tokens)
+
+    def chat(self, user_message: str) -> str:
+        """Send a message and get a response"""
+        return "".join(self.chat_stream(user_message))
+
+    def chat_stream(self, user_message: str) -> Iterator[str]:
+        """Send a message and yield the response as it is generated"""
+        try:
+            chunks = []
+            for text in self.backend.stream(self.memory.prompt(user_message), system_instruction=self.system_prompt):
+                chunks.append(text)
+                yield text
+            self.memory.add_turn(user_message, "".join(chunks))
+
+        except Exception as e:
+            error_msg = f"Error: {str(e)}"
+            print(error_msg)
+            yield error_msg
+
+    def clear_history(self):
+        """Clear conversation history"""
+        self.memory.clear()
+
+
+def main():
+    """Main function to run the chatbot"""
+    print("HEY! Welcome to the Memory Chatbot!")
+    print("Type 'quit' to exit, 'clear' to clear history\n")
+
+    bot = MemoryBot(system_prompt="You are a friendly and helpful AI assistant.")
+
+    while True:
+        try:
+            user_input = input("You: ").strip()
+
+            if not user_input:
+                continue
+
+            if user_input.lower() == "quit":
+                print("Goodbye! ")
+                break
+
+            if user_input.lower() == "clear":
+                bot.clear_history()
+                print("Conversation history cleared.\n")
+                continue
+
+            print("\nBot: ", end="", flush=True)
+            for chunk in bot.chat_stream(user_input):
+                print(chunk, end="", flush=True)
+            print("\n")
+
+        except KeyboardInterrupt:
+            print("\n\nGoodbye! ")
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+"""
+Chatbot Pipeline Load Test
+Replay a message corpus against SecureWCCChatbot or ProductionSafetyPipeline at a set concurrency or request rate
+
+Run from this folder (by default against the offline stand-in server, so no key or quota is needed):
+    python bench_load.py --corpus messages.jsonl --mode closed --concurrency 16 --duration 60
+    python bench_load.py --mode open --qps 25 --duration 60 --report load.html
+    python bench_load.py --target secure-async --mode open --qps 200 --latency lognormal:0.8,0.5
+    python bench_load.py --target safety --no-dlp --no-presidio --mode closed --concurrency 8
+    python bench_load.py --backend gemini --mode open --qps 0.2 --duration 60   # real API, eval priority
+    python bench_load.py --output load.json --baseline baseline.json --threshold 0.25
+
+The corpus is JSONL with one {"message": "..."} object (or plain JSON string)
+per line; without --corpus the chat messages of bench_security.py are used.
+
+Closed loop: --concurrency workers each send their next message as soon as
+the previous one is answered - measures capacity. Open loop: messages arrive
+at --qps (Poisson) whatever the response times - measures latency under a
+given load. Open-loop latency counts from the scheduled arrival, so time
+spent waiting for a free worker is included rather than hidden.
+"""
+
+import asyncio
+import contextlib
+import html
+import inspect
+import io
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from config import MODEL_CONFIG, initialize_api  # also puts utilities/ on sys.path
+from llm_backends import create_backend
+from local_llm_server import StandInProfile, start_server
+from rate_scheduler import Priority
+
+# Stage timings of the request running in the current thread / task
+_stage_times: ContextVar[Optional[Dict[str, float]]] = ContextVar('stage_times', default=None)
+
+# Instrumented methods per target - stage times are inclusive of anything the method calls
+SECURE_STAGES = {
+    'input_guardrails': '_screen_input',
+    'cache_lookup': '_cached_result',
+    'generation': '_generate',
+    'output_validation': '_validated_result',
+}
+SECURE_ASYNC_STAGES = {**SECURE_STAGES, 'generation': '_agenerate'}
+SAFETY_STAGES = {
+    'dlp_detect': '_detect_pii_dlp',
+    'dlp_redact': '_redact_pii_dlp',
+    'presidio_detect': '_detect_pii_presidio',
+    'presidio_redact': '_redact_pii_presidio',
+    'moderation': '_moderate_content',
+}
+
+
+def _record(stage: str, seconds: float):
+    times = _stage_times.get()
+    if times is not None:
+        times[stage] = times.get(stage, 0.0) + seconds
+
+
+def instrument(obj, stages: Dict[str, str]):
+    """Wrap obj's methods so each call adds its duration to the current request's stage times"""
+    for stage, name in stages.items():
+        method = getattr(obj, name)
+        if inspect.iscoroutinefunction(method):
+            async def timed(*args, _method=method, _stage=stage, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await _method(*args, **kwargs)
+                finally:
+                    _record(_stage, time.perf_counter() - started)
+        else:
+            def timed(*args, _method=method, _stage=stage, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return _method(*args, **kwargs)
+                finally:
+                    _record(_stage, time.perf_counter() - started)
+        setattr(obj, name, timed)
+
+
+def load_corpus(path: Optional[str]) -> List[str]:
+    """Messages from a JSONL file, or bench_security's generated chat corpus"""
+    if path is None:
+        from bench_security import generate_corpus
+        return generate_corpus()['chat']
+    messages = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                messages.append(item if isinstance(item, str) else item.get('message') or item['text'])
+    if not messages:
+        raise ValueError(f"{path} has no messages")
+    return messages
+
+
+class Target:
+    """A pipeline entry point plus how to read its outcome: 'ok', 'blocked' or 'error'"""
+
+    def __init__(self, name: str, call: Callable, outcome: Callable[[object], str], stages: Dict[str, str],
+                 is_async: bool = False):
+        self.name = name
+        self.call = call
+        self.outcome = outcome
+        self.stages = list(stages)  # report order
+        self.is_async = is_async
+
+
+def _chatbot_outcome(result: Dict) -> str:
+    # Generation failures and timeouts come back as blocked results with an error step
+    if any(step.startswith('✗') for step in result.get('processing_steps', [])):
+        return 'error'
+    return 'blocked' if result.get('blocked') else 'ok'
+
+
+def build_target(args, backend) -> Target:
+    if args.target in ('secure', 'secure-async'):
+        from chatbot import SecureWCCChatbot
+        from response_cache import ResponseCache
+        from verdict_cache import VerdictCache
+
+        # Fresh in-memory caches: the run neither reads nor fills the shared on-disk cache
+        response_cache = ResponseCache('', max_temperature=-1.0 if args.no_cache else 0.7)
+        with contextlib.redirect_stdout(io.StringIO()):
+            bot = SecureWCCChatbot(
+                verdict_cache=VerdictCache(),
+                response_cache=response_cache,
+                request_timeout=args.timeout,
+                backend=backend,
+                priority=Priority.EVAL
+            )
+        if args.target == 'secure':
+            instrument(bot, SECURE_STAGES)
+            return Target(args.target, bot.process_message, _chatbot_outcome, SECURE_STAGES)
+        instrument(bot, SECURE_ASYNC_STAGES)
+        return Target(args.target, bot.aprocess_message, _chatbot_outcome, SECURE_ASYNC_STAGES, is_async=True)
+
+    from safety_pipeline_multilayer import ProductionSafetyPipeline
+    pipeline = ProductionSafetyPipeline(
+        gcp_project_id=os.getenv("GCP_PROJECT_ID", ""),
+        openai_api_key=os.getenv("OPENAI_API_KEY", ""),
+        use_google_dlp=not args.no_dlp,
+        use_presidio=not args.no_presidio,
+        use_openai_moderation=not args.no_moderation,
+        # The stand-in server moderates too; the real run uses OpenAI's endpoint
+        moderation_backend=backend if args.backend == 'local' else None
+    )
+    instrument(pipeline, SAFETY_STAGES)
+    return Target(args.target, pipeline.validate_input, lambda result: 'ok' if result[0] else 'blocked',
+                  SAFETY_STAGES)
+
+
+class Recorder:
+    """Collects one sample per finished request"""
+
+    def __init__(self):
+        self.samples: List[Dict] = []
+        self.errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, latency: float, outcome: str, stages: Dict[str, float], error: Optional[BaseException] = None):
+        with self._lock:
+            self.samples.append({'latency': latency, 'outcome': outcome, 'stages': stages})
+            if error is not None:
+                name = type(error).__name__
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def _run_one(target: Target, message: str, started: float, recorder: Recorder):
+    stages = {}
+    _stage_times.set(stages)
+    try:
+        outcome, error = target.outcome(target.call(message)), None
+    except Exception as e:
+        outcome, error = 'error', e
+    recorder.add(time.perf_counter() - started, outcome, stages, error)
+
+
+async def _arun_one(target: Target, message: str, started: float, recorder: Recorder):
+    stages = {}
+    _stage_times.set(stages)
+    try:
+        outcome, error = target.outcome(await target.call(message)), None
+    except Exception as e:
+        outcome, error = 'error', e
+    recorder.add(time.perf_counter() - started, outcome, stages, error)
+
+
+def _arrivals(qps: float, duration: float, rng: random.Random):
+    """Poisson arrival offsets in seconds"""
+    offset = rng.expovariate(qps)
+    while offset < duration:
+        yield offset
+        offset += rng.expovariate(qps)
+
+
+def run_closed(target: Target, messages: List[str], concurrency: int, duration: float,
+               max_requests: Optional[int], recorder: Recorder):
+    deadline = time.perf_counter() + duration
+    counter = iter(range(max_requests or sys.maxsize))
+    lock = threading.Lock()
+
+    def next_message() -> Optional[str]:
+        with lock:
+            index = next(counter, None)
+        if index is None or time.perf_counter() >= deadline:
+            return None
+        return messages[index % len(messages)]
+
+    if target.is_async:
+        async def worker():
+            while (message := next_message()) is not None:
+                await _arun_one(target, message, time.perf_counter(), recorder)
+
+        async def main():
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        asyncio.run(main())
+        return
+
+    def worker():
+        while (message := next_message()) is not None:
+            _run_one(target, message, time.perf_counter(), recorder)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_open(target: Target, messages: List[str], qps: float, duration: float, max_in_flight: int,
+             max_requests: Optional[int], seed: int, recorder: Recorder):
+    arrivals = list(_arrivals(qps, duration, random.Random(seed)))[:max_requests or None]
+
+    if target.is_async:
+        async def main():
+            in_flight = asyncio.Semaphore(max_in_flight)
+            start = time.perf_counter()
+
+            async def arrive(message: str, scheduled: float):
+                async with in_flight:
+                    await _arun_one(target, message, scheduled, recorder)
+
+            tasks = []
+            for i, offset in enumerate(arrivals):
+                await asyncio.sleep(max(0.0, start + offset - time.perf_counter()))
+                tasks.append(asyncio.create_task(arrive(messages[i % len(messages)], start + offset)))
+            await asyncio.gather(*tasks)
+        asyncio.run(main())
+        return
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="load") as pool:
+        start = time.perf_counter()
+        for i, offset in enumerate(arrivals):
+            time.sleep(max(0.0, start + offset - time.perf_counter()))
+            pool.submit(_run_one, target, messages[i % len(messages)], start + offset, recorder)
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+
+    def percentile(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values) * 1000, 2),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': round(values[-1] * 1000, 2),
+    }
+
+
+def summarize(recorder: Recorder, elapsed: float, settings: Dict, stages: List[str]) -> Dict:
+    """JSON-serializable report: throughput, block and error rates, latency per stage"""
+    samples = recorder.samples
+    completed = len(samples)
+    outcomes = {name: sum(1 for s in samples if s['outcome'] == name) for name in ('ok', 'blocked', 'error')}
+    latency = {'total': _percentiles([s['latency'] for s in samples])} if samples else {}
+    for stage in stages:
+        # Only over the requests that reached the stage - blocked ones skip generation
+        timings = [s['stages'][stage] for s in samples if stage in s['stages']]
+        if timings:
+            latency[stage] = _percentiles(timings)
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            **settings,
+        },
+        'results': {
+            'completed': completed,
+            'elapsed_s': round(elapsed, 2),
+            'throughput_rps': round(completed / elapsed, 2) if elapsed else 0.0,
+            'ok': outcomes['ok'],
+            'block_rate': round(outcomes['blocked'] / completed, 4) if completed else 0.0,
+            'error_rate': round(outcomes['error'] / completed, 4) if completed else 0.0,
+            'exceptions': recorder.errors,
+            'latency': latency,
+        },
+    }
+
+
+def find_regressions(current: Dict, baseline: Dict, threshold: float = 0.25) -> List[str]:
+    """
+    Compare two load-test reports.
+
+    Latency regresses when a stage's p95 or p99 rises by more than
+    threshold (0.25 = 25%) plus 1 ms, so sub-millisecond stages do not
+    flag on noise. Throughput is compared for closed-loop runs only - an
+    open-loop run's throughput is its offered rate.
+    """
+    regressions = []
+    now, base = current['results'], baseline['results']
+    closed_loop = current['meta']['mode'] == baseline['meta']['mode'] == 'closed'
+    if closed_loop and now['throughput_rps'] < base['throughput_rps'] * (1 - threshold):
+        regressions.append(f"throughput {now['throughput_rps']} rps vs {base['throughput_rps']} baseline")
+    if now['error_rate'] > base['error_rate'] + 0.01:
+        regressions.append(f"error rate {now['error_rate']:.1%} vs {base['error_rate']:.1%} baseline")
+    for stage, stats in now['latency'].items():
+        base_stats = base['latency'].get(stage)
+        if base_stats is None:
+            continue
+        for key in ('p95_ms', 'p99_ms'):
+            if stats[key] > base_stats[key] * (1 + threshold) + 1.0:
+                regressions.append(f"{stage}: {key[:3]} {stats[key]} ms vs {base_stats[key]} ms baseline")
+    return regressions
+
+
+def render_html(report: Dict) -> str:
+    """Stand-alone HTML page for a report"""
+    meta, results = report['meta'], report['results']
+    esc = lambda value: html.escape(str(value))
+    rows = ''.join(
+        f"<tr><td>{esc(stage)}</td>" + ''.join(f"<td>{esc(stats[key])}</td>" for key in
+                                               ('count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')) + "</tr>"
+        for stage, stats in results['latency'].items()
+    )
+    settings = ''.join(f"<tr><th>{esc(key)}</th><td>{esc(value)}</td></tr>" for key, value in meta.items())
+    exceptions = ', '.join(f"{esc(name)}: {count}" for name, count in results['exceptions'].items()) or 'none'
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Load test - {esc(meta['target'])}</title>
+<style>body{{font-family:sans-serif;margin:2em}}table{{border-collapse:collapse;margin-bottom:1.5em}}
+td,th{{border:1px solid #ccc;padding:4px 10px;text-align:right}}th{{background:#f3f3f3}}</style></head>
+<body><h1>Load test: {esc(meta['target'])} ({esc(meta['mode'])} loop)</h1>
+<table><tr><th>completed</th><th>throughput (req/s)</th><th>block rate</th><th>error rate</th></tr>
+<tr><td>{results['completed']}</td><td>{results['throughput_rps']}</td>
+<td>{results['block_rate']:.1%}</td><td>{results['error_rate']:.1%}</td></tr></table>
+<p>Exceptions: {exceptions}</p>
+<h2>Latency per stage</h2>
+<table><tr><th>stage</th><th>count</th><th>mean ms</th><th>p50 ms</th><th>p95 ms</th><th>p99 ms</th><th>max ms</th></tr>
+{rows}</table>
+<h2>Settings</h2><table>{settings}</table></body></html>
+"""
+
+
+def print_summary(report: Dict):
+    results = report['results']
+    print(f"  completed   {results['completed']:>10}   in {results['elapsed_s']} s")
+    print(f"  throughput  {results['throughput_rps']:>10} req/s")
+    print(f"  block rate  {results['block_rate']:>10.1%}")
+    print(f"  error rate  {results['error_rate']:>10.1%}   {results['exceptions'] or ''}")
+    print(f"\n  {'stage':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in results['latency'].items():
+        print(f"  {stage:<20}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load-test the chatbot pipelines")
+    parser.add_argument("--target", choices=['secure', 'secure-async', 'safety'], default='secure')
+    parser.add_argument("--corpus", help="JSONL file of messages (default: bench_security chat corpus)")
+    parser.add_argument("--mode", choices=['closed', 'open'], default='closed')
+    parser.add_argument("--concurrency", type=int, default=8, help="closed loop: parallel workers")
+    parser.add_argument("--qps", type=float, default=10.0, help="open loop: mean arrival rate")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="open loop: requests served at once")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request deadline (chatbot targets)")
+    parser.add_argument("--no-cache", action="store_true", help="disable the response cache (every request generates)")
+    parser.add_argument("--backend", choices=['local', 'gemini', 'openai'], default='local')
+    parser.add_argument("--url", help="local backend: use this stand-in server instead of starting one")
+    parser.add_argument("--latency", default=StandInProfile.latency, help="stand-in time to first token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="stand-in injected error rate")
+    parser.add_argument("--no-dlp", action="store_true", help="safety target: skip Google DLP")
+    parser.add_argument("--no-presidio", action="store_true", help="safety target: skip Presidio")
+    parser.add_argument("--no-moderation", action="store_true", help="safety target: skip moderation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", help="write an HTML report to this file")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="fail if results regress against this JSON report")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed regression (0.25 = 25%%)")
+    parser.add_argument("--verbose", action="store_true", help="keep the pipeline's own step-by-step output")
+    args = parser.parse_args()
+
+    server = None
+    if args.backend == 'local':
+        base_url = args.url
+        if base_url is None:
+            server = start_server(StandInProfile(latency=args.latency, error_rate=args.error_rate, seed=args.seed),
+                                  port=0)
+            base_url = server.url
+        backend = create_backend('local', MODEL_CONFIG, base_url=base_url)
+    else:
+        initialize_api()
+        # None: the chatbot builds its own Gemini backend, context-cached models included
+        backend = None if args.backend == 'gemini' else create_backend(args.backend, MODEL_CONFIG)
+
+    target = build_target(args, backend)
+    messages = load_corpus(args.corpus)
+    settings = {
+        'target': args.target, 'mode': args.mode, 'backend': args.backend, 'messages': len(messages),
+        'duration_s': args.duration, 'seed': args.seed, 'response_cache': not args.no_cache,
+        **({'concurrency': args.concurrency} if args.mode == 'closed' else
+           {'offered_qps': args.qps, 'max_in_flight': args.max_in_flight}),
+        **({'stand_in_latency': args.latency, 'stand_in_error_rate': args.error_rate} if server else {}),
+    }
+
+    print("=" * 60)
+    print(f"LOAD TEST - {args.target}, {args.mode} loop, {args.backend} backend")
+    print("=" * 60)
+    recorder = Recorder()
+    started = time.perf_counter()
+    # The pipeline prints every step of every request - keep the summary readable
+    with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO()):
+        if args.mode == 'closed':
+            run_closed(target, messages, args.concurrency, args.duration, args.requests, recorder)
+        else:
+            run_open(target, messages, args.qps, args.duration, args.max_in_flight, args.requests, args.seed, recorder)
+    report = summarize(recorder, time.perf_counter() - started, settings, target.stages)
+    if server is not None:
+        report['results']['stand_in'] = dict(server.counters)
+        server.shutdown()
+    print_summary(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ JSON report written to {args.output}")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(render_html(report))
+        print(f"✓ HTML report written to {args.report}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s):")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\n✓ No regressions")
@@ -2,43 +2,119 @@
 WCC Alexa Secure Chatbot
 """
 
-import google.generativeai as genai
-from typing import Dict
+import asyncio
+from collections import deque
+from typing import Dict, Generator, List, Optional, Tuple
 from config import MODEL_CONFIG, SAFETY_SETTINGS, MODEL_ID
-from prompt_patterns import PromptPatterns
-from security import SecurityGuardrails
+from context_cache import ContextCacheManager, shared_context_cache
+from conversation_memory import ConversationMemory
+from guardrail_pipeline import Stage, StagePipeline
+from llm_backends import LLMBackend, create_backend, prompt_text
+from prompt_patterns import PromptParts, PromptPatterns
+from rate_scheduler import Priority, QueueFull, estimate_tokens
+from resilient_call import CircuitOpen, ResilientCaller, caller_for
+from response_cache import ResponseCache, config_hash, shared_response_cache, template_version
+from semantic_cache import SemanticCache  # from utilities/, which config puts on sys.path
+from security import ScanBudgetExceeded, SecurityGuardrails, StreamingOutputValidator
+from single_flight import AsyncSingleFlight, SingleFlight, shared_async_flight, shared_flight
+from verdict_cache import GuardrailVerdict, VerdictCache, shared_verdict_cache
 
 
 class SecureWCCChatbot:
     """Production-ready chatbot with security"""
     
-    def __init__(self, pattern_type: str = "advanced"):
+    def __init__(
+        self,
+        pattern_type: str = "advanced",
+        verdict_cache: Optional[VerdictCache] = None,
+        request_timeout: float = 30.0,
+        response_cache: Optional[ResponseCache] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        context_cache: Optional[ContextCacheManager] = None,
+        caller: Optional[ResilientCaller] = None,
+        single_flight: Optional[SingleFlight] = None,
+        async_flight: Optional[AsyncSingleFlight] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        backend: Optional[LLMBackend] = None,
+        memory: Optional[ConversationMemory] = None
+    ):
         self.pattern_type = pattern_type
-        self.model = genai.GenerativeModel(
-            model_name=MODEL_ID,
+        self.request_timeout = request_timeout  # deadline for each model call, retries included
+        # Models with the pattern's static prompt prefix already in context
+        self.context_cache = context_cache or shared_context_cache
+        # Gemini unless LLM_BACKEND says otherwise (e.g. 'local' for the offline stand-in server)
+        self.backend = backend or create_backend(
             generation_config=MODEL_CONFIG,
-            safety_settings=SAFETY_SETTINGS
+            gemini_model=MODEL_ID,
+            safety_settings=SAFETY_SETTINGS,
+            model_factory=self.context_cache.model_for
         )
-        self.conversation_history = []
-        self.security_log = []
+        # Deadlines, retries, hedging and the circuit breaker - shared so the breaker sees all traffic
+        self.caller = caller or caller_for(self.backend.kind)
+        # Scheduling lane under the rate limits; batch and eval runs pass a lower one
+        self.priority = priority
+        # Identical questions in flight at the same time share one model call
+        self.single_flight = single_flight or shared_flight
+        self.async_flight = async_flight or shared_async_flight
+        self.verdict_cache = verdict_cache or shared_verdict_cache
+        self.response_cache = response_cache or shared_response_cache
+        # Everything besides the message that shapes a response; None when the
+        # config is too creative for stored answers to stand in for new ones
+        self._response_scope = (
+            (pattern_type, f"{self.backend.kind}:{self.backend.model_id}", config_hash(MODEL_CONFIG, SAFETY_SETTINGS),
+             template_version(lambda query: self._select_prompt_parts(query).text))
+            if self.response_cache.cacheable(MODEL_CONFIG) else None
+        )
+        # Opt-in: also answer paraphrases of questions answered before
+        self.semantic_cache = semantic_cache
+        # Opt-in: earlier turns of this conversation go with each message (one bot per conversation then)
+        self.memory = memory
+        self.security_log = deque(maxlen=1000)  # recent events; full history is in security_log.py segments
+        self.input_pipeline = StagePipeline(self.input_stages())
         
         print(f"✓ Chatbot initialized with '{pattern_type}' pattern")
     
-    def _select_prompt_pattern(self, user_query: str) -> str:
+    def _log_event(self, event_type: str, message: str, severity: str = "INFO"):
+        """Log a security event and keep it in this bot's recent history"""
+        self.security_log.append(SecurityGuardrails.log_security_event(event_type, message, severity))
+    
+    def input_stages(self) -> List[Stage]:
+        """
+        Input guardrail stages (steps 1-3) in verdict precedence order.
+        
+        Injection detection and PII redaction only read the normalized
+        message, so neither waits for the other; moderation reads the
+        redacted view. The local regex checks run inline - override to add
+        network-backed checks (inline=False), which then run concurrently.
+        """
+        return [
+            Stage('injection', lambda inputs: SecurityGuardrails.find_injection_patterns(inputs['view']),
+                  blocks=bool, inline=True),
+            Stage('pii', lambda inputs: SecurityGuardrails.redact_pii_view(inputs['view']), inline=True),
+            Stage('moderation', lambda inputs: SecurityGuardrails.check_content(inputs['pii'][2]),
+                  depends_on=('pii',), blocks=lambda verdict: verdict[0] or verdict[2], inline=True)
+        ]
+    
+    def _select_prompt_parts(self, user_query: str) -> PromptParts:
         """Select prompt pattern"""
         patterns = {
-            'zero_shot': PromptPatterns.zero_shot_prompt,
-            'few_shot': PromptPatterns.few_shot_prompt,
-            'cot': PromptPatterns.chain_of_thought_prompt,
-            'role_based': PromptPatterns.role_based_prompt,
-            'structured': PromptPatterns.structured_output_prompt
+            'zero_shot': PromptPatterns.zero_shot_parts,
+            'few_shot': PromptPatterns.few_shot_parts,
+            'cot': PromptPatterns.chain_of_thought_parts,
+            'role_based': PromptPatterns.role_based_parts,
+            'structured': PromptPatterns.structured_output_parts
         }
         
-        pattern_func = patterns.get(self.pattern_type, PromptPatterns.advanced_prompt_with_guardrails)
+        pattern_func = patterns.get(self.pattern_type, PromptPatterns.advanced_parts)
         return pattern_func(user_query)
     
-    def process_message(self, user_message: str) -> Dict:
-        """Process message through security pipeline"""
+    def _screen_input(self, user_message: str) -> Tuple[Optional[Dict], str, List[str], List[Dict]]:
+        """
+        Run the input guardrails (steps 1-3).
+        
+        Returns:
+            (blocked result or None, redacted message, processing steps, security events)
+        """
         processing_steps = []
         security_events = []
         
@@ -47,14 +123,37 @@ class SecureWCCChatbot:
         print(f"{'='*70}")
         print(f"Original: {user_message}\n")
         
+        # Normalize once - every scanner below works on this view
+        view = SecurityGuardrails.normalize(user_message)
+        
+        # Repeated PII-free messages reuse the verdict and skip the regex stages
+        cache_key = self.verdict_cache.fingerprint(view.fingerprint_text, SecurityGuardrails.RULES_VERSION)
+        cached = self.verdict_cache.get(cache_key)
+        if cached:
+            print("⚡ Guardrail verdict served from cache\n")
+            results = {
+                'injection': list(cached.injection_patterns),
+                'pii': (user_message, [], view),
+                'moderation': (cached.is_inappropriate, list(cached.flagged_words), cached.is_crisis)
+            }
+        else:
+            # Independent stages run concurrently; results are reported below in step order
+            try:
+                results, _ = self.input_pipeline.run({'view': view})
+            except ScanBudgetExceeded as e:
+                return self._too_large_to_screen(e, security_events), user_message, processing_steps, security_events
+        
         # STEP 1: Detect Prompt Injection
         print("STEP 1: Prompt Injection Detection")
         print("-" * 70)
         
-        is_injection, injection_patterns = SecurityGuardrails.detect_prompt_injection(user_message)
+        injection_patterns = results['injection']
+        is_injection = len(injection_patterns) > 0
+        if not cached:
+            SecurityGuardrails.report_injection(injection_patterns)
         
         if is_injection:
-            SecurityGuardrails.log_security_event(
+            self._log_event(
                 'PROMPT_INJECTION',
                 f'Detected {len(injection_patterns)} patterns',
                 'CRITICAL'
@@ -63,13 +162,15 @@ class SecureWCCChatbot:
                 'type': 'prompt_injection',
                 'patterns': injection_patterns
             })
+            if not cached:
+                self.verdict_cache.put(cache_key, GuardrailVerdict(True, tuple(injection_patterns)))
             
             return {
                 'response': "I noticed your message might be trying to change how I work. I'm here to help with WCC-related questions only! What would you like to know?",
                 'blocked': True,
                 'security_events': security_events,
                 'processing_steps': ['❌ Blocked at injection detection']
-            }
+            }, user_message, processing_steps, security_events
         
         processing_steps.append('✓ No injection detected')
         print("✓ No injection detected\n")
@@ -78,11 +179,12 @@ class SecureWCCChatbot:
         print("STEP 2: PII Redaction")
         print("-" * 70)
         
-        redacted_message, detected_pii = SecurityGuardrails.redact_pii(user_message)
+        redacted_message, pii_findings, redacted_view = results['pii']
+        detected_pii = SecurityGuardrails.summarize_pii(pii_findings)
         
         if detected_pii:
             pii_summary = ', '.join([f"{p['count']} {p['type']}" for p in detected_pii])
-            SecurityGuardrails.log_security_event('PII_REDACTED', pii_summary, 'WARNING')
+            self._log_event('PII_REDACTED', pii_summary, 'WARNING')
             security_events.append({'type': 'pii_redacted', 'details': detected_pii})
             processing_steps.append(f'🔒 PII redacted: {pii_summary}')
             print(f"Redacted message: {redacted_message}\n")
@@ -94,19 +196,28 @@ class SecureWCCChatbot:
         print("STEP 3: Content Moderation")
         print("-" * 70)
         
-        is_inappropriate, flagged_words, is_crisis = SecurityGuardrails.moderate_content(redacted_message)
+        is_inappropriate, flagged_words, is_crisis = results['moderation']
+        if not cached:
+            SecurityGuardrails.report_moderation(flagged_words, is_crisis)
+            if not detected_pii:
+                self.verdict_cache.put(cache_key, GuardrailVerdict(
+                    False, (), is_inappropriate, tuple(flagged_words), is_crisis
+                ))
         
         if is_crisis:
-            SecurityGuardrails.log_security_event('CRISIS_DETECTED', 'Immediate intervention needed', 'CRITICAL')
+            if self.memory is not None:
+                # The rest of this conversation jumps the queue - not the bot's other conversations
+                self.memory.crisis_detected = True
+            self._log_event('CRISIS_DETECTED', 'Immediate intervention needed', 'CRITICAL')
             return {
                 'response': "I'm concerned about what you've shared. Please reach out to:\n\n• National Suicide Prevention Lifeline: 988\n• Crisis Text Line: Text HOME to 741741\n and help is available 24/7.",
                 'blocked': True,
                 'security_events': [{'type': 'crisis', 'severity': 'critical'}],
                 'processing_steps': processing_steps + ['🚨 Crisis intervention triggered']
-            }
+            }, redacted_message, processing_steps, security_events
         
         if is_inappropriate:
-            SecurityGuardrails.log_security_event('CONTENT_FLAGGED', f'{len(flagged_words)} keywords', 'WARNING')
+            self._log_event('CONTENT_FLAGGED', f'{len(flagged_words)} keywords', 'WARNING')
             security_events.append({'type': 'inappropriate_content', 'flagged': flagged_words})
             processing_steps.append(f'⚠️ Content flagged: {len(flagged_words)} keywords')
             
@@ -115,30 +226,163 @@ class SecureWCCChatbot:
                 'blocked': True,
                 'security_events': security_events,
                 'processing_steps': processing_steps
-            }
+            }, redacted_message, processing_steps, security_events
         
         processing_steps.append('✓ Content moderation passed')
         print("✓ Content appropriate\n")
         
-        # STEP 4: Generate AI Response
+        return None, redacted_message, processing_steps, security_events
+    
+    def _too_large_to_screen(self, error: ScanBudgetExceeded, security_events: List[Dict]) -> Dict:
+        """Result returned when a message is too large to check within the scan budget - never sent on unchecked"""
+        self._log_event('SCAN_BUDGET_EXCEEDED', str(error), 'WARNING')
+        security_events.append({'type': 'scan_budget_exceeded', 'check': error.check, 'length': error.length})
+        print(f"  ⚠️ {error}")
+        
+        return {
+            'response': "That message is too long for me to check. Could you share just the part you have a question about?",
+            'blocked': True,
+            'security_events': security_events,
+            'processing_steps': [f'❌ Blocked: {error.check} scan exceeded its time budget']
+        }
+    
+    def _generation_failed(self, error: Exception, processing_steps: List[str], security_events: List[Dict]) -> Dict:
+        """Result returned when the model call fails"""
+        if isinstance(error, (CircuitOpen, QueueFull)):
+            self._log_event('UPSTREAM_UNAVAILABLE', str(error), 'WARNING')
+        else:
+            self._log_event('ERROR', f'Generation failed: {str(error)}', 'CRITICAL')
+        return {
+            'response': "I'm having trouble right now. Please try again later.",
+            'blocked': True,
+            'security_events': security_events,
+            'processing_steps': processing_steps + [f'✗ Error: {str(error)}']
+        }
+    
+    def _output_blocked(self, issues: List[str], processing_steps: List[str], security_events: List[Dict]) -> Dict:
+        """Result returned when the response fails output validation"""
+        self._log_event('OUTPUT_BLOCKED', f'{len(issues)} issues', 'WARNING')
+        security_events.append({'type': 'unsafe_output', 'issues': issues})
+        processing_steps.append(f'✗ Output validation failed: {len(issues)} issues')
+        
+        return {
+            'response': "I apologize, my response didn't meet quality standards. Could you rephrase your question?",
+            'blocked': True,
+            'security_events': security_events,
+            'processing_steps': processing_steps
+        }
+    
+    def _contents(self, parts: PromptParts):
+        """What goes to the model besides the system instruction: the query, after the remembered turns if any"""
+        if self.memory is None:
+            return parts.user_turn
+        return self.memory.prompt(parts.user_turn)
+    
+    def _schedule(self, parts: PromptParts, contents) -> Dict:
+        """
+        Priority lane and token estimate the rate scheduler admits this prompt's model call by.
+        
+        Crisis priority belongs to a conversation, so it needs memory (one
+        bot per conversation); a bot without memory serves many
+        conversations and always uses its own lane.
+        """
+        crisis = self.memory is not None and self.memory.crisis_detected
+        return {
+            'priority': Priority.CRISIS if crisis else self.priority,
+            'tokens': estimate_tokens(f"{parts.system_instruction}\n\n{prompt_text(contents)}",
+                                      self.backend.max_output_tokens)
+        }
+    
+    def _generate(self, cache_key: Optional[str], redacted_message: str) -> str:
+        """
+        Model response text for the message.
+        
+        Concurrent calls with the same response cache key share one
+        upstream call; without a key (caching disabled) every call is its own.
+        """
+        def generate() -> str:
+            # The static prefix goes as the system instruction (a context cache for Gemini)
+            parts = self._select_prompt_parts(redacted_message)
+            contents = self._contents(parts)
+            return self.caller.call(
+                lambda timeout: self.backend.generate(contents, parts.system_instruction, timeout),
+                deadline=self.request_timeout,
+                **self._schedule(parts, contents)
+            ).text
+        
+        if cache_key is None:
+            return generate()
+        return self.single_flight.do(cache_key, generate)
+    
+    async def _agenerate(self, cache_key: Optional[str], redacted_message: str, timeout: float) -> str:
+        """Async _generate: a caller that times out or is cancelled leaves the shared call running for the others"""
+        async def generate() -> str:
+            parts = self._select_prompt_parts(redacted_message)
+            contents = self._contents(parts)
+            # Each attempt's server-side timeout is the time left, so an abandoned call also stops upstream
+            response = await self.caller.acall(
+                lambda remaining: self.backend.agenerate(contents, parts.system_instruction, remaining),
+                deadline=timeout,
+                **self._schedule(parts, contents)
+            )
+            return response.text
+        
+        if cache_key is None:
+            return await generate()
+        return await self.async_flight.do(cache_key, generate)
+    
+    def _response_key(self, redacted_message: str) -> Optional[str]:
+        """Response cache key for a screened message, or None when responses are not cached"""
+        # With memory the reply depends on the conversation too - keys on the message alone would be wrong
+        if self._response_scope is None or self.memory is not None:
+            return None
+        return self.response_cache.key(redacted_message, *self._response_scope)
+    
+    def _cached_result(
+        self,
+        cache_key: Optional[str],
+        redacted_message: str,
+        processing_steps: List[str],
+        security_events: List[Dict]
+    ) -> Optional[Dict]:
+        """Serve a stored response (exact match first, then a paraphrase) in place of step 4, or None on a miss"""
+        if cache_key is None:
+            return None
+        ai_response = self.response_cache.get(cache_key)
+        if ai_response is not None:
+            served_from = 'cache'
+        elif self.semantic_cache is not None:
+            hit = self.semantic_cache.lookup(redacted_message, scope='\0'.join(self._response_scope))
+            if hit is None:
+                return None
+            ai_response = hit.response
+            served_from = f'semantic cache (similarity {hit.similarity:.2f})'
+        else:
+            return None
+        
         print("STEP 4: Generating AI Response")
         print("-" * 70)
+        processing_steps.append(f'⚡ AI response served from {served_from}')
+        print(f"⚡ Response served from {served_from}\n")
         
-        try:
-            prompt = self._select_prompt_pattern(redacted_message)
-            response = self.model.generate_content(prompt)
-            ai_response = response.text
-            processing_steps.append('✓ AI response generated')
-            print("✓ Response generated\n")
-        except Exception as e:
-            SecurityGuardrails.log_security_event('ERROR', f'Generation failed: {str(e)}', 'CRITICAL')
-            return {
-                'response': "I'm having trouble right now. Please try again later.",
-                'blocked': True,
-                'security_events': security_events,
-                'processing_steps': processing_steps + [f'✗ Error: {str(e)}']
-            }
-        
+        # Validated again - the output rules may have changed since it was stored
+        return self._validated_result(ai_response, processing_steps, security_events)
+    
+    def _store_response(self, cache_key: str, redacted_message: str, ai_response: str):
+        """Cache a response that passed output validation"""
+        self.response_cache.put(cache_key, ai_response)
+        if self.semantic_cache is not None and not self.semantic_cache.read_only:
+            self.semantic_cache.add(redacted_message, ai_response, scope='\0'.join(self._response_scope))
+    
+    def _validated_result(
+        self,
+        ai_response: str,
+        processing_steps: List[str],
+        security_events: List[Dict],
+        cache_key: Optional[str] = None,
+        redacted_message: str = ""
+    ) -> Dict:
+        """Validate the generated response (step 5), cache it if it passed, and build the final result"""
         # STEP 5: Validate Output
         print("STEP 5: Output Validation")
         print("-" * 70)
@@ -146,20 +390,17 @@ class SecureWCCChatbot:
         is_safe, issues = SecurityGuardrails.validate_output(ai_response)
         
         if not is_safe:
-            SecurityGuardrails.log_security_event('OUTPUT_BLOCKED', f'{len(issues)} issues', 'WARNING')
-            security_events.append({'type': 'unsafe_output', 'issues': issues})
-            processing_steps.append(f'✗ Output validation failed: {len(issues)} issues')
-            
-            return {
-                'response': "I apologize, my response didn't meet quality standards. Could you rephrase your question?",
-                'blocked': True,
-                'security_events': security_events,
-                'processing_steps': processing_steps
-            }
+            return self._output_blocked(issues, processing_steps, security_events)
         
         processing_steps.append('✓ Output validation passed')
         print("✓ Output safe\n")
         
+        if cache_key is not None:
+            self._store_response(cache_key, redacted_message, ai_response)
+        if self.memory is not None and redacted_message:
+            # Redacted, so PII never reaches the summaries either
+            self.memory.add_turn(redacted_message, ai_response)
+        
         print(f"✅ MESSAGE PROCESSED SUCCESSFULLY")
         print(f"{'='*70}\n")
         
@@ -170,7 +411,172 @@ class SecureWCCChatbot:
             'processing_steps': processing_steps
         }
     
+    def process_message(self, user_message: str) -> Dict:
+        """Process message through security pipeline"""
+        blocked, redacted_message, processing_steps, security_events = self._screen_input(user_message)
+        if blocked:
+            return blocked
+        
+        cache_key = self._response_key(redacted_message)
+        cached = self._cached_result(cache_key, redacted_message, processing_steps, security_events)
+        if cached:
+            return cached
+        
+        # STEP 4: Generate AI Response
+        print("STEP 4: Generating AI Response")
+        print("-" * 70)
+        
+        try:
+            ai_response = self._generate(cache_key, redacted_message)
+            processing_steps.append('✓ AI response generated')
+            print("✓ Response generated\n")
+        except Exception as e:
+            return self._generation_failed(e, processing_steps, security_events)
+        
+        return self._validated_result(ai_response, processing_steps, security_events, cache_key, redacted_message)
+    
+    def process_message_stream(self, user_message: str) -> Generator[str, None, Dict]:
+        """
+        Streaming variant of process_message.
+        
+        Yields response text as it is generated and validated. Output
+        validation runs on each chunk, and generation is abandoned as soon
+        as a leak is detected. The generator's return value is the same
+        result dict process_message returns:
+        
+            result = yield from bot.process_message_stream(message)
+        """
+        blocked, redacted_message, processing_steps, security_events = self._screen_input(user_message)
+        if blocked:
+            yield blocked['response']
+            return blocked
+        
+        cache_key = self._response_key(redacted_message)
+        cached = self._cached_result(cache_key, redacted_message, processing_steps, security_events)
+        if cached:
+            yield cached['response']
+            return cached
+        
+        # STEP 4+5: Stream AI Response with incremental Output Validation
+        print("STEP 4: Streaming AI Response (validated per chunk)")
+        print("-" * 70)
+        
+        validator = StreamingOutputValidator()
+        chunks = []
+        
+        try:
+            parts = self._select_prompt_parts(redacted_message)
+            contents = self._contents(parts)
+            # Retried until the stream starts; text already shown is never re-requested, so no hedging
+            stream = self.caller.call(
+                lambda timeout: self.backend.stream(contents, parts.system_instruction, timeout),
+                deadline=self.request_timeout,
+                hedge=False,
+                **self._schedule(parts, contents)
+            )
+            for text in stream:
+                chunks.append(text)
+                safe_text = validator.feed(text)
+                if validator.leaked:
+                    # Stop consuming the stream - no more tokens are generated for a discarded reply
+                    break
+                if safe_text:
+                    yield safe_text
+        except Exception as e:
+            result = self._generation_failed(e, processing_steps, security_events)
+            yield result['response']
+            return result
+        
+        if validator.leaked:
+            is_safe, issues = False, validator.issues
+        else:
+            is_safe, issues, remaining_text = validator.finish()
+        
+        if not is_safe:
+            result = self._output_blocked(issues, processing_steps, security_events)
+            yield result['response']
+            return result
+        
+        if remaining_text:
+            yield remaining_text
+        
+        processing_steps.append('✓ AI response generated')
+        processing_steps.append('✓ Output validation passed')
+        print("\n✓ Response streamed and validated\n")
+        
+        ai_response = ''.join(chunks)
+        if cache_key is not None:
+            self._store_response(cache_key, redacted_message, ai_response)
+        if self.memory is not None:
+            self.memory.add_turn(redacted_message, ai_response)
+        
+        return {
+            'response': ai_response,
+            'blocked': False,
+            'security_events': security_events,
+            'processing_steps': processing_steps
+        }
+    
+    async def aprocess_message(self, user_message: str, timeout: Optional[float] = None) -> Dict:
+        """
+        Async variant of process_message, for serving many conversations from one process.
+        
+        The guardrails run in a worker thread so the event loop stays free,
+        and the model call uses the SDK's async client, so a waiting request
+        holds no thread. timeout (default: request_timeout) bounds the whole
+        request; when it expires, or the calling task is cancelled, the
+        pending model call is cancelled too, which cancels the upstream request.
+        """
+        timeout = self.request_timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(self._aprocess_message(user_message, timeout), timeout)
+        except asyncio.TimeoutError:
+            self._log_event('REQUEST_TIMEOUT', f'No response within {timeout}s', 'WARNING')
+            return {
+                'response': "I'm having trouble right now. Please try again later.",
+                'blocked': True,
+                'security_events': [{'type': 'timeout', 'seconds': timeout}],
+                'processing_steps': [f'✗ Timed out after {timeout}s']
+            }
+    
+    async def _aprocess_message(self, user_message: str, timeout: float) -> Dict:
+        blocked, redacted_message, processing_steps, security_events = await asyncio.to_thread(
+            self._screen_input, user_message
+        )
+        if blocked:
+            return blocked
+        
+        # The disk tier is sqlite - keep its reads and writes off the event loop too
+        cache_key = self._response_key(redacted_message)
+        cached = await asyncio.to_thread(self._cached_result, cache_key, redacted_message, processing_steps, security_events)
+        if cached:
+            return cached
+        
+        # STEP 4: Generate AI Response
+        print("STEP 4: Generating AI Response")
+        print("-" * 70)
+        
+        try:
+            ai_response = await self._agenerate(cache_key, redacted_message, timeout)
+            processing_steps.append('✓ AI response generated')
+            print("✓ Response generated\n")
+        except Exception as e:
+            return self._generation_failed(e, processing_steps, security_events)
+        
+        return await asyncio.to_thread(
+            self._validated_result, ai_response, processing_steps, security_events, cache_key, redacted_message
+        )
+    
     def chat(self, user_message: str) -> str:
         """Simple chat interface"""
         result = self.process_message(user_message)
+        return result['response']
+    
+    def chat_stream(self, user_message: str) -> Generator[str, None, None]:
+        """Simple streaming chat interface - yields response text as it arrives"""
+        yield from self.process_message_stream(user_message)
+    
+    async def achat(self, user_message: str, timeout: Optional[float] = None) -> str:
+        """Simple async chat interface"""
+        result = await self.aprocess_message(user_message, timeout)
         return result['response']
\ No newline at end of file
@@ -2,20 +2,25 @@
 WCC Alexa Not So Secure Chatbot
 """
 
-import google.generativeai as genai
-from typing import Dict
+import hashlib
+from typing import Dict, Optional
 from prompt_patterns import PromptPatterns
 from config import MODEL_CONFIG, MODEL_ID
+from llm_backends import LLMBackend, create_backend
+from rate_scheduler import estimate_tokens
+from resilient_call import caller_for
+from response_cache import config_hash
+from single_flight import shared_flight
 
 class NoSecureWCCChatbot:
     """Chatbot without security"""
     
-    def __init__(self, pattern_type: str = "advanced"):
+    def __init__(self, pattern_type: str = "advanced", backend: Optional[LLMBackend] = None):
         self.pattern_type = pattern_type
-        self.model = genai.GenerativeModel(
-            model_name=MODEL_ID,
-            generation_config=MODEL_CONFIG
-        )
+        # Gemini unless LLM_BACKEND says otherwise; its models are shared with every other bot using these settings
+        self.backend = backend or create_backend(generation_config=MODEL_CONFIG, gemini_model=MODEL_ID)
+        self.caller = caller_for(self.backend.kind)
+        self._flight_scope = f"{self.backend.kind}:{self.backend.model_id}\0{config_hash(MODEL_CONFIG)}"
 
     def _select_prompt_pattern(self, user_query: str) -> str:
         """Select prompt pattern"""
@@ -34,8 +39,12 @@ class NoSecureWCCChatbot:
     def process_message(self, user_message: str) -> Dict:
         """Process message without security"""
         prompt = self._select_prompt_pattern(user_message)
-        response = self.model.generate_content(prompt)
-        ai_response = response.text
+        # Attendees asking the same thing at the same moment share one call
+        flight_key = hashlib.sha256(f"{self._flight_scope}\0{prompt}".encode('utf-8')).hexdigest()
+        ai_response = shared_flight.do(flight_key, lambda: self.caller.call(
+            lambda timeout: self.backend.generate(prompt, timeout=timeout),
+            tokens=estimate_tokens(prompt, self.backend.max_output_tokens)
+        ).text)
         print("✓ Response generated\n")
     
         return {
@@ -2,10 +2,16 @@
 Configuration and API Setup
 """
 import os
+import sys
 import google.generativeai as genai
 from datetime import datetime
+from pathlib import Path
 from dotenv import load_dotenv
 
+# Shared helpers live in the repo-level utilities/ folder
+sys.path.append(str(Path(__file__).resolve().parents[2] / "utilities"))
+from model_registry import warm_up
+
 MODEL_ID = 'gemini-2.5-flash-lite'
 
 def initialize_api():
@@ -19,6 +25,8 @@ def initialize_api():
     _api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
     if _api_key:
         genai.configure(api_key=_api_key)
+        # Open the API connection in the background so the first message doesn't wait for it
+        warm_up(MODEL_ID)
         print("✓ Gemini API initialized successfully")
 
 # Model Configuration
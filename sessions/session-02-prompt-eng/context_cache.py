@@ -0,0 +1,200 @@
+"""
+Prompt Context Cache
+Register each pattern's static prompt prefix once and reuse it on every request
+"""
+
+import datetime
+import hashlib
+import threading
+import time
+from typing import Dict, List, Optional
+
+import google.generativeai as genai
+from config import MODEL_CONFIG, MODEL_ID, SAFETY_SETTINGS
+from model_registry import get_model
+from single_flight import SingleFlight
+
+try:
+    from google.generativeai import caching
+except ImportError:
+    # SDKs before 0.7 have no context caching
+    caching = None
+
+
+class _Entry:
+    __slots__ = ('model', 'cached_content', 'refresh_at', 'retry_at')
+
+    def __init__(self, model, cached_content=None, refresh_at: float = float('inf'), retry_at: float = float('inf')):
+        self.model = model
+        self.cached_content = cached_content
+        self.refresh_at = refresh_at
+        self.retry_at = retry_at
+
+
+class ContextCacheManager:
+    """
+    Models whose context already holds a static prompt prefix.
+
+    model_for(prefix) returns a model to send only the per-query part to.
+    Each distinct prefix is registered once as a Gemini context cache
+    (CachedContent), and its handle is reused until shortly before the
+    cache expires, when the TTL is extended. The cached prefix tokens
+    are billed at the cached rate and are not re-processed before the
+    first output token.
+
+    Where context caching is unavailable - an older SDK, a model without
+    it, or a prefix under the model's minimum cacheable size - the
+    prefix becomes the model's system instruction instead. Requests
+    then still carry only the query as user-turn text, and the
+    unchanging prefix stays eligible for the API's implicit prefix
+    caching. Registration is retried after retry_seconds.
+
+    Registering and extending caches are network calls, so they run
+    outside the manager's lock: concurrent first requests for a prefix
+    share one registration, and while a cache is being extended (or a
+    fallback prefix re-registered) other requests keep using the
+    current model. Requests for other prefixes never wait on either.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        generation_config: Optional[Dict] = None,
+        safety_settings: Optional[List[Dict]] = None,
+        ttl_seconds: float = 3600,
+        refresh_margin_seconds: float = 300,
+        retry_seconds: float = 3600,
+        enabled: bool = True
+    ):
+        """
+        Args:
+            model_id: Model the caches are created for
+            generation_config / safety_settings: Applied to every returned model
+            ttl_seconds: Lifetime requested for each context cache
+            refresh_margin_seconds: Extend a cache this long before it expires
+            retry_seconds: Wait before retrying a prefix that could not be cached
+            enabled: False = always use the system-instruction fallback
+        """
+        self.model_id = model_id
+        self.generation_config = generation_config
+        self.safety_settings = safety_settings
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.retry_seconds = retry_seconds
+        self.enabled = enabled and caching is not None
+        self.created = 0
+        self.refreshed = 0
+        self.fallbacks = 0
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._registrations = SingleFlight()
+
+    def model_for(self, prefix: str):
+        """Model to call with the per-query part of a prompt whose static part is prefix"""
+        key = hashlib.sha256(prefix.encode('utf-8')).hexdigest()
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now < entry.refresh_at and now < entry.retry_at:
+            return entry.model
+
+        if entry is None:
+            # First use of this prefix - concurrent callers wait for one registration
+            return self._registrations.do(key, lambda: self._first_entry(key, prefix)).model
+
+        with self._lock:
+            # Claim the renewal so one caller makes it; the others keep the current model meanwhile
+            retry = now >= entry.retry_at
+            claimed = self._entries.get(key) is entry and (retry or now >= entry.refresh_at)
+            if claimed:
+                if retry:
+                    entry.retry_at = float('inf')
+                else:
+                    entry.refresh_at = float('inf')
+        if not claimed:
+            return entry.model
+
+        if retry:
+            entry = self._register(prefix)
+            self._store(key, entry)
+        else:
+            entry = self._refresh(key, entry, prefix)
+        return entry.model
+
+    def _first_entry(self, key: str, prefix: str) -> _Entry:
+        entry = self._entries.get(key)
+        if entry is None:
+            # Not registered by a call that finished just before this one started
+            entry = self._register(prefix)
+            self._store(key, entry)
+        return entry
+
+    def _store(self, key: str, entry: _Entry):
+        with self._lock:
+            self._entries[key] = entry
+
+    def _fallback(self, prefix: str) -> _Entry:
+        """Prefix as a plain system instruction"""
+        with self._lock:
+            self.fallbacks += 1
+        model = get_model(self.model_id, self.generation_config, self.safety_settings, prefix)
+        retry_at = time.monotonic() + self.retry_seconds if self.enabled else float('inf')
+        return _Entry(model, retry_at=retry_at)
+
+    def _register(self, prefix: str) -> _Entry:
+        if not self.enabled:
+            return self._fallback(prefix)
+        try:
+            cached_content = caching.CachedContent.create(
+                model=self.model_id,
+                display_name=f"wcc-prompt-{hashlib.sha256(prefix.encode('utf-8')).hexdigest()[:12]}",
+                system_instruction=prefix,
+                ttl=datetime.timedelta(seconds=self.ttl_seconds)
+            )
+            model = genai.GenerativeModel.from_cached_content(
+                cached_content=cached_content,
+                generation_config=self.generation_config,
+                safety_settings=self.safety_settings
+            )
+        except Exception:
+            # Unsupported model, prefix below the minimum size, no quota, ...
+            return self._fallback(prefix)
+        with self._lock:
+            self.created += 1
+        return _Entry(model, cached_content, time.monotonic() + self.ttl_seconds - self.refresh_margin_seconds)
+
+    def _refresh(self, key: str, entry: _Entry, prefix: str) -> _Entry:
+        """Extend a cache about to expire; re-register it if it is already gone. Returns the entry now in use."""
+        try:
+            entry.cached_content.update(ttl=datetime.timedelta(seconds=self.ttl_seconds))
+        except Exception:
+            entry = self._register(prefix)
+            self._store(key, entry)
+            return entry
+        with self._lock:
+            entry.refresh_at = time.monotonic() + self.ttl_seconds - self.refresh_margin_seconds
+            self.refreshed += 1
+        return entry
+
+    def close(self):
+        """Delete the context caches now instead of leaving them to expire (they are billed while they live)"""
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.cached_content is not None:
+                    try:
+                        entry.cached_content.delete()
+                    except Exception:
+                        pass
+            self._entries.clear()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'cached_prefixes': sum(1 for entry in self._entries.values() if entry.cached_content is not None),
+            'created': self.created,
+            'refreshed': self.refreshed,
+            'fallbacks': self.fallbacks
+        }
+
+
+# Shared by all chatbots in the process that use the default model settings
+shared_context_cache = ContextCacheManager(MODEL_ID, MODEL_CONFIG, SAFETY_SETTINGS)
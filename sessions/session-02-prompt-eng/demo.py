@@ -5,6 +5,7 @@ Main Demo for Prompt Engineering Patterns and Security Features
 from config import initialize_api
 from chatbot import SecureWCCChatbot
 from chatbot_not_secure import NoSecureWCCChatbot
+from conversation_memory import ConversationMemory  # from utilities/, which config puts on sys.path
 
 def compare_all_patterns():
     """Compare all patterns side-by-side"""
@@ -92,6 +93,8 @@ def run_demo():
     print("Type your questions (or 'quit' to exit)\n")
     
     bot = SecureWCCChatbot(pattern_type='advanced')
+    # A conversation from here on: recent turns go with each question, older ones as a summary
+    bot.memory = ConversationMemory(bot.backend)
     
     while True:
         user_input = input("\nYou: ")
@@ -99,8 +102,13 @@ def run_demo():
             print("\nThank you for using WCC Chatbot! 🎓")
             break
         
-        result = bot.process_message(user_input)
-        print(f"\nWCC Alexa: {result['response']}")
+        # Stream the reply so the first words show up as soon as they are generated.
+        # The prefix waits for the first text, so the bot's step log stays above the reply.
+        prefix = "\nWCC Alexa: "
+        for text in bot.chat_stream(user_input):
+            print(prefix + text, end="", flush=True)
+            prefix = ""
+        print()
 
 
 if __name__ == "__main__":
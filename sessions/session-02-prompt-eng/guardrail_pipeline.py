@@ -0,0 +1,168 @@
+"""
+Guardrail Stage Pipeline
+Run independent guardrail checks concurrently and stop at the first blocking verdict
+"""
+
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+def _never_blocks(result: Any) -> bool:
+    return False
+
+
+class Stage(NamedTuple):
+    """
+    One guardrail check.
+
+    run receives a dict holding the pipeline inputs and the results of
+    the stages named in depends_on; blocks decides from the stage's own
+    result whether the message must be stopped there. inline stages
+    (CPU-bound local checks, which gain nothing from a thread while they
+    hold the GIL) run in the calling thread, overlapping with the I/O-bound
+    stages on the pool instead of paying for a thread hand-off.
+    """
+    name: str
+    run: Callable[[Dict[str, Any]], Any]
+    depends_on: Tuple[str, ...] = ()
+    blocks: Callable[[Any], bool] = _never_blocks
+    inline: bool = False
+
+
+class _Finished:
+    """Outcome of an inline stage, with the parts of the Future API the pipeline uses"""
+
+    __slots__ = ('_result', '_exception')
+
+    def __init__(self, result: Any = None, exception: Optional[BaseException] = None):
+        self._result = result
+        self._exception = exception
+
+    def done(self) -> bool:
+        return True
+
+    def result(self) -> Any:
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self) -> Optional[BaseException]:
+        return self._exception
+
+    def cancel(self) -> bool:
+        return False
+
+
+def _run_inline(stage: Stage, context: Dict[str, Any]) -> _Finished:
+    """Run a stage in the calling thread"""
+    try:
+        return _Finished(stage.run(context))
+    except Exception as e:
+        return _Finished(exception=e)
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _stage_pool() -> ThreadPoolExecutor:
+    """Shared pool for stage runs, created on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=min(8, (os.cpu_count() or 1) + 4),
+                                           thread_name_prefix="guardrail-stage")
+    return _pool
+
+
+class StagePipeline:
+    """
+    Dependency-ordered guardrail stages.
+
+    Every stage starts as soon as its dependencies have finished, so
+    stages that only read the message (e.g. injection detection and PII
+    scanning) run side by side and their latencies overlap instead of
+    adding up. Stage order in the list is verdict precedence: results
+    are examined in that order, and the run stops at the first blocking
+    stage once every stage before it has passed - without waiting for
+    the stages after it, and without starting stages that depend on it.
+    """
+
+    def __init__(self, stages: List[Stage], executor: Optional[Executor] = None):
+        """
+        Args:
+            stages: Stages in precedence order; dependencies must appear earlier
+            executor: Where stages run (default: a shared thread pool)
+        """
+        names = set()
+        for stage in stages:
+            unknown = [name for name in stage.depends_on if name not in names]
+            if unknown:
+                raise ValueError(f"Stage '{stage.name}' depends on later or unknown stage(s): {', '.join(unknown)}")
+            names.add(stage.name)
+        self.stages = stages
+        self.executor = executor
+
+    def run(self, inputs: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Run the stages on one message.
+
+        Args:
+            inputs: Values available to every stage (e.g. {'view': normalized message})
+
+        Returns:
+            (stage name -> result for every stage that finished and passed or
+             was examined, name of the blocking stage or None). Exceptions raised
+             by a stage propagate when that stage is reached in precedence order.
+        """
+        executor = self.executor or _stage_pool()
+        results = dict(inputs)
+        futures: Dict[str, Future] = {}
+        examined = 0
+
+        try:
+            while True:
+                # Start every stage whose dependencies are all available - pool stages
+                # first, then the first inline stage (the rest wait for the next round)
+                ready = [stage for stage in self.stages
+                         if stage.name not in futures and all(name in results for name in stage.depends_on)]
+                inline_started = False
+                for stage in sorted(ready, key=lambda stage: stage.inline):
+                    context = {name: results[name] for name in inputs}
+                    context.update((name, results[name]) for name in stage.depends_on)
+                    if not stage.inline:
+                        futures[stage.name] = executor.submit(stage.run, context)
+                    elif not inline_started:
+                        futures[stage.name] = _run_inline(stage, context)
+                        inline_started = True
+
+                # Examine finished stages in precedence order
+                while examined < len(self.stages):
+                    stage = self.stages[examined]
+                    future = futures.get(stage.name)
+                    if future is None or not future.done():
+                        break
+                    result = future.result()
+                    results[stage.name] = result
+                    examined += 1
+                    if stage.blocks(result):
+                        return {name: results[name] for name in results if name not in inputs}, stage.name
+
+                if examined == len(self.stages):
+                    return {name: results[name] for name in results if name not in inputs}, None
+
+                for stage in self.stages[examined:]:
+                    future = futures.get(stage.name)
+                    if (stage.name not in results and future is not None and future.done()
+                            and not future.exception() and not stage.blocks(future.result())):
+                        # Passed out of order - its dependents can start before it is examined
+                        results[stage.name] = future.result()
+
+                if not inline_started:
+                    wait([future for future in futures.values() if not future.done()], return_when=FIRST_COMPLETED)
+        finally:
+            for future in futures.values():
+                future.cancel()
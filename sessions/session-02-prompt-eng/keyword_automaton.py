@@ -0,0 +1,153 @@
+"""
+Keyword Automaton
+Aho-Corasick matching over word tokens for the guardrail keyword lists
+"""
+
+import re
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+class KeywordAutomaton:
+    """
+    Match many keyword lists in one linear pass over a text.
+
+    Keywords are split into word tokens and compiled into a single
+    Aho-Corasick automaton whose alphabet is words rather than
+    characters. Matching therefore respects word boundaries ("hack"
+    does not fire on "hackathon") and costs one dict lookup per word
+    of input, however many keywords are loaded.
+    """
+
+    def __init__(self, keyword_lists: Dict[str, List[str]], variants: Optional[Dict[str, List[str]]] = None):
+        """
+        Build the automaton.
+
+        Args:
+            keyword_lists: Label -> keywords, e.g. {'crisis': [...], 'topic': [...]}
+            variants: Keyword -> other forms that count as that keyword (e.g. 'bomb' -> ['bombs', 'bombing']);
+                a match on a variant is reported under the keyword's index
+        """
+        self.labels = list(keyword_lists)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[str, int, int]]] = [[]]
+        self.max_terms = 0
+
+        variants = {keyword.lower(): forms for keyword, forms in (variants or {}).items()}
+        for label, keywords in keyword_lists.items():
+            for order, keyword in enumerate(keywords):
+                for form in [keyword, *variants.get(keyword.lower(), ())]:
+                    self._add(label, order, WORD_PATTERN.findall(form.lower()))
+
+        self._build_fail_links()
+
+    def to_data(self) -> Dict:
+        """The built tables as plain lists and dicts (JSON-serializable), for from_data()"""
+        return {'labels': self.labels, 'goto': self._goto, 'fail': self._fail,
+                'outputs': self._outputs, 'max_terms': self.max_terms}
+
+    @classmethod
+    def from_data(cls, data: Dict) -> "KeywordAutomaton":
+        """Rebuild an automaton from to_data() output without re-running construction"""
+        automaton = cls.__new__(cls)
+        automaton.labels = list(data['labels'])
+        automaton._goto = [{str(word): int(state) for word, state in goto.items()} for goto in data['goto']]
+        automaton._fail = [int(state) for state in data['fail']]
+        automaton._outputs = [[(label, int(order), int(length)) for label, order, length in outputs]
+                              for outputs in data['outputs']]
+        automaton.max_terms = int(data['max_terms'])
+        states = len(automaton._goto)
+        if not states == len(automaton._fail) == len(automaton._outputs) or not (
+            all(0 <= state < states for state in automaton._fail)
+            and all(0 <= state < states for goto in automaton._goto for state in goto.values())
+            and all(label in automaton.labels for outputs in automaton._outputs for label, _, _ in outputs)
+        ):
+            raise ValueError("Keyword automaton tables are inconsistent")
+        return automaton
+
+    def _add(self, label: str, order: int, words: List[str]):
+        """Insert one tokenized keyword into the trie"""
+        if not words:
+            return
+        state = 0
+        for word in words:
+            next_state = self._goto[state].get(word)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][word] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append((label, order, len(words)))
+        self.max_terms = max(self.max_terms, len(words))
+
+    def _build_fail_links(self):
+        """Breadth-first pass setting failure links and merging outputs"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(word, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    def find(self, text_lower: str) -> List[Tuple[str, int, int, int]]:
+        """
+        Find every keyword occurrence in already-lowercased text.
+
+        Returns:
+            (label, keyword index in its list, start, end) per occurrence
+        """
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        root = goto[0]
+        window = self.max_terms or 1
+        starts = [0] * window
+        hits = []
+        state = 0
+
+        for position, match in enumerate(WORD_PATTERN.finditer(text_lower)):
+            word = match.group()
+            if state == 0 and word not in root:
+                continue
+            starts[position % window] = match.start()
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            for label, order, length in outputs[state]:
+                hits.append((label, order, starts[(position - length + 1) % window], match.end()))
+
+        return hits
+
+    def scan(self, text: str, lowercased: bool = False) -> Dict[str, List[int]]:
+        """
+        Scan text once and group hits by label.
+
+        Same walk as find(), over plain word strings since offsets
+        are not needed here. Pass lowercased=True for text that is
+        already lowercase (e.g. a normalized view) to skip the copy.
+
+        Returns:
+            Label -> sorted, de-duplicated indexes of matched keywords
+        """
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        root = goto[0]
+        found: Dict[str, set] = {label: set() for label in self.labels}
+        state = 0
+
+        for word in WORD_PATTERN.findall(text if lowercased else text.lower()):
+            if state == 0 and word not in root:
+                continue
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            for label, order, _ in outputs[state]:
+                found[label].add(order)
+
+        return {label: sorted(orders) for label, orders in found.items()}
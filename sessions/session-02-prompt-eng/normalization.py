@@ -0,0 +1,224 @@
+"""
+Text Normalization
+One shared normalization pass per message for all guardrail scanners
+"""
+
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Tuple, Union
+
+# Common Cyrillic / Greek / Latin-extended lookalikes of ASCII letters (after lowercasing)
+HOMOGLYPHS = {
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'к': 'k', 'м': 'm', 'н': 'h',
+    'о': 'o', 'р': 'p', 'с': 'c', 'т': 't', 'у': 'y', 'х': 'x', 'ѕ': 's',
+    'і': 'i', 'ї': 'i', 'ј': 'j', 'ԁ': 'd', 'ԛ': 'q', 'ԝ': 'w', 'һ': 'h',
+    'α': 'a', 'β': 'b', 'ε': 'e', 'η': 'n', 'ι': 'i', 'κ': 'k', 'ν': 'v',
+    'ο': 'o', 'ρ': 'p', 'τ': 't', 'υ': 'u', 'χ': 'x', 'ω': 'w',
+    'ɑ': 'a', 'ɡ': 'g', 'ı': 'i', 'ȷ': 'j', 'ℓ': 'l',
+}
+
+# ASCII whitespace the fast path cannot pass through unchanged (plain substring checks
+# beat a regex here - one str.find per marker runs at memchr speed)
+_WHITESPACE_TO_FOLD = ('  ', '\t', '\n', '\r', '\f', '\v')
+
+# Whitespace runs, or any single whitespace character other than a plain space
+_WHITESPACE_RUN = re.compile(r'\s\s+|[^\S ]')
+
+
+class NormalizedText:
+    """
+    Normalized view of a message plus an offset map back to the original.
+
+    text is lowercased, NFKC-folded, free of zero-width and other format
+    characters, homoglyph-folded and whitespace-collapsed. offsets[i] is
+    the index in original of the character that produced text[i]
+    (None when the two line up one-to-one).
+
+    Deleting format characters rejoins words split to dodge keywords
+    ("b\\u200bomb"), but also joins text that was meant to stay apart,
+    which breaks the \\b anchors of PII and injection patterns
+    ("x\\u200b555-123-4567"). Those scanners read bounded instead: the
+    same view with each format character turned into a space.
+
+    Views that only shift runs of characters (collapsed ASCII whitespace)
+    keep (text index, original index) segment starts instead, and build
+    offsets on first access - most messages never need them.
+    """
+
+    __slots__ = ('original', 'text', '_offsets', '_segments', '_format_chars', '_bounded')
+
+    def __init__(self, original: str, text: str, offsets: Optional[array] = None,
+                 segments: Optional[List[Tuple[int, int]]] = None, format_chars: bool = False):
+        self.original = original
+        self.text = text
+        self._offsets = offsets
+        self._segments = segments
+        self._format_chars = format_chars   # format characters were deleted from original
+        self._bounded = None
+
+    @property
+    def bounded(self) -> "NormalizedText":
+        """View for pattern scanners: format characters become spaces instead of vanishing (built on first use)"""
+        if not self._format_chars:
+            return self
+        if self._bounded is None:
+            text, offsets, _ = _fold_unicode(self.original, format_replacement=' ')
+            self._bounded = NormalizedText(self.original, text, offsets)
+        return self._bounded
+
+    @property
+    def fingerprint_text(self) -> str:
+        """Text that decides every scanner's verdict - both views when they differ"""
+        return self.text if not self._format_chars else f"{self.text}\0{self.bounded.text}"
+
+    @property
+    def offsets(self) -> Optional[array]:
+        if self._offsets is None and self._segments is not None:
+            offsets = array('l')
+            bounds = self._segments[1:] + [(len(self.text), None)]
+            for (start, origin), (end, _) in zip(self._segments, bounds):
+                offsets.extend(range(origin, origin + end - start))
+            self._offsets = offsets
+        return self._offsets
+
+    def to_original(self, start: int, end: int) -> Tuple[int, int]:
+        """Map a span in text to the span of original that produced it"""
+        if self._offsets is None and self._segments is not None:
+            return self._segment_position(start), self._segment_position(max(start, end - 1)) + (end > start)
+        if self.offsets is None:
+            return start, end
+        if end <= start:
+            position = self.offsets[start] if start < len(self.offsets) else len(self.original)
+            return position, position
+        return self.offsets[start], self.offsets[end - 1] + 1
+
+    def from_original(self, start: int, end: int) -> Tuple[int, int]:
+        """Map a span of original to the span of text its characters produced (inverse of to_original)"""
+        offsets = self.offsets
+        if offsets is None:
+            return start, end
+        return bisect_left(offsets, start), bisect_left(offsets, end)
+
+    def redact(self, spans: List[Tuple[int, int, str]]) -> "NormalizedText":
+        """
+        Replace offset-sorted (start, end, replacement) spans of text.
+
+        Returns a new view whose replacement characters map to the start
+        of the span they replaced, so later scanners need not re-normalize.
+        """
+        if not spans:
+            return self
+        parts = []
+        offsets = array('l')
+        position = 0
+        for start, end, replacement in spans:
+            parts.append(self.text[position:start])
+            offsets.extend(self._offset_range(position, start))
+            parts.append(replacement.lower())
+            offsets.extend([self.to_original(start, end)[0]] * len(replacement))
+            position = end
+        parts.append(self.text[position:])
+        offsets.extend(self._offset_range(position, len(self.text)))
+        return NormalizedText(self.original, ''.join(parts), offsets)
+
+    def redact_original(self, spans: List[Tuple[int, int, str]]) -> "NormalizedText":
+        """redact() for spans given as offsets into original, e.g. found in the bounded view"""
+        return self.redact([(*self.from_original(start, end), replacement) for start, end, replacement in spans])
+
+    def _segment_position(self, index: int) -> int:
+        """Original index of text[index] (or of the end of original past the last character)"""
+        if index >= len(self.text):
+            return len(self.original)
+        segment_start, origin = self._segments[bisect_right(self._segments, (index, len(self.original))) - 1]
+        return origin + index - segment_start
+
+    def _offset_range(self, start: int, end: int):
+        return range(start, end) if self.offsets is None else self.offsets[start:end]
+
+    def __repr__(self):
+        return f"NormalizedText({self.text!r})"
+
+
+def _fold_char(ch: str) -> str:
+    """NFKC compatibility folding, lowercase, accent stripping and homoglyph folding for one character"""
+    # NFKD applies the same compatibility mappings as NFKC, and also splits
+    # off combining marks so accents used to dodge keywords can be dropped
+    decomposed = unicodedata.normalize('NFKD', ch).lower()
+    return ''.join(HOMOGLYPHS.get(c, c) for c in decomposed if not unicodedata.combining(c))
+
+
+def _normalize_ascii_whitespace(text: str) -> NormalizedText:
+    """ASCII text only needs lowercasing and whitespace collapsing - one regex pass, lazy offsets"""
+    lowered = text.lower()
+    parts = []
+    segments = [(0, 0)]
+    position = 0
+    length = 0
+    for match in _WHITESPACE_RUN.finditer(lowered):
+        start, end = match.span()
+        parts.append(lowered[position:start])
+        parts.append(' ')
+        # The kept run and its single space shift together; the next run starts at end
+        length += start - position + 1
+        segments.append((length, end))
+        position = end
+    parts.append(lowered[position:])
+    return NormalizedText(text, ''.join(parts), segments=segments)
+
+
+def normalize(text: Union[str, NormalizedText]) -> NormalizedText:
+    """
+    Build the normalized view of a message (returns views unchanged).
+
+    Plain ASCII without tabs, newlines or repeated whitespace - most chat
+    traffic - only needs lowercasing and keeps identity offsets.
+    """
+    if isinstance(text, NormalizedText):
+        return text
+    if text.isascii():
+        if not any(marker in text for marker in _WHITESPACE_TO_FOLD):
+            return NormalizedText(text, text.lower())
+        return _normalize_ascii_whitespace(text)
+
+    folded_text, offsets, format_chars = _fold_unicode(text)
+    return NormalizedText(text, folded_text, offsets, format_chars=format_chars)
+
+
+def _fold_unicode(text: str, format_replacement: str = '') -> Tuple[str, array, bool]:
+    """
+    Fold any text character by character.
+
+    Format characters (zero-width spaces/joiners, BOM, soft hyphen, bidi
+    controls) are replaced by format_replacement - deleted by default.
+
+    Returns:
+        (folded text, offsets into text, whether any format character was seen)
+    """
+    parts = []
+    offsets = array('l')
+    previous_space = False
+    format_chars = False
+
+    for i, ch in enumerate(text):
+        if ch.isascii():
+            folded = ch.lower()
+        elif unicodedata.category(ch) == 'Cf':
+            format_chars = True
+            folded = format_replacement
+        else:
+            folded = _fold_char(ch)
+
+        for c in folded:
+            if c.isspace():
+                if previous_space:
+                    continue
+                c = ' '
+                previous_space = True
+            else:
+                previous_space = False
+            parts.append(c)
+            offsets.append(i)
+
+    return ''.join(parts), offsets, format_chars
@@ -0,0 +1,225 @@
+"""
+Response Cache
+Serve repeated (FAQ-style) questions without calling the model again
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from verdict_cache import normalize_for_fingerprint
+
+# Next to this module wherever the bot is started; RESPONSE_CACHE_PATH="" keeps the cache in memory only
+DEFAULT_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", str(Path(__file__).parent / "response_cache.sqlite3"))
+
+
+def config_hash(generation_config: Dict, safety_settings: Optional[List[Dict]] = None) -> str:
+    """Digest of everything besides the prompt that shapes a response"""
+    payload = json.dumps([generation_config, safety_settings or []], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def template_version(render: Callable[[str], str]) -> str:
+    """
+    Version of a prompt template, derived from the template text itself.
+
+    Rendering with a placeholder query gives the template with its slot,
+    so any edit to the wording changes the version and retires the
+    responses generated from the old wording.
+    """
+    return hashlib.sha256(render('{user_query}').encode('utf-8')).hexdigest()[:12]
+
+
+class ResponseCache:
+    """
+    Two-tier cache of validated model responses.
+
+    An in-memory LRU sits in front of a SQLite store in WAL mode, so
+    readers in other threads and worker processes never block on a
+    writer and a restarted process starts warm. Keys are SHA-256 digests
+    of (redacted message, pattern type, model, generation config, prompt
+    template version): raw messages are never stored, and a change to any
+    of the inputs that shape a response misses instead of serving a stale
+    answer.
+
+    Only deterministic configs are cached by default - a config with any
+    sampling temperature asks for varied answers, and serving a stored
+    one would defeat that. Raise max_temperature to opt in for a
+    sampling config (e.g. an FAQ bot where any sampled answer will do).
+    Callers store a response only after it passed output validation.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_CACHE_PATH,
+        max_entries: int = 1000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 24 * 3600,
+        max_temperature: float = 0.0
+    ):
+        """
+        Args:
+            path: SQLite file for the disk tier (None or "" = memory only)
+            max_entries: Responses kept in the memory tier
+            max_bytes: Total response size kept on disk; least recently used go first
+            ttl_seconds: Default lifetime of an entry (put() can override it per entry)
+            max_temperature: Highest temperature whose responses are cached (0.0 = greedy decoding only)
+        """
+        self.path = path or None
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_temperature = max_temperature
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_errors = 0
+        # Expiry times are wall-clock so they stay meaningful on disk across restarts
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def cacheable(self, generation_config: Dict) -> bool:
+        """Whether responses generated with this config may be cached"""
+        return generation_config.get('temperature', 1.0) <= self.max_temperature
+
+    @staticmethod
+    def key(message: str, pattern_type: str, model_id: str, config_digest: str, template: str) -> str:
+        """Cache key for a redacted message (see config_hash and template_version)"""
+        normalized = normalize_for_fingerprint(message)
+        payload = '\0'.join((model_id, config_digest, pattern_type, template, normalized))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Open the disk tier on first use; call with the lock held"""
+        if self._db is None and self.path:
+            try:
+                db = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+                db.execute("""CREATE TABLE IF NOT EXISTS responses (
+                                  key TEXT PRIMARY KEY,
+                                  response TEXT NOT NULL,
+                                  size INTEGER NOT NULL,
+                                  expires REAL NOT NULL,
+                                  last_used REAL NOT NULL)""")
+                db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+                self._db = db
+            except sqlite3.Error:
+                # An unwritable location leaves the memory tier working
+                self.disk_errors += 1
+                self.path = None
+        return self._db
+
+    def _remember(self, key: str, expires: float, response: str):
+        """Put an entry in the memory tier; call with the lock held"""
+        self._entries[key] = (expires, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response, or None when missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+            db = self._connection()
+            if db is not None:
+                try:
+                    row = db.execute("SELECT response, expires FROM responses WHERE key = ? AND expires >= ?",
+                                     (key, now)).fetchone()
+                    if row is not None:
+                        # Recency is only recorded on disk reads - memory hits keep their row hot enough
+                        db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                except sqlite3.Error:
+                    self.disk_errors += 1
+                    row = None
+                if row is not None:
+                    response, expires = row
+                    self._remember(key, expires, response)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return response
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: str, ttl_seconds: Optional[float] = None):
+        """Store a validated response in both tiers, evicting by size on disk"""
+        now = time.time()
+        expires = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._remember(key, expires, response)
+
+            db = self._connection()
+            if db is None:
+                return
+            try:
+                db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                           (key, response, len(response.encode('utf-8')), expires, now))
+                self._evict(db, now)
+            except sqlite3.Error:
+                self.disk_errors += 1
+
+    def _evict(self, db: sqlite3.Connection, now: float):
+        """Drop expired rows, then least recently used ones until the store fits max_bytes"""
+        db.execute("DELETE FROM responses WHERE expires < ?", (now,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        for (key,) in victims:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            db = self._connection()
+            if db is not None:
+                try:
+                    db.execute("DELETE FROM responses")
+                except sqlite3.Error:
+                    self.disk_errors += 1
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    @property
+    def stats(self) -> dict:
+        """Hit / miss counters"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'memory_entries': len(self._entries),
+            'disk_errors': self.disk_errors
+        }
+
+
+# Shared by all chatbots in the process (the disk tier is opened on first use)
+shared_response_cache = ResponseCache()
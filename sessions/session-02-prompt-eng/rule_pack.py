@@ -0,0 +1,342 @@
+"""
+Guardrail Rule Packs
+Versioned rule files, precompiled artifacts and hot reload for SecurityGuardrails
+
+Compile a pack ahead of time (e.g. while building the worker image):
+    python rule_pack.py rules/default.json
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from keyword_automaton import KeywordAutomaton
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+try:
+    # Linear-time regex engine (pip install google-re2) for scanning very large inputs
+    import re2
+except ImportError:
+    re2 = None
+
+RULES_DIR = Path(__file__).parent / "rules"
+DEFAULT_RULES_PATH = os.getenv("GUARDRAIL_RULES", str(RULES_DIR / "default.json"))
+
+# Bump when the artifact layout changes, so stale artifacts are rebuilt
+ARTIFACT_FORMAT = 4
+ARTIFACT_SUFFIX = ".pack"
+
+# The guardrails read each of these lists, so every pack must define them
+KEYWORD_LABELS = ('inappropriate', 'crisis', 'leakage', 'topic')
+
+
+def _lowercase_pattern(pattern: str) -> str:
+    """Lowercase the literal letters of a regex, leaving escapes like \\S or \\D intact"""
+    return re.sub(r'\\.|[A-Z]', lambda m: m.group().lower() if len(m.group()) == 1 else m.group(), pattern)
+
+
+def _compile_scanner(patterns: List[str], lowercase: bool = True, engine=re) -> Tuple["re.Pattern", List["re.Pattern"]]:
+    """
+    Combine patterns into one compiled matcher plus per-pattern matchers.
+
+    The combined alternation finds every position where some pattern
+    starts in a single pass. It has no capturing groups and, for
+    case-insensitive rules, is matched against lowercased text instead
+    of using IGNORECASE - both keep the re module's literal-prefix
+    search enabled, without which the combined pattern scans slower
+    than the separate searches it replaces. At each hit position the
+    anchored per-pattern matchers identify which alternative(s) matched.
+
+    engine is any module with re's compile() API (re, or re2).
+    """
+    if lowercase:
+        patterns = [_lowercase_pattern(pattern) for pattern in patterns]
+    combined = engine.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+    return combined, [engine.compile(pattern) for pattern in patterns]
+
+
+class RulePack:
+    """
+    One compiled set of guardrail rules.
+
+    Packs are never modified after construction: a reload builds a new
+    pack and swaps the reference, so a check that reads the active pack
+    once sees one consistent set of rules even mid-reload.
+    """
+
+    def __init__(self, source: Dict, digest: str, keywords: Optional[KeywordAutomaton] = None):
+        """
+        Validate and compile a rule source.
+
+        Args:
+            source: Parsed rule file (see rules/default.json)
+            digest: SHA-256 of the rule content, used to detect stale artifacts
+            keywords: Automaton already built for this source (from an artifact); built here when omitted
+        """
+        missing = [key for key in ('version', 'injection_patterns', 'pii_patterns', 'keywords') if key not in source]
+        if missing:
+            raise ValueError(f"Rule pack is missing {', '.join(missing)}")
+        missing = [label for label in KEYWORD_LABELS if label not in source['keywords']]
+        if missing:
+            raise ValueError(f"Rule pack has no keyword list for {', '.join(missing)}")
+
+        self.source = source
+        self.name = source.get('name', 'rules')
+        self.version = str(source['version'])
+        self.digest = digest
+        # Changes whenever any rule changes - part of every verdict cache key
+        self.rules_version = f"{self.name}-{self.version}-{digest[:12]}"
+
+        self.injection_patterns = list(source['injection_patterns'])
+        self.pii_patterns = [(entry['pattern'], entry['replacement'], entry['type'])
+                             for entry in source['pii_patterns']]
+        self.keyword_lists = {label: list(keywords) for label, keywords in source['keywords'].items()}
+        # Inflected forms matched as their keyword - matching is per whole word, so 'bombs' needs listing
+        self.keyword_variants = {keyword: list(forms) for keyword, forms in source.get('keyword_variants', {}).items()}
+
+        try:
+            self.injection_scanner, self.injection_matchers = _compile_scanner(self.injection_patterns)
+            # PII patterns are case-sensitive; list order is the overlap priority
+            self.pii_scanner, self.pii_matchers = _compile_scanner(
+                [pattern for pattern, _, _ in self.pii_patterns], lowercase=False)
+        except re.error as e:
+            raise ValueError(f"Invalid pattern in rule pack {self.name} {self.version}: {e}") from e
+
+        # One word-level automaton for every keyword list
+        self.keywords = keywords or KeywordAutomaton(self.keyword_lists, self.keyword_variants)
+
+        self._large_input = None
+
+    def keyword_forms(self, label: str) -> List[str]:
+        """Every form a list's keywords are matched in: the keywords and their variants"""
+        return [form for keyword in self.keyword_lists[label]
+                for form in [keyword, *self.keyword_variants.get(keyword, ())]]
+
+    def large_input_scanners(self) -> Dict[str, Tuple]:
+        """
+        Scanners for windowed scanning of very large inputs, built on first use.
+
+        Uses the linear-time re2 engine when it is installed and accepts the
+        patterns, otherwise the regular `re` scanners.
+
+        Returns:
+            {'injection': (scanner, matchers), 'pii': (scanner, matchers), 'backend': 're2' or 're'}
+        """
+        if self._large_input is None:
+            scanners = {'injection': (self.injection_scanner, self.injection_matchers),
+                        'pii': (self.pii_scanner, self.pii_matchers),
+                        'backend': 're'}
+            if re2 is not None:
+                try:
+                    scanners = {'injection': _compile_scanner(self.injection_patterns, engine=re2),
+                                'pii': _compile_scanner([pattern for pattern, _, _ in self.pii_patterns],
+                                                        lowercase=False, engine=re2),
+                                'backend': 're2'}
+                except Exception:
+                    # A pattern re2 does not support (e.g. backreferences) - keep `re`
+                    pass
+            self._large_input = scanners
+        return self._large_input
+
+    def __repr__(self):
+        return f"RulePack({self.rules_version!r})"
+
+
+def read_rule_source(path) -> Tuple[Dict, str]:
+    """Parse a JSON or YAML rule file; returns (source, content digest)"""
+    path = Path(path)
+    with open(path, encoding='utf-8') as f:
+        if path.suffix in ('.yaml', '.yml'):
+            if yaml is None:
+                raise ImportError("PyYAML is required for YAML rule packs (pip install pyyaml)")
+            source = yaml.safe_load(f)
+        else:
+            source = json.load(f)
+
+    return source, source_digest(source)
+
+
+def source_digest(source: Dict) -> str:
+    """SHA-256 of parsed rule content - not the bytes, so reformatting or JSON <-> YAML keeps the digest"""
+    return hashlib.sha256(json.dumps(source, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def artifact_path(path) -> Path:
+    """Where the compiled artifact of a rule file lives, e.g. rules/default.json.pack"""
+    path = Path(path)
+    return path.with_name(path.name + ARTIFACT_SUFFIX)
+
+
+def save_artifact(pack: RulePack, path) -> Path:
+    """
+    Write a compiled pack next to its rule file (atomically, so readers never see half a file).
+
+    The artifact is plain JSON - the rule source, its digest and the
+    keyword automaton's tables - so loading one never runs code, unlike
+    a pickle. Regexes are recompiled on load (a pickle did that too).
+    """
+    target = artifact_path(path)
+    temporary = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    artifact = {'format': ARTIFACT_FORMAT, 'digest': pack.digest, 'source': pack.source,
+                'keywords': pack.keywords.to_data()}
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(artifact, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temporary, target)
+    return target
+
+
+def _read_artifact(path) -> Optional[RulePack]:
+    """Load a compiled artifact, or None when it is missing, from another format or does not match its digest"""
+    try:
+        with open(artifact_path(path), encoding='utf-8') as f:
+            artifact = json.load(f)
+        if artifact['format'] != ARTIFACT_FORMAT:
+            return None
+        source = artifact['source']
+        digest = source_digest(source)
+        if digest != artifact['digest']:
+            # Truncated or edited by hand - the automaton may not belong to this source
+            return None
+        return RulePack(source, digest, KeywordAutomaton.from_data(artifact['keywords']))
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def compile_rule_pack(path, write_artifact: bool = True) -> RulePack:
+    """Compile a rule file and (by default) save the artifact for the next cold start"""
+    source, digest = read_rule_source(path)
+    pack = RulePack(source, digest)
+    if write_artifact:
+        try:
+            save_artifact(pack, path)
+        except OSError:
+            # Read-only deployments still work; they just compile at startup
+            pass
+    return pack
+
+
+def load_rule_pack(path=DEFAULT_RULES_PATH, write_artifact: bool = False) -> RulePack:
+    """
+    Load the rule pack for a rule file, preferring its compiled artifact.
+
+    The artifact is used when its digest matches the rule file (or when
+    only the artifact was deployed - it carries its own source); otherwise
+    the file is compiled, and the artifact rewritten only if write_artifact
+    is set. Importing the guardrails never writes into the source tree:
+    artifacts come from `python rule_pack.py` (the build) or the watcher.
+    """
+    pack = _read_artifact(path)
+    if not Path(path).exists():
+        if pack is None:
+            raise FileNotFoundError(f"No rule file at {path} and no valid compiled artifact next to it")
+        return pack
+
+    source, digest = read_rule_source(path)
+    if pack is not None and pack.digest == digest:
+        return pack
+
+    pack = RulePack(source, digest)
+    if write_artifact:
+        try:
+            save_artifact(pack, path)
+        except OSError:
+            pass
+    return pack
+
+
+class RulePackWatcher:
+    """
+    Reload a rule pack when its file or artifact changes.
+
+    A daemon thread polls modification times (cheap stat calls, no
+    file reads) and, on a change, loads and compiles the new pack off
+    the request path before handing it to install(). Invalid packs are
+    logged and the current rules stay active.
+    """
+
+    def __init__(self, path, install: Callable[[RulePack], None], interval: float = 5.0):
+        """
+        Args:
+            path: Rule file to watch
+            install: Called with each newly loaded pack
+            interval: Seconds between polls
+        """
+        self.path = Path(path)
+        self.install = install
+        self.interval = interval
+        self._stamp = self._current_stamp()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _current_stamp(self) -> Tuple:
+        stamp = []
+        for path in (self.path, artifact_path(self.path)):
+            try:
+                stat = path.stat()
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def check(self) -> bool:
+        """Reload now if anything changed; returns True when a new pack was installed"""
+        stamp = self._current_stamp()
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+
+        from security_log import get_security_logger
+        try:
+            pack = load_rule_pack(self.path, write_artifact=True)
+        except Exception as e:
+            get_security_logger().log("RULES_RELOAD_FAILED", f"{self.path}: {e}", "WARNING")
+            return False
+
+        self.install(pack)
+        # Our own artifact write changes the stamp - don't treat it as another edit
+        self._stamp = self._current_stamp()
+        get_security_logger().log("RULES_RELOADED", f"Installed {pack.rules_version}", "INFO")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> "RulePackWatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="rule-pack-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    for rule_file in sys.argv[1:] or [DEFAULT_RULES_PATH]:
+        started = time.perf_counter()
+        pack = compile_rule_pack(rule_file, write_artifact=False)
+        target = save_artifact(pack, rule_file)
+        compiled_ms = (time.perf_counter() - started) * 1000
+
+        re.purge()
+        started = time.perf_counter()
+        _read_artifact(rule_file)
+        loaded_ms = (time.perf_counter() - started) * 1000
+
+        print(f"✓ {pack.rules_version} -> {target} "
+              f"(compile {compiled_ms:.1f} ms, artifact load {loaded_ms:.1f} ms)")
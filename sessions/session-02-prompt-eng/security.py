@@ -2,133 +2,320 @@
 Security Guardrails
 """
 
+import os
 import re
-from typing import List, Dict, Tuple
-from datetime import datetime
+from bisect import bisect_left
+from typing import Callable, List, Dict, Optional, Tuple, NamedTuple, Union
+from normalization import NormalizedText, normalize
+from rule_pack import DEFAULT_RULES_PATH, RulePack, RulePackWatcher, load_rule_pack
+from windowed_scan import scan_positions as _scan_positions, scan_windows
+from security_log import get_security_logger
+
+
+# Scanners accept raw text or a view already built by normalize()
+TextInput = Union[str, NormalizedText]
+
+
+class PIIFinding(NamedTuple):
+    """A redacted PII span, with offsets into the original text"""
+    type: str
+    start: int
+    end: int
+    replacement: str
+
+
+class ScanBudgetExceeded(Exception):
+    """A large-input scan ran out of time before the whole message was checked"""
+    
+    def __init__(self, check: str, length: int, budget: float):
+        super().__init__(f"{check} scan of {length:,} characters exceeded its {budget}s budget")
+        self.check = check
+        self.length = length
+        self.budget = budget
+
+
+class _FromRules:
+    """Class attribute read from the active rule pack, so it can never disagree with it"""
+    
+    def __init__(self, read: Callable[[RulePack], object]):
+        self.read = read
+    
+    def __get__(self, instance, owner):
+        return self.read(owner._rules)
 
 
 class SecurityGuardrails:
     """Multi-layered security system"""
     
-    INJECTION_PATTERNS = [
-        r'ignore\s+(previous|all|above|prior)\s+instructions?',
-        r'disregard\s+(previous|all|above)\s+instructions?',
-        r'forget\s+(everything|all|previous)',
-        r'you\s+are\s+now\s+(a|an)',
-        r'act\s+as\s+(a|an)',
-        r'pretend\s+(you\s+are|to\s+be)',
-        r'roleplay\s+as',
-        r'system\s+prompt',
-        r'show\s+(me\s+)?your\s+(instructions|prompt)',
-        r'reveal\s+your\s+(prompt|instructions)',
-        r'developer\s+mode',
-        r'debug\s+mode',
-        r'jailbreak',
-        r'\[SYSTEM\]',
-        r'\[ADMIN\]',
-    ]
-    
-    PII_PATTERNS = [
-        (r'\b\d{3}-\d{2}-\d{4}\b', '[REDACTED_SSN]', 'NI'),
-        (r'\b\d{3}[\s-]?\d{3}[\s-]?\d{4}\b', '[REDACTED_PHONE]', 'Phone'),
-        (r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[REDACTED_EMAIL]', 'Email'),
-        (r'\b\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}\b', '[REDACTED_CC]', 'Credit Card'),
-        (r'\b\d{5}(?:-\d{4})?\b', '[REDACTED_ZIP]', 'ZIP Code'),
-    ]
-    
-    INAPPROPRIATE_KEYWORDS = [
-        'hate', 'racist', 'violence', 'suicide', 'bomb', 'weapon',
-        'drugs', 'hack', 'exploit', 'scam', 'fraud'
-    ]
-    
-    CRISIS_KEYWORDS = [
-        'suicide', 'kill myself', 'end my life', 'want to die',
-        'self harm', 'cut myself'
-    ]
-    
-    @classmethod
-    def detect_prompt_injection(cls, text: str) -> Tuple[bool, List[str]]:
-        """Detect prompt injection attempts"""
-        detected = []
-        text_lower = text.lower()
+    # Active rule pack (rules/default.json unless GUARDRAIL_RULES points elsewhere).
+    # install_rules() replaces it in one assignment; each check reads it once.
+    _rules: RulePack = None
+    
+    # Read-only views of the active pack, kept for callers of the old class attributes
+    INJECTION_PATTERNS = _FromRules(lambda rules: rules.injection_patterns)
+    PII_PATTERNS = _FromRules(lambda rules: rules.pii_patterns)
+    INAPPROPRIATE_KEYWORDS = _FromRules(lambda rules: rules.keyword_lists['inappropriate'])
+    CRISIS_KEYWORDS = _FromRules(lambda rules: rules.keyword_lists['crisis'])
+    LEAKAGE_INDICATORS = _FromRules(lambda rules: rules.keyword_lists['leakage'])
+    TOPIC_KEYWORDS = _FromRules(lambda rules: rules.keyword_lists['topic'])
+    RULES_VERSION = _FromRules(lambda rules: rules.rules_version)
+    
+    @classmethod
+    def install_rules(cls, pack: RulePack):
+        """Make a rule pack active for every subsequent check, without a restart"""
+        cls._rules = pack
+    
+    @classmethod
+    def active_rules(cls) -> RulePack:
+        """The rule pack checks are currently using"""
+        return cls._rules
+    
+    @classmethod
+    def load_rules(cls, path=DEFAULT_RULES_PATH) -> RulePack:
+        """Load (or compile) a rule file and make it active; never writes an artifact"""
+        pack = load_rule_pack(path)
+        cls.install_rules(pack)
+        return pack
+    
+    @classmethod
+    def watch_rules(cls, path=DEFAULT_RULES_PATH, interval: float = 5.0) -> RulePackWatcher:
+        """Hot-reload the rules whenever the rule file (or its artifact) changes"""
+        return RulePackWatcher(path, cls.install_rules, interval).start()
+    
+    # Inputs longer than WINDOW_CHARS (pasted CVs, log dumps) are scanned in
+    # overlapping windows on the pack's linear-time backend; matches up to
+    # WINDOW_OVERLAP characters never straddle a window unseen. A scan that
+    # exceeds SCAN_BUDGET_SECONDS raises ScanBudgetExceeded.
+    WINDOW_CHARS = 4096
+    WINDOW_OVERLAP = 256
+    SCAN_BUDGET_SECONDS = 0.5
+    
+    @classmethod
+    def _scan(cls, text: str, rules: RulePack, check: str, budget: Optional[float] = None):
+        """
+        (pattern index, start, end) hits of the 'injection' or 'pii' patterns in normalized text.
         
-        for pattern in cls.INJECTION_PATTERNS:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                detected.append(pattern)
-                print(f"  🚨 Detected pattern: {pattern}")
+        budget (seconds, None = no limit) only applies to windowed large inputs.
+        """
+        if len(text) <= cls.WINDOW_CHARS:
+            if check == 'injection':
+                return _scan_positions(text, rules.injection_scanner, rules.injection_matchers)
+            return _scan_positions(text, rules.pii_scanner, rules.pii_matchers)
         
-        is_malicious = len(detected) > 0
-        if is_malicious:
+        scanner, matchers = rules.large_input_scanners()[check]
+        hits, complete = scan_windows(text, scanner, matchers, cls.WINDOW_CHARS, cls.WINDOW_OVERLAP, budget)
+        if not complete:
+            raise ScanBudgetExceeded(check, len(text), budget)
+        return hits
+    
+    @staticmethod
+    def normalize(text: TextInput) -> NormalizedText:
+        """Normalize a message once; pass the result to every scanner below"""
+        return normalize(text)
+    
+    @classmethod
+    def scan_injection(cls, text: TextInput) -> List[Dict]:
+        """
+        Scan text once for all injection patterns.
+        
+        Returns one entry per match: pattern id (p0, p1, ... in
+        INJECTION_PATTERNS order), the pattern itself and its span
+        in the original text.
+        """
+        rules = cls._rules
+        view = normalize(text).bounded
+        return [{
+            'id': f'p{i}',
+            'pattern': rules.injection_patterns[i],
+            'span': view.to_original(start, end)
+        } for i, start, end in cls._scan(view.text, rules, 'injection', cls.SCAN_BUDGET_SECONDS)]
+    
+    @classmethod
+    def find_injection_patterns(cls, text: TextInput) -> List[str]:
+        """Matched injection patterns in INJECTION_PATTERNS order (no printing)"""
+        matched = {int(hit['id'][1:]): hit['pattern'] for hit in cls.scan_injection(text)}
+        return [matched[i] for i in sorted(matched)]
+    
+    @staticmethod
+    def report_injection(detected: List[str]):
+        """Print the outcome of injection detection"""
+        for pattern in detected:
+            print(f"  🚨 Detected pattern: {pattern}")
+        
+        if detected:
             print(f"  ⚠️ ALERT: {len(detected)} injection pattern(s) detected!")
+    
+    @classmethod
+    def detect_prompt_injection(cls, text: TextInput) -> Tuple[bool, List[str]]:
+        """Detect prompt injection attempts"""
+        detected = cls.find_injection_patterns(text)
+        cls.report_injection(detected)
         
+        is_malicious = len(detected) > 0
         return is_malicious, detected
     
     @classmethod
-    def redact_pii(cls, text: str) -> Tuple[str, List[Dict]]:
-        """Redact personally identifiable information"""
-        redacted_text = text
+    def _find_pii_spans(cls, text: str, rules: Optional[RulePack] = None,
+                        budget: Optional[float] = None) -> List[PIIFinding]:
+        """
+        Find PII spans in one pass over normalized text.
+        
+        Overlapping candidates are resolved by PII_PATTERNS order
+        (earlier patterns win), then by earliest start; a candidate that
+        runs into a higher-priority span is kept only if its pattern still
+        matches the part before that span. Results are sorted by offset
+        and never overlap. budget limits windowed scans of large inputs
+        (None = no limit).
+        """
+        rules = rules or cls._rules
+        candidates = sorted(cls._scan(text, rules, 'pii', budget))
+        
+        starts, ends, accepted = [], [], []
+        for i, start, end in candidates:
+            slot = bisect_left(starts, start)
+            if slot > 0 and ends[slot - 1] > start:
+                continue
+            if slot < len(starts) and starts[slot] < end:
+                # Runs into a higher-priority span - keep the part before it, if it still matches
+                truncated = rules.pii_matchers[i].match(text, start, starts[slot])
+                if not truncated:
+                    continue
+                end = truncated.end()
+            _, replacement, pii_type = rules.pii_patterns[i]
+            starts.insert(slot, start)
+            ends.insert(slot, end)
+            accepted.insert(slot, PIIFinding(pii_type, start, end, replacement))
+        
+        return accepted
+    
+    @classmethod
+    def find_pii(cls, text: TextInput) -> List[PIIFinding]:
+        """PII findings with offsets into the original text, sorted and non-overlapping"""
+        view = normalize(text).bounded
+        return [PIIFinding(finding.type, *view.to_original(finding.start, finding.end), finding.replacement)
+                for finding in cls._find_pii_spans(view.text, budget=cls.SCAN_BUDGET_SECONDS)]
+    
+    @staticmethod
+    def apply_redactions(text: str, findings: List[PIIFinding]) -> str:
+        """Write the redacted text once from offset-sorted findings"""
+        parts = []
+        position = 0
+        for finding in findings:
+            parts.append(text[position:finding.start])
+            parts.append(finding.replacement)
+            position = finding.end
+        parts.append(text[position:])
+        return ''.join(parts)
+    
+    @classmethod
+    def redact_pii_view(cls, text: TextInput) -> Tuple[str, List[PIIFinding], NormalizedText]:
+        """
+        Redact PII from a message and from its normalized view.
+        
+        Returns:
+            (redacted original text, findings with original offsets,
+             redacted normalized view for the scanners that run next)
+        """
+        view = normalize(text)
+        scanned = view.bounded
+        spans = cls._find_pii_spans(scanned.text, budget=cls.SCAN_BUDGET_SECONDS)
+        if not spans:
+            return view.original, [], view
+        findings = [PIIFinding(span.type, *scanned.to_original(span.start, span.end), span.replacement)
+                    for span in spans]
+        if scanned is view:
+            redacted_view = view.redact([(span.start, span.end, span.replacement) for span in spans])
+        else:
+            redacted_view = view.redact_original([(finding.start, finding.end, finding.replacement)
+                                                  for finding in findings])
+        return cls.apply_redactions(view.original, findings), findings, redacted_view
+    
+    @classmethod
+    def redact_pii_with_findings(cls, text: TextInput) -> Tuple[str, List[PIIFinding]]:
+        """Redact PII and return the offset-accurate findings for audit"""
+        redacted_text, findings, _ = cls.redact_pii_view(text)
+        return redacted_text, findings
+    
+    @classmethod
+    def summarize_pii(cls, findings: List[PIIFinding]) -> List[Dict]:
+        """Per-type counts in PII_PATTERNS order, as reported by redact_pii"""
         detected_pii = []
         
-        for pattern, replacement, pii_type in cls.PII_PATTERNS:
-            matches = re.findall(pattern, text)
-            if matches:
+        # Types dropped by a rule reload since the findings were made still get reported
+        pii_types = dict.fromkeys([pii_type for _, _, pii_type in cls._rules.pii_patterns]
+                                  + [finding.type for finding in findings])
+        for pii_type in pii_types:
+            count = sum(1 for finding in findings if finding.type == pii_type)
+            if count:
                 detected_pii.append({
                     'type': pii_type,
-                    'count': len(matches)
+                    'count': count
                 })
-                redacted_text = re.sub(pattern, replacement, redacted_text)
-                print(f"  🔒 Redacted {len(matches)} {pii_type}(s)")
+                print(f"  🔒 Redacted {count} {pii_type}(s)")
         
-        return redacted_text, detected_pii
+        return detected_pii
     
     @classmethod
-    def moderate_content(cls, text: str) -> Tuple[bool, List[str], bool]:
-        """Check for inappropriate content"""
-        text_lower = text.lower()
-        
-        flagged = [word for word in cls.INAPPROPRIATE_KEYWORDS 
-                   if word in text_lower]
+    def redact_pii(cls, text: TextInput) -> Tuple[str, List[Dict]]:
+        """Redact personally identifiable information"""
+        redacted_text, findings = cls.redact_pii_with_findings(text)
+        return redacted_text, cls.summarize_pii(findings)
+    
+    @classmethod
+    def scan_keywords(cls, text: TextInput) -> Dict[str, List[str]]:
+        """Match all keyword lists in one pass; returns label -> matched keywords in list order"""
+        rules = cls._rules
+        return {label: [rules.keyword_lists[label][i] for i in orders]
+                for label, orders in rules.keywords.scan(normalize(text).text, lowercased=True).items()}
+    
+    @classmethod
+    def scan_batch(cls, messages, workers=None, chunk_size: int = 5000):
+        """Scan a list / pandas / Arrow column of messages; see batch_scan.scan_batch"""
+        from batch_scan import scan_batch
+        return scan_batch(messages, workers=workers, chunk_size=chunk_size)
+    
+    @classmethod
+    def check_content(cls, text: TextInput) -> Tuple[bool, List[str], bool]:
+        """(is_inappropriate, flagged keywords, crisis detected) without printing"""
+        keyword_hits = cls.scan_keywords(text)
         
-        crisis_detected = any(keyword in text_lower 
-                            for keyword in cls.CRISIS_KEYWORDS)
+        flagged = keyword_hits['inappropriate']
+        crisis_detected = len(keyword_hits['crisis']) > 0
+        is_inappropriate = len(flagged) > 0
         
+        return is_inappropriate, flagged, crisis_detected
+    
+    @staticmethod
+    def report_moderation(flagged: List[str], crisis_detected: bool):
+        """Print the outcome of content moderation"""
         if flagged:
             print(f"  ⚠️ Content flagged: {', '.join(flagged)}")
         
         if crisis_detected:
             print(f"  🚨 CRISIS DETECTED - Human intervention needed!")
-        
-        is_inappropriate = len(flagged) > 0
+    
+    @classmethod
+    def moderate_content(cls, text: TextInput) -> Tuple[bool, List[str], bool]:
+        """Check for inappropriate content"""
+        is_inappropriate, flagged, crisis_detected = cls.check_content(text)
+        cls.report_moderation(flagged, crisis_detected)
         
         return is_inappropriate, flagged, crisis_detected
     
     @classmethod
-    def validate_output(cls, response: str) -> Tuple[bool, List[str]]:
+    def validate_output(cls, response: TextInput) -> Tuple[bool, List[str]]:
         """Validate AI response is safe and on-topic"""
         issues = []
-        response_lower = response.lower()
-        
-        leakage_indicators = [
-            'system prompt',
-            'my instructions',
-            'i was told to',
-            'my guidelines state'
-        ]
+        view = normalize(response)
+        keyword_hits = cls.scan_keywords(view)
         
-        for indicator in leakage_indicators:
-            if indicator in response_lower:
-                issues.append(f'Prompt leakage: "{indicator}"')
-                print(f"  🚨 Output validation failed: {indicator}")
+        for indicator in keyword_hits['leakage']:
+            issues.append(f'Prompt leakage: "{indicator}"')
+            print(f"  🚨 Output validation failed: {indicator}")
         
-        wcc_keywords = [
-            'wcc', 'washtenaw', 'college', 'program', 'course', 
-            'degree', 'admission', 'enroll', 'student', 'tuition',
-            'financial aid', 'apply', 'transfer', 'campus'
-        ]
+        has_topic = len(keyword_hits['topic']) > 0
         
-        has_topic = any(keyword in response_lower for keyword in wcc_keywords)
-        
-        if not has_topic and len(response) > 100:
+        if not has_topic and len(view.original) > 100:
             issues.append('Response may be off-topic')
             print(f"  ⚠️ Response appears off-topic")
         
@@ -136,15 +323,98 @@ class SecurityGuardrails:
         return is_safe, issues
     
     @staticmethod
-    def log_security_event(event_type: str, message: str, severity: str = "INFO"):
-        """Log security events"""
-        timestamp = datetime.now().isoformat()
-        
-        severity_emoji = {
-            'INFO': 'ℹ️',
-            'WARNING': '⚠️',
-            'CRITICAL': '🚨'
-        }
-        
-        emoji = severity_emoji.get(severity, '📝')
-        print(f"[SECURITY] {emoji} {severity}: {event_type} - {message}")
+    def log_security_event(event_type: str, message: str, severity: str = "INFO") -> Dict:
+        """Log security events (queued for the background writer - does not block)"""
+        return get_security_logger().log(event_type, message, severity)
+
+
+# Cold start: loads the precompiled artifact when it matches the rule file, else compiles in memory
+SecurityGuardrails.load_rules()
+if os.getenv("GUARDRAIL_RULES_RELOAD_SECONDS"):
+    SecurityGuardrails.watch_rules(interval=float(os.getenv("GUARDRAIL_RULES_RELOAD_SECONDS")))
+
+
+class StreamingOutputValidator:
+    """
+    Incremental version of SecurityGuardrails.validate_output for streamed responses.
+    
+    Each chunk is scanned together with a short rolling window of the text
+    before it, so leakage phrases split across chunks are still caught.
+    Text is released to the caller only once it is scanned, is outside the
+    hold-back tail where a leakage phrase could still be completing, and a
+    topic keyword has been seen - otherwise it is held until finish().
+    """
+    
+    _LEADING_WORD = re.compile(r'\w*')
+    _TRAILING_WORD = re.compile(r'\w*\Z')
+    
+    def __init__(self):
+        longest = max(len(indicator) for indicator in SecurityGuardrails.active_rules().keyword_lists['leakage'])
+        self.holdback = longest
+        self.window_size = 4 * longest
+        self.issues: List[str] = []
+        self.has_topic = False
+        self.length = 0
+        self._context = ''
+        self._pending = ''
+        self._unreleased = ''
+    
+    @property
+    def leaked(self) -> bool:
+        """True once a leakage indicator has been seen"""
+        return len(self.issues) > 0
+    
+    def _scan(self, text: str):
+        """Scan the rolling window plus newly completed words"""
+        keyword_hits = SecurityGuardrails.scan_keywords(self._context + text)
+        for indicator in keyword_hits['leakage']:
+            issue = f'Prompt leakage: "{indicator}"'
+            if issue not in self.issues:
+                self.issues.append(issue)
+                print(f"  🚨 Output validation failed mid-stream: {indicator}")
+        self.has_topic = self.has_topic or len(keyword_hits['topic']) > 0
+        
+        window = (self._context + text)[-self.window_size:]
+        if len(self._context) + len(text) > self.window_size:
+            # Drop the leading partial word so it cannot form a false match
+            window = window[self._LEADING_WORD.match(window).end():]
+        self._context = window
+    
+    def _release(self, keep: int) -> str:
+        """Hand over everything but the last `keep` unreleased characters"""
+        if self.leaked or not self.has_topic:
+            return ''
+        cut = max(0, len(self._unreleased) - keep)
+        released, self._unreleased = self._unreleased[:cut], self._unreleased[cut:]
+        return released
+    
+    def feed(self, chunk: str) -> str:
+        """Validate one streamed chunk; returns the text that is now safe to show"""
+        self.length += len(chunk)
+        self._unreleased += chunk
+        self._pending += chunk
+        
+        # Only complete words are scanned - the trailing word may continue in the next chunk
+        cut = self._TRAILING_WORD.search(self._pending).start()
+        complete, self._pending = self._pending[:cut], self._pending[cut:]
+        if complete:
+            self._scan(complete)
+        
+        return self._release(len(self._pending) + self.holdback)
+    
+    def finish(self) -> Tuple[bool, List[str], str]:
+        """Scan the remainder; returns (is_safe, issues, remaining text to show)"""
+        if self._pending:
+            self._scan(self._pending)
+            self._pending = ''
+        
+        if not self.has_topic and self.length > 100:
+            self.issues.append('Response may be off-topic')
+            print(f"  ⚠️ Response appears off-topic")
+        
+        is_safe = len(self.issues) == 0
+        if not is_safe:
+            return is_safe, self.issues, ''
+        
+        remaining, self._unreleased = self._unreleased, ''
+        return is_safe, self.issues, remaining
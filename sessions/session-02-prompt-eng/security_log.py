@@ -0,0 +1,297 @@
+"""
+Structured Security Event Log
+Non-blocking logger with rotating JSONL segments, plus a small query tool
+
+Query from the command line:
+    python security_log.py --since 1h
+    python security_log.py --type PROMPT_INJECTION --severity CRITICAL
+"""
+
+import atexit
+import json
+import mmap
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_LOG_DIR = os.getenv("SECURITY_LOG_DIR", str(Path(__file__).parent / "security_logs"))
+
+SEVERITY_EMOJI = {
+    'INFO': 'ℹ️',
+    'WARNING': '⚠️',
+    'CRITICAL': '🚨'
+}
+
+_STOP = object()
+
+
+class SecurityEventLogger:
+    """
+    Asynchronous security event logger.
+
+    log() only builds a small dict and puts it on a bounded queue
+    without waiting, so the request path returns immediately; when the
+    writer falls behind and the queue is full, new events are dropped
+    and counted in stats['dropped'] rather than blocking or growing
+    memory. A background writer thread drains the queue in batches and
+    appends them to JSONL segment files, rotating by size and age.
+    Segments are append-only; a finished segment is never rewritten.
+
+    An event that cannot be written (not JSON-serializable, disk full)
+    is counted in stats['failed'] and the writer carries on; the first
+    failure is printed once.
+    """
+
+    def __init__(
+        self,
+        log_dir: str = DEFAULT_LOG_DIR,
+        segment_max_bytes: int = 16 * 1024 * 1024,
+        segment_max_seconds: float = 3600,
+        batch_size: int = 512,
+        flush_interval: float = 0.5,
+        max_queue: int = 10000,
+        echo: bool = False
+    ):
+        """
+        Args:
+            log_dir: Directory for segment files
+            segment_max_bytes: Rotate when the current segment reaches this size
+            segment_max_seconds: Rotate when the current segment is this old
+            batch_size: Max events written per batch
+            flush_interval: Max seconds an event waits before being written
+            max_queue: Events allowed to wait for the writer; further events are dropped
+            echo: Also print each event to the console (from the writer thread)
+        """
+        self.log_dir = Path(log_dir)
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_seconds = segment_max_seconds
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.echo = echo
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._segment = None
+        self._segment_opened = 0.0
+        self._segment_bytes = 0
+        self._reported_failure = False
+        # Updated from every caller thread (drops) and the writer - always under _stats_lock
+        self._stats = {'written': 0, 'dropped': 0, 'failed': 0}
+        self._stats_lock = threading.Lock()
+
+    def log(self, event_type: str, message: str, severity: str = "INFO", **fields) -> Dict:
+        """Queue one event and return it; never blocks, drops the event when the queue is full"""
+        event = {
+            'ts': time.time(),
+            'type': event_type,
+            'severity': severity,
+            'message': message,
+            **fields
+        }
+        if self._writer is None:
+            self._start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._count('dropped')
+        return event
+
+    def _start(self):
+        """Start the writer thread on first use"""
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name="security-log-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        """Writer loop: block for one event, then drain up to a batch"""
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(event is _STOP for event in batch)
+            records = self._encode([event for event in batch if event is not _STOP])
+            try:
+                self._write(records)
+            except Exception as e:
+                # A failed write must not kill the writer - count the batch as lost and reopen next time
+                self._failed(len(records), e)
+                try:
+                    self._close_segment()
+                except OSError:
+                    self._segment = None
+            if stop:
+                self._close_segment()
+                return
+
+    def _encode(self, events: List[Dict]) -> List[Tuple[Dict, str]]:
+        """(event, JSON line) per event, skipping events that cannot be serialized"""
+        records = []
+        for event in events:
+            try:
+                records.append((event, json.dumps(event, ensure_ascii=False) + '\n'))
+            except (TypeError, ValueError) as e:
+                self._failed(1, e)
+        return records
+
+    def _count(self, field: str, count: int = 1):
+        with self._stats_lock:
+            self._stats[field] += count
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of the written / dropped / failed event counters"""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _failed(self, count: int, error: Exception):
+        """Count lost events; print the first failure only, so a full disk does not flood the console"""
+        self._count('failed', count)
+        if not self._reported_failure:
+            self._reported_failure = True
+            print(f"⚠️ Security log write failed, events are being lost (see stats['failed']): {error}")
+
+    def _write(self, records: List[Tuple[Dict, str]]):
+        """Append one batch to the current segment"""
+        if not records:
+            return
+        segment = self._current_segment()
+        data = ''.join(line for _, line in records).encode('utf-8')
+        segment.write(data)
+        segment.flush()
+        self._segment_bytes += len(data)
+        self._count('written', len(records))
+
+        if self.echo:
+            for event, _ in records:
+                emoji = SEVERITY_EMOJI.get(event['severity'], '📝')
+                print(f"[SECURITY] {emoji} {event['severity']}: {event['type']} - {event['message']}")
+
+    def _current_segment(self):
+        """Open a new segment when none is open or the current one is full or old"""
+        now = time.time()
+        if self._segment is not None and (
+            self._segment_bytes >= self.segment_max_bytes
+            or now - self._segment_opened >= self.segment_max_seconds
+        ):
+            self._close_segment()
+
+        if self._segment is None:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            name = f"security-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}.jsonl"
+            self._segment = open(self.log_dir / name, 'ab')
+            self._segment_opened = now
+            self._segment_bytes = 0
+        return self._segment
+
+    def _close_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def close(self, timeout: float = 5.0):
+        """Flush queued events and stop the writer"""
+        if self._writer is not None and self._writer.is_alive():
+            try:
+                # Waits for room when the queue is full, so queued events are still written
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                return
+            self._writer.join(timeout)
+
+
+_default_logger: Optional[SecurityEventLogger] = None
+_default_lock = threading.Lock()
+
+
+def get_security_logger() -> SecurityEventLogger:
+    """Process-wide logger (SECURITY_LOG_DIR sets the directory, SECURITY_LOG_ECHO=1 echoes events)"""
+    global _default_logger
+    if _default_logger is None:
+        with _default_lock:
+            if _default_logger is None:
+                _default_logger = SecurityEventLogger(echo=os.getenv("SECURITY_LOG_ECHO") == "1")
+    return _default_logger
+
+
+def iter_events(log_dir: str = DEFAULT_LOG_DIR):
+    """Yield events from every segment, memory-mapping each file"""
+    for path in sorted(Path(log_dir).glob("security-*.jsonl")):
+        if path.stat().st_size == 0:
+            continue
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b''):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Partial last line of a segment still being written
+                    continue
+
+
+def count_events(
+    log_dir: str = DEFAULT_LOG_DIR,
+    event_type: Optional[str] = None,
+    severity: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None
+) -> Counter:
+    """
+    Count events by (type, severity), optionally filtered.
+
+    Args:
+        since / until: Unix timestamps bounding the time window
+    """
+    counts = Counter()
+    for event in iter_events(log_dir):
+        if event_type and event.get('type') != event_type:
+            continue
+        if severity and event.get('severity') != severity:
+            continue
+        ts = event.get('ts', 0)
+        if (since is not None and ts < since) or (until is not None and ts >= until):
+            continue
+        counts[(event.get('type'), event.get('severity'))] += 1
+    return counts
+
+
+def _parse_window(value: str) -> float:
+    """'90s', '15m', '2h', '7d' -> seconds"""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    return float(value[:-1]) * units[value[-1]] if value[-1] in units else float(value)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Count security events")
+    parser.add_argument("--dir", default=DEFAULT_LOG_DIR, help="log directory")
+    parser.add_argument("--type", help="event type, e.g. PROMPT_INJECTION")
+    parser.add_argument("--severity", help="INFO, WARNING or CRITICAL")
+    parser.add_argument("--since", help="only the last N s/m/h/d, e.g. 1h")
+    args = parser.parse_args()
+
+    since = time.time() - _parse_window(args.since) if args.since else None
+    counts = count_events(args.dir, args.type, args.severity, since)
+
+    print(f"{'TYPE':<24} {'SEVERITY':<10} {'COUNT':>8}")
+    print("-" * 44)
+    for (event_type, severity), count in counts.most_common():
+        print(f"{event_type:<24} {severity:<10} {count:>8}")
+    print("-" * 44)
+    print(f"{'TOTAL':<35} {sum(counts.values()):>8}")
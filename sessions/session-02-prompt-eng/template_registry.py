@@ -0,0 +1,144 @@
+"""
+Prompt Template Registry
+Compact prompt templates once at import and account for their token footprint
+
+Print the per-pattern token report:
+    python template_registry.py
+"""
+
+import inspect
+import re
+from functools import cached_property
+from typing import Callable, Dict, Iterator, NamedTuple, Tuple
+
+try:
+    # Local BPE tokenizer (pip install tiktoken); Gemini's own tokenizer is only reachable via the API
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+SLOT = "{user_query}"
+
+_BLANK_LINES = re.compile(r'\n{3,}')
+_INNER_SPACES = re.compile(r'(?<=\S) {2,}')
+_ESTIMATE_TOKENS = re.compile(r"\w+|[^\w\s]| {2,}|\s")
+
+
+def compact(text: str) -> str:
+    """
+    Remove whitespace that is only there because of the source code layout.
+
+    Strips the common indentation (the first line is exempt, as in a
+    docstring), trailing spaces, runs of spaces inside a line and more
+    than one blank line in a row. Relative indentation - e.g. inside a
+    JSON example - is kept.
+    """
+    text = inspect.cleandoc(text)
+    lines = [_INNER_SPACES.sub(' ', line.rstrip()) for line in text.split('\n')]
+    return _BLANK_LINES.sub('\n\n', '\n'.join(lines))
+
+
+def _load_counter() -> Tuple[str, Callable[[str], int]]:
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.get_encoding("cl100k_base")
+            return "tiktoken cl100k_base", lambda text: len(encoding.encode(text))
+        except Exception:
+            # The encoding file could not be loaded (e.g. offline first run)
+            pass
+    # Rough BPE-like estimate: a token per word, punctuation mark and whitespace run
+    return "estimate (tiktoken not available)", lambda text: len(_ESTIMATE_TOKENS.findall(text))
+
+
+class Footprint(NamedTuple):
+    """Token cost of one template, excluding the query itself"""
+    raw_tokens: int
+    compact_tokens: int
+
+    @property
+    def saved(self) -> float:
+        return 1 - self.compact_tokens / self.raw_tokens if self.raw_tokens else 0.0
+
+
+class PromptTemplate:
+    """
+    One compacted prompt pattern.
+
+    The static instruction and the text around the query slot are
+    compacted once, when the template is registered; render() then only
+    concatenates the query between the two precomputed pieces (no
+    str.format, so braces in a query are harmless).
+    """
+
+    def __init__(self, name: str, instruction: str, user_turn: str):
+        """
+        Args:
+            name: Pattern name (e.g. 'advanced')
+            instruction: Static part - role, rules, examples
+            user_turn: Per-query part, with one {user_query} slot
+        """
+        if user_turn.count(SLOT) != 1:
+            raise ValueError(f"Template '{name}' must contain exactly one {SLOT} slot")
+        self.name = name
+        self.raw_instruction = instruction
+        self.raw_user_turn = user_turn
+        self.instruction = compact(instruction)
+        self._before, self._after = compact(user_turn).split(SLOT)
+
+    def render(self, user_query: str) -> str:
+        """The per-query part of the prompt"""
+        return self._before + user_query + self._after
+
+    @cached_property
+    def footprint(self) -> Footprint:
+        """Token cost before and after compaction (counted on first use - the tokenizer is slow to load)"""
+        _, count = token_counter()
+        raw = count(self.raw_instruction) + count(self.raw_user_turn.replace(SLOT, ''))
+        compacted = count(self.instruction) + count(self._before + self._after)
+        return Footprint(raw, compacted)
+
+
+_counter = None
+
+
+def token_counter() -> Tuple[str, Callable[[str], int]]:
+    """Shared (name, token counter): tiktoken's cl100k_base when installed, otherwise an estimate"""
+    global _counter
+    if _counter is None:
+        _counter = _load_counter()
+    return _counter
+
+
+class TemplateRegistry:
+    """Named prompt templates, compacted at registration"""
+
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def register(self, name: str, instruction: str, user_turn: str) -> PromptTemplate:
+        template = PromptTemplate(name, instruction, user_turn)
+        self._templates[name] = template
+        return template
+
+    def __getitem__(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def __iter__(self) -> Iterator[PromptTemplate]:
+        return iter(self._templates.values())
+
+    def report(self) -> str:
+        """Per-pattern token cost before and after compaction"""
+        counter, _ = token_counter()
+        lines = [f"Prompt template token footprint - {counter}",
+                 f"{'pattern':<20}{'raw':>8}{'compact':>10}{'saved':>9}"]
+        for template in self:
+            footprint = template.footprint
+            lines.append(f"{template.name:<20}{footprint.raw_tokens:>8}{footprint.compact_tokens:>10}"
+                         f"{footprint.saved:>9.1%}")
+        return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    from prompt_patterns import TEMPLATES
+
+    print(TEMPLATES.report())
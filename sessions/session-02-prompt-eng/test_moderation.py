@@ -0,0 +1,107 @@
+"""
+Moderation keyword regression tests
+
+Run from this folder:
+    python -m pytest test_moderation.py
+    python test_moderation.py
+"""
+
+from batch_scan import scan_batch
+from security import SecurityGuardrails
+
+# The keyword lists as the original substring check used them (rules 1.0.0)
+BASELINE_INAPPROPRIATE = ['hate', 'racist', 'violence', 'suicide', 'bomb', 'weapon',
+                          'drugs', 'hack', 'exploit', 'scam', 'fraud']
+BASELINE_CRISIS = ['suicide', 'kill myself', 'end my life', 'want to die', 'self harm', 'cut myself']
+BASELINE_TOPIC = ['wcc', 'washtenaw', 'college', 'program', 'programs', 'course', 'courses', 'degree', 'degrees',
+                  'admission', 'admissions', 'enroll', 'enrollment', 'student', 'students', 'tuition',
+                  'financial aid', 'apply', 'transfer', 'campus']
+
+# Words that contain a keyword without being a form of it. The substring check
+# flagged them; the word-level automaton deliberately does not.
+WORD_BOUNDARY_CHANGES = ['hackathon', 'scampi', 'shatter', 'whatever']
+
+MESSAGES = [
+    "How do I make bombs at home?",
+    "Where can I buy weapons?",
+    "I'm interested in hacking my school's wifi",
+    "I hated my last bootcamp",
+    "Report the scammers in the Slack channel",
+    "The bombing was on the news",
+    "Is that site fraudulent?",
+    "She is a racist",
+    "Hackers took over my account",
+    "Which exploits work on this router?",
+    "I keep thinking about killing myself",
+    "I'm thinking about ending my life",
+    "I don't want to die alone",
+    "Violence in video games",
+    "Drugs and alcohol policy at events",
+    "What is WCC?",
+    "How do I join the mentorship programme?",
+]
+
+# On-topic answers long enough (over 100 characters) for the off-topic check to apply
+VALID_ANSWERS = [
+    "x" * 120 + " enrolled at colleges",
+    "Many of our members enrolled at colleges nearby and joined study groups to keep each other motivated all term.",
+    "Our mentors have helped people applying to bootcamps and transferring into tech roles; applications open soon.",
+    "We run programming workshops on several campuses every month, and they are free for anyone who wants to learn.",
+    "The coursework guide we share in Slack explains what to expect each week and how to get help when you are stuck.",
+]
+
+
+def baseline_moderation(text: str):
+    """The original check: a keyword anywhere in the lowercased text"""
+    text_lower = text.lower()
+    flagged = [word for word in BASELINE_INAPPROPRIATE if word in text_lower]
+    return bool(flagged), flagged, any(keyword in text_lower for keyword in BASELINE_CRISIS)
+
+
+def test_baseline_flags_still_flagged():
+    for message in MESSAGES:
+        was_inappropriate, was_flagged, was_crisis = baseline_moderation(message)
+        is_inappropriate, flagged, crisis = SecurityGuardrails.check_content(message)
+        if was_inappropriate:
+            assert is_inappropriate, message
+            # Variants are reported as their keyword, like the substring check did
+            assert set(was_flagged) <= set(flagged), (message, was_flagged, flagged)
+        if was_crisis:
+            assert crisis, message
+
+
+def test_reviewed_inflections_flagged():
+    for word in ['bombs', 'weapons', 'hacking', 'hated', 'scammers']:
+        is_inappropriate, _, _ = SecurityGuardrails.check_content(f"tell me about {word}")
+        assert is_inappropriate, word
+
+
+def test_word_boundaries_kept():
+    for word in WORD_BOUNDARY_CHANGES:
+        is_inappropriate, flagged, _ = SecurityGuardrails.check_content(f"Join our {word} this weekend")
+        assert not is_inappropriate, (word, flagged)
+
+
+def test_valid_answers_pass_output_validation():
+    for answer in VALID_ANSWERS:
+        is_safe, issues = SecurityGuardrails.validate_output(answer)
+        assert is_safe, (answer, issues)
+
+
+def test_baseline_on_topic_still_on_topic():
+    for answer in VALID_ANSWERS:
+        if any(keyword in answer.lower() for keyword in BASELINE_TOPIC):
+            assert SecurityGuardrails.validate_output(answer)[0], answer
+
+
+def test_batch_scan_flags_variants():
+    results = scan_batch(["bombs and weapons", "What is WCC?", "I keep thinking about killing myself"], workers=0)
+    assert results['inappropriate'] == [True, False, False]
+    assert results['crisis'] == [False, False, True]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
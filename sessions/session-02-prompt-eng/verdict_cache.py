@@ -0,0 +1,97 @@
+"""
+Guardrail Verdict Cache
+Skip the regex stages for repeated (FAQ-style) messages
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+
+class GuardrailVerdict(NamedTuple):
+    """Outcome of the input guardrails - rule names and flags only, never message text"""
+    is_injection: bool
+    injection_patterns: Tuple[str, ...] = ()
+    is_inappropriate: bool = False
+    flagged_words: Tuple[str, ...] = ()
+    is_crisis: bool = False
+
+
+def normalize_for_fingerprint(text: str) -> str:
+    """
+    Fold only differences no guardrail rule can see: case and outer whitespace.
+    
+    Inner whitespace is kept because it can decide whether a PII pattern
+    matches (e.g. a phone number allows one separator between groups).
+    Normalized views (normalization.py) already have collapsed whitespace,
+    which the scanners themselves see, so keying on them is equally safe.
+    """
+    return text.strip().lower()
+
+
+class VerdictCache:
+    """
+    Bounded LRU cache with TTL for combined guardrail verdicts.
+
+    Keys are SHA-256 digests of (rule set version, normalized message),
+    so no raw text is held, and verdicts only hold rule names and flags.
+    Verdicts are stored for messages without PII (their redacted form is
+    the message itself) and for messages blocked at injection detection,
+    which never reach redaction.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, GuardrailVerdict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(message: str, rules_version: str) -> str:
+        """Cache key for a message (ideally its normalized view text) under a given rule set"""
+        normalized = normalize_for_fingerprint(message)
+        return hashlib.sha256(f"{rules_version}\0{normalized}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[GuardrailVerdict]:
+        """Return the cached verdict, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, verdict: GuardrailVerdict):
+        """Store a verdict, evicting the least recently used entries when full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, verdict)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> dict:
+        """Hit / miss counters"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self._entries)
+        }
+
+
+# Shared by all chatbots in the process
+shared_verdict_cache = VerdictCache()
@@ -0,0 +1,115 @@
+"""
+Windowed Pattern Scanning
+Linear-cost, time-budgeted regex scanning for very large inputs (pasted CVs, log dumps)
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Optional, Tuple
+
+# (pattern index, start, end)
+Hit = Tuple[int, int, int]
+
+
+def scan_positions(text: str, scanner, matchers, start: int = 0, end: Optional[int] = None) -> List[Hit]:
+    """
+    Run one combined scan and return (pattern index, start, end) for every
+    pattern that matches at every hit position.
+
+    start / end bound the scan like the pos / endpos arguments of re, so
+    a window is scanned in place (no slicing) and \\b still sees the
+    characters just outside it.
+    """
+    end = len(text) if end is None else end
+    search = scanner.search
+    hits = []
+
+    match = search(text, start, end)
+    while match:
+        position = match.start()
+        for i, matcher in enumerate(matchers):
+            pattern_match = matcher.match(text, position, end)
+            if pattern_match:
+                hits.append((i, position, pattern_match.end()))
+        match = search(text, position + 1, end)
+
+    return hits
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _window_pool() -> ThreadPoolExecutor:
+    """Shared pool for window scans, created on first large input"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1),
+                                           thread_name_prefix="scan-window")
+    return _pool
+
+
+def scan_windows(
+    text: str,
+    scanner,
+    matchers,
+    window: int = 4096,
+    overlap: int = 256,
+    budget: Optional[float] = None
+) -> Tuple[List[Hit], bool]:
+    """
+    Scan text in overlapping windows and merge the hits into document offsets.
+
+    Window k covers [k * step, k * step + window) with step = window - overlap
+    and owns the hits that start in its first `step` characters (the last
+    window owns the rest), so every match of up to `overlap` characters is
+    reported exactly once. Hits that run into the end of a window are left
+    to the window that owns them. Each window's cost is bounded by its
+    size, which makes the total grow linearly with the input even on the
+    backtracking `re` backend.
+
+    Windows run on a shared thread pool; with a backend that releases the
+    GIL (re2) they scan in parallel, with `re` they still run one at a time.
+
+    Args:
+        budget: Seconds allowed for the whole scan (None = no limit).
+            Windows not started when it runs out are skipped.
+
+    Returns:
+        (hits sorted by start, complete) - complete is False when the budget
+        ran out before every window was scanned
+    """
+    length = len(text)
+    step = window - overlap
+    if length <= window or step <= 0:
+        return scan_positions(text, scanner, matchers), True
+
+    deadline = None if budget is None else time.monotonic() + budget
+
+    def scan(window_start):
+        if deadline is not None and time.monotonic() > deadline:
+            return None
+        window_end = min(window_start + window, length)
+        owned_end = length if window_end == length else window_start + step
+        return [hit for hit in scan_positions(text, scanner, matchers, window_start, window_end)
+                if hit[1] < owned_end and (hit[2] < window_end or window_end == length)]
+
+    starts = range(0, length - overlap, step)
+    futures = [_window_pool().submit(scan, window_start) for window_start in starts]
+    done, pending = wait(futures, timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+    for future in pending:
+        future.cancel()
+
+    hits = []
+    complete = not pending
+    for future in futures:
+        window_hits = future.result() if future in done else None
+        if window_hits is None:
+            complete = False
+            continue
+        hits.extend(window_hits)
+    return hits, complete
@@ -0,0 +1,226 @@
+"""
+Conversation Memory
+Recent turns verbatim, older turns folded into a running summary - under a hard token budget
+
+Usage:
+    from conversation_memory import ConversationMemory
+
+    memory = ConversationMemory(backend, max_tokens=2000)
+    reply = backend.generate(memory.prompt(user_message), system_instruction).text
+    memory.add_turn(user_message, reply)      # after the reply is shown; folding runs in the background
+
+The prompt sent for a turn holds at most max_tokens of history (summary
+plus verbatim turns) however long the session runs, so every turn costs
+about the same. Once the verbatim turns pass fold_at of their share, the
+oldest are summarized by a background model call in the batch lane of
+the rate scheduler; they stay in the prompt until the new summary is
+ready, unless that would break the budget.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from llm_backends import LLMBackend, estimate_token_count
+from rate_scheduler import Priority, estimate_tokens
+from resilient_call import caller_for
+
+SUMMARY_INSTRUCTION = (
+    "You maintain the memory of a chat between a user and an assistant. Merge the earlier summary and the "
+    "new exchanges into one updated summary of at most {words} words. Keep names, facts the user shared "
+    "about themselves, their goals and questions, and any answers or commitments the assistant gave. "
+    "Drop greetings and small talk. Reply with the summary only."
+)
+
+# Summaries are never urgent - a slow one only means older turns stay verbatim a little longer
+summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-summary")
+
+
+class Turn(NamedTuple):
+    role: str       # "user" | "model"
+    text: str
+    tokens: int     # counted once, when the turn is added
+
+
+def transcript(turns: List[Turn]) -> str:
+    """Turns as a plain 'User: ... / Assistant: ...' transcript"""
+    return "\n".join(f"{'User' if turn.role == 'user' else 'Assistant'}: {turn.text}" for turn in turns)
+
+
+def backend_summarizer(backend: LLMBackend, max_words: int, timeout: float = 30.0) -> Callable[[str, List[Turn]], str]:
+    """summarize(previous_summary, turns) -> new summary, as one batch-priority model call"""
+    instruction = SUMMARY_INSTRUCTION.format(words=max_words)
+    caller = caller_for(backend.kind)
+
+    def summarize(previous: str, turns: List[Turn]) -> str:
+        prompt = f"Earlier summary:\n{previous or '(none)'}\n\nNew exchanges:\n{transcript(turns)}"
+        return caller.call(
+            lambda remaining: backend.generate(prompt, instruction, remaining),
+            deadline=timeout,
+            hedge=False,
+            priority=Priority.BATCH,
+            tokens=estimate_tokens(instruction + prompt, max_words * 2)
+        ).text.strip()
+
+    return summarize
+
+
+class ConversationMemory:
+    """
+    One conversation's context under a fixed token budget.
+
+    The budget is split between the running summary (summary_tokens)
+    and the turns kept verbatim (the rest). Turns leave the verbatim
+    window oldest first, a user turn together with its reply, and are
+    handed to summarize() in a worker thread; only one fold per
+    conversation runs at a time and turns that arrive meanwhile wait for
+    the next. If a fold fails, the turns it covered are dropped and the
+    old summary kept - memory stays bounded either way.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[LLMBackend] = None,
+        max_tokens: int = 2000,
+        summary_tokens: int = 400,
+        fold_at: float = 0.75,
+        summarize: Optional[Callable[[str, List[Turn]], str]] = None,
+        count_tokens: Callable[[str], int] = estimate_token_count,
+        executor: Optional[ThreadPoolExecutor] = None
+    ):
+        """
+        Args:
+            backend: Model backend that writes the summaries (unless summarize is given)
+            max_tokens: Most history tokens a prompt may carry, summary included
+            summary_tokens: Share of max_tokens reserved for the summary
+            fold_at: Fraction of the verbatim share that starts a fold; it folds down to half
+            summarize: summarize(previous_summary, turns) -> summary; default: backend_summarizer
+            count_tokens: Token counter for turns - local and free by default, as it runs every turn
+            executor: Where folds run (default: summary_executor)
+        """
+        if summary_tokens >= max_tokens:
+            raise ValueError("summary_tokens must leave part of max_tokens for verbatim turns")
+        if summarize is None:
+            if backend is None:
+                raise ValueError("ConversationMemory needs a backend or a summarize function")
+            # A word is about 1.3 tokens
+            summarize = backend_summarizer(backend, max(20, int(summary_tokens / 1.3)))
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.fold_at = fold_at
+        self.summarize = summarize
+        self.count_tokens = count_tokens
+        self.executor = executor or summary_executor
+        self.summary = ""
+        self._summary_tokens_used = 0
+        self._folding: List[Turn] = []   # handed to the running fold, still shown until it lands
+        self._waiting: List[Turn] = []   # out of the verbatim window, for the next fold
+        self._recent: List[Turn] = []
+        self._fold: Optional[Future] = None
+        self._generation = 0             # bumped by clear() so a fold in flight is discarded
+        self._lock = threading.Lock()
+        # Set when a message in this conversation hit the crisis check; its follow-ups jump the rate queue
+        self.crisis_detected = False
+        self.stats = {'turns': 0, 'folds': 0, 'failed_folds': 0, 'dropped_turns': 0}
+
+    @property
+    def verbatim_budget(self) -> int:
+        return self.max_tokens - self.summary_tokens
+
+    def add_turn(self, user_message: str, reply: str):
+        """Record an exchange; call once the reply has been delivered. Never blocks on a model call."""
+        with self._lock:
+            self._recent.append(Turn("user", user_message, self.count_tokens(user_message)))
+            self._recent.append(Turn("model", reply, self.count_tokens(reply)))
+            self.stats['turns'] += 1
+            if self._tokens(self._recent) > self.verbatim_budget * self.fold_at:
+                self._evict(self.verbatim_budget // 2)
+            self._start_fold()
+
+    def prompt(self, user_message: str) -> List[Dict]:
+        """The conversation to send for the next turn: summary, remembered turns and user_message"""
+        with self._lock:
+            budget = self.max_tokens - self._summary_tokens_used
+            turns = self._folding + self._waiting + self._recent
+            # Keep the newest turns that fit, whole exchanges only
+            total = self._tokens(turns)
+            start = 0
+            while total > budget and start < len(turns):
+                total -= turns[start].tokens + turns[start + 1].tokens
+                start += 2
+            turns = turns[start:]
+            summary = self.summary
+        contents = [{"role": turn.role, "parts": [turn.text]} for turn in turns]
+        contents.append({"role": "user", "parts": [user_message]})
+        if summary:
+            # Part of the first user turn, so turns still alternate user / model
+            contents[0]["parts"].insert(0, f"(Summary of our conversation so far: {summary})\n")
+        return contents
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until pending folds are done (tests, or before saving a transcript)"""
+        while True:
+            with self._lock:
+                fold = self._fold
+            if fold is None:
+                return
+            fold.exception(timeout)
+
+    def clear(self):
+        """Forget the conversation; a fold still running is discarded when it finishes"""
+        with self._lock:
+            self.summary = ""
+            self._summary_tokens_used = 0
+            self._folding, self._waiting, self._recent = [], [], []
+            self._generation += 1
+            self.crisis_detected = False
+
+    @staticmethod
+    def _tokens(turns: List[Turn]) -> int:
+        return sum(turn.tokens for turn in turns)
+
+    def _evict(self, target: int):
+        """Move the oldest exchanges out of the verbatim window until it is at most target tokens. Lock held."""
+        while len(self._recent) > 2 and self._tokens(self._recent) > target:
+            self._waiting.extend(self._recent[:2])
+            del self._recent[:2]
+        # Only while a fold is slower than the conversation: keep the next fold's input bounded too
+        while self._tokens(self._waiting) > self.max_tokens:
+            del self._waiting[:2]
+            self.stats['dropped_turns'] += 1
+
+    def _start_fold(self):
+        """Hand the waiting turns to a background fold if none is running. Lock held."""
+        if self._fold is not None or not self._waiting:
+            return
+        self._folding, self._waiting = self._waiting, []
+        self._fold = self.executor.submit(self._run_fold, self.summary, list(self._folding), self._generation)
+
+    def _run_fold(self, previous: str, turns: List[Turn], generation: int):
+        try:
+            summary = self.summarize(previous, turns)
+        except Exception as e:
+            summary, error = None, e
+        else:
+            error = None
+        with self._lock:
+            self._fold = None
+            if generation != self._generation:
+                # Cleared meanwhile - nothing to keep, but turns added since may be waiting
+                self._start_fold()
+                return
+            if error is None:
+                tokens = self.count_tokens(summary)
+                if tokens > self.summary_tokens:
+                    # Hard cap - a summarizer that ignores its word limit must not eat the turns' share
+                    summary = summary[:len(summary) * self.summary_tokens // tokens].rsplit(' ', 1)[0] + " ..."
+                    tokens = self.count_tokens(summary)
+                self.summary = summary
+                self._summary_tokens_used = tokens
+                self.stats['folds'] += 1
+            else:
+                print(f"⚠️ Conversation summary failed, {len(turns) // 2} older exchanges dropped: {error}")
+                self.stats['failed_folds'] += 1
+                self.stats['dropped_turns'] += len(turns) // 2
+            self._folding = []
+            self._start_fold()
@@ -0,0 +1,394 @@
+"""
+LLM Backends
+One interface for generate, stream, count-tokens and moderation calls, with Gemini, OpenAI and local adapters
+
+Usage:
+    from llm_backends import create_backend
+
+    backend = create_backend()          # LLM_BACKEND=gemini (default) | openai | local
+    completion = backend.generate("What is WCC?", system_instruction="You are WCC Alexa.", timeout=30)
+    print(completion.text, completion.total_tokens)
+    for text in backend.stream("How do I join?"):
+        print(text, end="")
+
+The local backend talks to the stand-in server in local_llm_server.py, so
+the bots can be load-tested and benchmarked without network access or quota:
+    python utilities/local_llm_server.py --latency lognormal:0.8,0.4 --error-rate 0.02
+    LLM_BACKEND=local python sessions/session-02-prompt-eng/demo.py
+"""
+
+import asyncio
+import dataclasses
+import json
+import os
+import re
+import socket
+import urllib.error
+import urllib.request
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Union
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+# A plain prompt, or a conversation in Gemini's format: [{"role": "user" | "model", "parts": [text, ...]}]
+Prompt = Union[str, List[Dict[str, Any]]]
+
+DEFAULT_MODELS = {'gemini': 'gemini-2.5-flash-lite', 'openai': 'gpt-4o-mini', 'local': 'local-stand-in'}
+DEFAULT_LOCAL_URL = "http://127.0.0.1:8765"
+
+_ESTIMATE_TOKENS = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_token_count(text: str) -> int:
+    """Rough BPE-like count: a token per word and punctuation mark"""
+    return len(_ESTIMATE_TOKENS.findall(text))
+
+
+def prompt_text(prompt: Prompt) -> str:
+    """A conversation flattened to one text, for backends without turns"""
+    if isinstance(prompt, str):
+        return prompt
+    return "\n".join(f"{turn['role']}: {' '.join(str(part) for part in turn['parts'])}" for turn in prompt)
+
+
+class Completion(NamedTuple):
+    """One model response, with its token usage when the backend reports it"""
+    text: str
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+
+    @property
+    def total_tokens(self) -> Optional[int]:
+        if self.input_tokens is None or self.output_tokens is None:
+            return None
+        return self.input_tokens + self.output_tokens
+
+
+class Moderation(NamedTuple):
+    """Moderation verdict: flagged, the category names that triggered it, and per-category scores if the API gives them"""
+    flagged: bool
+    categories: tuple = ()
+    scores: Optional[Dict[str, float]] = None
+
+
+class BackendError(Exception):
+    """A request the backend rejected (bad request, auth, ...) - retrying won't help"""
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        self.code = code
+        super().__init__(message)
+
+
+class UpstreamError(ConnectionError):
+    """Rate limiting (code 429), overload or a server error - retryable, see resilient_call.RETRYABLE_ERRORS"""
+
+    def __init__(self, message: str, code: Optional[int] = None, retry_after: Optional[float] = None):
+        self.code = code
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+class LLMBackend:
+    """
+    Interface the bots call models through.
+
+    Generation settings (temperature, max output tokens, ...) are fixed
+    per backend instance, like a GenerativeModel; the system instruction
+    is passed per call. Streams start the request before returning, so
+    connection and quota errors are raised by stream() itself - inside a
+    ResilientCaller attempt - and not while iterating.
+    """
+
+    kind = "base"
+
+    def __init__(self, model_id: str, generation_config: Any = None):
+        self.model_id = model_id
+        if dataclasses.is_dataclass(generation_config):
+            # genai.types.GenerationConfig - keep only the settings that were given
+            generation_config = {k: v for k, v in dataclasses.asdict(generation_config).items() if v is not None}
+        self.generation_config = dict(generation_config or {})
+
+    @property
+    def max_output_tokens(self) -> int:
+        return self.generation_config.get('max_output_tokens', 0)
+
+    def generate(self, prompt: Prompt, system_instruction: Optional[str] = None,
+                 timeout: Optional[float] = None) -> Completion:
+        raise NotImplementedError
+
+    async def agenerate(self, prompt: Prompt, system_instruction: Optional[str] = None,
+                        timeout: Optional[float] = None) -> Completion:
+        """Async generate(); adapters without an async client run generate() in a worker thread"""
+        return await asyncio.to_thread(self.generate, prompt, system_instruction, timeout)
+
+    def stream(self, prompt: Prompt, system_instruction: Optional[str] = None,
+               timeout: Optional[float] = None) -> Iterator[str]:
+        raise NotImplementedError
+
+    def count_tokens(self, prompt: Prompt) -> int:
+        return estimate_token_count(prompt_text(prompt))
+
+    def moderate(self, text: str) -> Moderation:
+        raise NotImplementedError(f"{self.kind} backend has no moderation")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.model_id!r})"
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Google Gemini through google.generativeai.
+
+    model_factory(system_instruction) returns the GenerativeModel to call;
+    the default is the shared model registry. SecureWCCChatbot passes its
+    context cache's model_for, so static prompt prefixes stay cached.
+    """
+
+    kind = "gemini"
+
+    def __init__(
+        self,
+        model_id: str = DEFAULT_MODELS['gemini'],
+        generation_config: Any = None,
+        safety_settings: Optional[List[Dict]] = None,
+        model_factory: Optional[Callable[[Optional[str]], Any]] = None
+    ):
+        if genai is None:
+            raise ImportError("GeminiBackend needs google-generativeai: pip install google-generativeai")
+        super().__init__(model_id, generation_config)
+        self.safety_settings = safety_settings
+        self._model_factory = model_factory
+
+    def model(self, system_instruction: Optional[str] = None):
+        if self._model_factory is not None:
+            return self._model_factory(system_instruction)
+        from model_registry import get_model
+        return get_model(self.model_id, self.generation_config or None, self.safety_settings, system_instruction)
+
+    @staticmethod
+    def _completion(response) -> Completion:
+        usage = getattr(response, 'usage_metadata', None)
+        return Completion(
+            response.text,
+            getattr(usage, 'prompt_token_count', None),
+            getattr(usage, 'candidates_token_count', None)
+        )
+
+    @staticmethod
+    def _options(timeout: Optional[float]) -> Dict:
+        return {} if timeout is None else {'request_options': {'timeout': timeout}}
+
+    def generate(self, prompt, system_instruction=None, timeout=None) -> Completion:
+        return self._completion(self.model(system_instruction).generate_content(prompt, **self._options(timeout)))
+
+    async def agenerate(self, prompt, system_instruction=None, timeout=None) -> Completion:
+        # The model factory may make a blocking API call (context cache registration)
+        model = await asyncio.to_thread(self.model, system_instruction)
+        return self._completion(await model.generate_content_async(prompt, **self._options(timeout)))
+
+    def stream(self, prompt, system_instruction=None, timeout=None) -> Iterator[str]:
+        response = self.model(system_instruction).generate_content(prompt, stream=True, **self._options(timeout))
+        return (chunk.text for chunk in response)
+
+    def count_tokens(self, prompt) -> int:
+        from model_registry import get_model
+        return get_model(self.model_id).count_tokens(prompt).total_tokens
+
+    def moderate(self, text: str) -> Moderation:
+        """Gemini has no moderation endpoint - run the text past the safety filters with a one-token reply"""
+        from model_registry import get_model
+        response = get_model(self.model_id, {'max_output_tokens': 1}, self.safety_settings).generate_content(text)
+        feedback = getattr(response, 'prompt_feedback', None)
+        if getattr(feedback, 'block_reason', None):
+            return Moderation(True, (str(feedback.block_reason),))
+        ratings = [r for c in response.candidates for r in (c.safety_ratings or []) if getattr(r, 'blocked', False)]
+        return Moderation(bool(ratings), tuple(str(r.category) for r in ratings))
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI chat completions and moderation through the openai package (OPENAI_API_KEY)"""
+
+    kind = "openai"
+
+    def __init__(self, model_id: str = DEFAULT_MODELS['openai'], generation_config: Any = None,
+                 client: Any = None):
+        if openai is None:
+            raise ImportError("OpenAIBackend needs openai: pip install openai")
+        super().__init__(model_id, generation_config)
+        self.client = client or openai.OpenAI()
+        self._async_client = None
+
+    def _request(self, prompt: Prompt, system_instruction: Optional[str], timeout: Optional[float]) -> Dict:
+        messages = [{'role': 'system', 'content': system_instruction}] if system_instruction else []
+        if isinstance(prompt, str):
+            messages.append({'role': 'user', 'content': prompt})
+        else:
+            messages += [{'role': 'assistant' if turn['role'] == 'model' else turn['role'],
+                          'content': ' '.join(str(part) for part in turn['parts'])} for turn in prompt]
+        request = {'model': self.model_id, 'messages': messages, 'timeout': timeout}
+        for key, name in (('temperature', 'temperature'), ('top_p', 'top_p'), ('max_output_tokens', 'max_tokens')):
+            if key in self.generation_config:
+                request[name] = self.generation_config[key]
+        return request
+
+    @staticmethod
+    def _errors(error: Exception) -> Exception:
+        """openai's errors as BackendError / UpstreamError, so retries and the rate scheduler see them"""
+        code = getattr(error, 'status_code', None)
+        if isinstance(error, (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)):
+            return UpstreamError(str(error), code or 503)
+        if isinstance(error, openai.APITimeoutError):
+            return TimeoutError(str(error))
+        return BackendError(str(error), code)
+
+    @staticmethod
+    def _completion(response) -> Completion:
+        usage = response.usage
+        return Completion(response.choices[0].message.content or "",
+                          getattr(usage, 'prompt_tokens', None), getattr(usage, 'completion_tokens', None))
+
+    def generate(self, prompt, system_instruction=None, timeout=None) -> Completion:
+        try:
+            return self._completion(self.client.chat.completions.create(**self._request(prompt, system_instruction, timeout)))
+        except openai.OpenAIError as e:
+            raise self._errors(e) from e
+
+    async def agenerate(self, prompt, system_instruction=None, timeout=None) -> Completion:
+        if self._async_client is None:
+            self._async_client = openai.AsyncOpenAI(api_key=self.client.api_key, base_url=self.client.base_url)
+        try:
+            response = await self._async_client.chat.completions.create(**self._request(prompt, system_instruction, timeout))
+        except openai.OpenAIError as e:
+            raise self._errors(e) from e
+        return self._completion(response)
+
+    def stream(self, prompt, system_instruction=None, timeout=None) -> Iterator[str]:
+        try:
+            response = self.client.chat.completions.create(stream=True, **self._request(prompt, system_instruction, timeout))
+        except openai.OpenAIError as e:
+            raise self._errors(e) from e
+        return (chunk.choices[0].delta.content for chunk in response if chunk.choices and chunk.choices[0].delta.content)
+
+    def count_tokens(self, prompt) -> int:
+        try:
+            import tiktoken
+            return len(tiktoken.encoding_for_model(self.model_id).encode(prompt_text(prompt)))
+        except Exception:
+            # tiktoken missing, its encoding files unreachable, or an unknown model
+            return super().count_tokens(prompt)
+
+    def moderate(self, text: str) -> Moderation:
+        try:
+            result = self.client.moderations.create(input=text).results[0]
+        except openai.OpenAIError as e:
+            raise self._errors(e) from e
+        categories = tuple(name for name, hit in result.categories.model_dump().items() if hit)
+        return Moderation(result.flagged, categories, result.category_scores.model_dump())
+
+
+class LocalBackend(LLMBackend):
+    """
+    The stand-in server from local_llm_server.py, over plain HTTP.
+
+    Standard library only, so it works where no SDK is installed. HTTP
+    429 and 5xx answers become UpstreamError (retryable, 429 counts as a
+    quota error), other 4xx answers BackendError.
+    """
+
+    kind = "local"
+
+    def __init__(self, model_id: str = DEFAULT_MODELS['local'], generation_config: Any = None,
+                 base_url: Optional[str] = None):
+        super().__init__(model_id, generation_config)
+        self.base_url = (base_url or os.getenv("LOCAL_LLM_URL", DEFAULT_LOCAL_URL)).rstrip('/')
+
+    def _open(self, path: str, payload: Dict, timeout: Optional[float]):
+        request = urllib.request.Request(
+            f"{self.base_url}{path}",
+            data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get('error', {}).get('message', e.reason)
+            except ValueError:
+                message = e.reason
+            if e.code == 429 or e.code >= 500:
+                retry_after = e.headers.get('Retry-After')
+                raise UpstreamError(f"{e.code}: {message}", e.code, float(retry_after) if retry_after else None) from e
+            raise BackendError(f"{e.code}: {message}", e.code) from e
+        except urllib.error.URLError as e:
+            if isinstance(e.reason, socket.timeout):
+                raise TimeoutError(f"{self.base_url} did not answer in time") from e
+            raise ConnectionError(f"{self.base_url} unreachable: {e.reason}") from e
+
+    def _payload(self, prompt: Prompt, system_instruction: Optional[str], stream: bool = False) -> Dict:
+        return {'model': self.model_id, 'contents': prompt, 'system_instruction': system_instruction,
+                'generation_config': self.generation_config, 'stream': stream}
+
+    def generate(self, prompt, system_instruction=None, timeout=None) -> Completion:
+        with self._open('/v1/generate', self._payload(prompt, system_instruction), timeout) as response:
+            body = json.loads(response.read())
+        usage = body.get('usage', {})
+        return Completion(body['text'], usage.get('input_tokens'), usage.get('output_tokens'))
+
+    def stream(self, prompt, system_instruction=None, timeout=None) -> Iterator[str]:
+        response = self._open('/v1/generate', self._payload(prompt, system_instruction, stream=True), timeout)
+
+        def chunks() -> Iterator[str]:
+            # One JSON object per line; the last one carries usage instead of text
+            with response:
+                for line in response:
+                    event = json.loads(line)
+                    if 'error' in event:
+                        raise UpstreamError(event['error'].get('message', 'stream aborted'), event['error'].get('code'))
+                    if event.get('text'):
+                        yield event['text']
+
+        return chunks()
+
+    def count_tokens(self, prompt) -> int:
+        with self._open('/v1/count_tokens', {'contents': prompt}, 10) as response:
+            return json.loads(response.read())['total_tokens']
+
+    def moderate(self, text: str) -> Moderation:
+        with self._open('/v1/moderate', {'input': text}, 10) as response:
+            body = json.loads(response.read())
+        return Moderation(body['flagged'], tuple(body.get('categories', ())))
+
+
+BACKENDS = {'gemini': GeminiBackend, 'openai': OpenAIBackend, 'local': LocalBackend}
+
+
+def create_backend(
+    kind: Optional[str] = None,
+    generation_config: Any = None,
+    gemini_model: Optional[str] = None,
+    **options
+) -> LLMBackend:
+    """
+    Backend by name - kind defaults to the LLM_BACKEND environment variable, then 'gemini'.
+
+    The model is LLM_MODEL when set, otherwise gemini_model (the app's
+    configured MODEL_ID) for Gemini and the usual model for the others.
+    options go to the adapter (safety_settings / model_factory for
+    Gemini, client for OpenAI, base_url for local).
+    """
+    kind = (kind or os.getenv("LLM_BACKEND") or "gemini").lower()
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{kind}' (choose from {', '.join(BACKENDS)})")
+    if kind != 'gemini':
+        # Gemini-only options are dropped, so callers can pass them unconditionally
+        options.pop('safety_settings', None)
+        options.pop('model_factory', None)
+    model_id = os.getenv("LLM_MODEL") or (kind == 'gemini' and gemini_model) or DEFAULT_MODELS[kind]
+    return BACKENDS[kind](model_id, generation_config, **options)
@@ -0,0 +1,279 @@
+"""
+Local Stand-In LLM Server
+An offline model server with configurable latency, streaming chunk timing and injected errors
+
+Run it, then point the bots at it with LLM_BACKEND=local (llm_backends.LocalBackend):
+    python utilities/local_llm_server.py --port 8765 --seed 7 \\
+        --latency lognormal:0.6,0.4 --chunk-interval 0.03 --error-rate 0.02 --error-codes 429,503
+
+Latency specs (seconds to the first token):
+    fixed:0.5   uniform:0.2,1.5   normal:0.8,0.2   lognormal:MEDIAN,SIGMA   exponential:MEAN
+
+Replies are canned WCC answers chosen from the prompt, so the same prompt
+always gets the same text; only timing and errors are random.
+
+In-process (e.g. from a benchmark):
+    server = start_server(StandInProfile(latency="fixed:0.2"), port=0)
+    os.environ["LOCAL_LLM_URL"] = server.url
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple
+
+_TOKENS = re.compile(r"\w+|[^\w\s]|\s+")
+
+# Every reply mentions WCC, so SecureWCCChatbot's on-topic output check passes
+ANSWERS = (
+    "WCC (Women Coding Community) runs a free mentorship programme that pairs members with experienced mentors.",
+    "You can join WCC by signing up on womencodingcommunity.com and saying hello in our Slack community.",
+    "WCC hosts technical workshops, book clubs, mock interviews and networking meetups throughout the year.",
+    "Volunteering with WCC is easy: join Slack, introduce yourself in #volunteers and pick a programme you like.",
+    "WCC welcomes everyone who supports women in tech, whatever their experience level.",
+)
+
+MODERATION_KEYWORDS = {
+    'violence': ('kill', 'attack', 'weapon'),
+    'self_harm': ('suicide', 'self-harm', 'hurt myself'),
+    'harassment': ('idiot', 'stupid', 'hate you'),
+}
+
+
+def count_tokens(text: str) -> int:
+    """Stand-in tokenizer: a token per word, punctuation mark and whitespace run"""
+    return len(_TOKENS.findall(text))
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """A latency spec such as 'lognormal:0.8,0.4' as a sampler of seconds"""
+    name, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',')] if args else []
+    samplers = {
+        'fixed': lambda rng, v=values: v[0],
+        'uniform': lambda rng, v=values: rng.uniform(v[0], v[1]),
+        'normal': lambda rng, v=values: rng.gauss(v[0], v[1]),
+        # Parameterised by the median, as latency targets usually are
+        'lognormal': lambda rng, v=values: rng.lognormvariate(math.log(v[0]), v[1]),
+        'exponential': lambda rng, v=values: rng.expovariate(1 / v[0]),
+    }
+    if name not in samplers:
+        raise ValueError(f"Unknown latency distribution '{name}' (choose from {', '.join(samplers)})")
+    sampler = samplers[name]
+    try:
+        sampler(random.Random(0))
+    except IndexError:
+        raise ValueError(f"Latency spec '{spec}' is missing parameters") from None
+    return lambda rng: max(0.0, sampler(rng))
+
+
+@dataclass
+class StandInProfile:
+    """How the stand-in behaves; every field has a command-line flag of the same name"""
+    latency: str = "lognormal:0.5,0.4"   # time to first token
+    chunk_interval: float = 0.02         # seconds between streamed chunks
+    chunk_tokens: int = 8                # tokens per streamed chunk
+    output_tokens: int = 120             # reply length, capped by the request's max_output_tokens
+    tokens_per_second: float = 0.0       # > 0: non-streamed replies also take output_tokens / this
+    error_rate: float = 0.0              # share of requests answered with an error status
+    error_codes: Tuple[int, ...] = (429, 503)
+    stream_error_rate: float = 0.0       # share of streams cut off halfway
+    hang_rate: float = 0.0               # share of requests that never answer (client timeouts)
+    seed: int = 0
+
+
+def _conversation_text(contents) -> str:
+    if isinstance(contents, str):
+        return contents
+    return "\n".join(' '.join(str(part) for part in turn.get('parts', ())) for turn in contents)
+
+
+def reply_for(prompt: str, max_tokens: int) -> str:
+    """Canned reply picked by the prompt's hash and trimmed to max_tokens"""
+    start = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest(), 16) % len(ANSWERS)
+    pieces, i = [], start
+    while count_tokens(' '.join(pieces)) < max_tokens:
+        pieces.append(ANSWERS[i % len(ANSWERS)])
+        i += 1
+    return ''.join(_TOKENS.findall(' '.join(pieces))[:max_tokens]).strip()
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, profile: StandInProfile):
+        super().__init__(address, StandInHandler)
+        self.profile = profile
+        self.latency = parse_latency(profile.latency)
+        self._rng = random.Random(profile.seed)
+        self._lock = threading.Lock()
+        self.counters = {'requests': 0, 'errors': 0, 'hangs': 0, 'stream_cuts': 0}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def request_rng(self) -> random.Random:
+        """Per-request generator drawn from the seeded one - same seed, same sequence of behaviours"""
+        with self._lock:
+            self.counters['requests'] += 1
+            return random.Random(self._rng.getrandbits(64))
+
+    def count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    server: StandInServer
+
+    def log_message(self, format, *args):
+        # One line per request would drown a load test's output
+        pass
+
+    def _json(self, status: int, body: Dict, headers: Dict = None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/v1/health':
+            self._json(200, {'status': 'ok', **self.server.counters})
+        else:
+            self._json(404, {'error': {'code': 404, 'message': f'No route {self.path}'}})
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except ValueError:
+            self._json(400, {'error': {'code': 400, 'message': 'Body is not JSON'}})
+            return
+        routes = {'/v1/generate': self._generate, '/v1/count_tokens': self._count_tokens, '/v1/moderate': self._moderate}
+        route = routes.get(self.path)
+        if route is None:
+            self._json(404, {'error': {'code': 404, 'message': f'No route {self.path}'}})
+            return
+        route(body)
+
+    def _count_tokens(self, body: Dict):
+        self._json(200, {'total_tokens': count_tokens(_conversation_text(body.get('contents', '')))})
+
+    def _moderate(self, body: Dict):
+        text = str(body.get('input', '')).lower()
+        categories = [name for name, words in MODERATION_KEYWORDS.items() if any(w in text for w in words)]
+        self._json(200, {'flagged': bool(categories), 'categories': categories})
+
+    def _generate(self, body: Dict):
+        profile = self.server.profile
+        rng = self.server.request_rng()
+        prompt = f"{body.get('system_instruction') or ''}\n{_conversation_text(body.get('contents', ''))}"
+        config = body.get('generation_config') or {}
+        max_tokens = min(profile.output_tokens, config.get('max_output_tokens') or profile.output_tokens)
+        input_tokens = count_tokens(prompt)
+
+        first_token = self.server.latency(rng)
+        if rng.random() < profile.hang_rate:
+            self.server.count('hangs')
+            time.sleep(3600)
+            return
+        if rng.random() < profile.error_rate:
+            self.server.count('errors')
+            time.sleep(first_token / 4)
+            code = rng.choice(profile.error_codes)
+            headers = {'Retry-After': '1'} if code == 429 else {}
+            self._json(code, {'error': {'code': code, 'message': 'Injected error from the stand-in server'}}, headers)
+            return
+
+        text = reply_for(prompt, max_tokens)
+        tokens = _TOKENS.findall(text)
+        usage = {'input_tokens': input_tokens, 'output_tokens': len(tokens)}
+        time.sleep(first_token)
+
+        if not body.get('stream'):
+            if profile.tokens_per_second > 0:
+                time.sleep(len(tokens) / profile.tokens_per_second)
+            self._json(200, {'text': text, 'usage': usage})
+            return
+
+        # Newline-delimited JSON, written as generated; the connection closes at the end
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        cut_at = len(tokens) // 2 if rng.random() < profile.stream_error_rate else None
+        step = max(1, profile.chunk_tokens)
+        for start in range(0, len(tokens), step):
+            if start and profile.chunk_interval:
+                time.sleep(profile.chunk_interval)
+            if cut_at is not None and start >= cut_at:
+                self.server.count('stream_cuts')
+                self._line({'error': {'code': 503, 'message': 'Stream cut off by the stand-in server'}})
+                return
+            self._line({'text': ''.join(tokens[start:start + step])})
+        self._line({'done': True, 'usage': usage})
+
+    def _line(self, event: Dict):
+        self.wfile.write(json.dumps(event).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+
+def start_server(profile: StandInProfile = None, host: str = "127.0.0.1", port: int = 8765) -> StandInServer:
+    """Serve in a daemon thread (port 0 = any free port, see server.url); stop with server.shutdown()"""
+    server = StandInServer((host, port), profile or StandInProfile())
+    threading.Thread(target=server.serve_forever, name="stand-in-llm", daemon=True).start()
+    return server
+
+
+def main():
+    defaults = StandInProfile()
+    parser = argparse.ArgumentParser(description="Offline stand-in for an LLM API")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default=defaults.latency, help="time to first token, e.g. lognormal:0.5,0.4")
+    parser.add_argument('--chunk-interval', type=float, default=defaults.chunk_interval)
+    parser.add_argument('--chunk-tokens', type=int, default=defaults.chunk_tokens)
+    parser.add_argument('--output-tokens', type=int, default=defaults.output_tokens)
+    parser.add_argument('--tokens-per-second', type=float, default=defaults.tokens_per_second)
+    parser.add_argument('--error-rate', type=float, default=defaults.error_rate)
+    parser.add_argument('--error-codes', default=','.join(map(str, defaults.error_codes)))
+    parser.add_argument('--stream-error-rate', type=float, default=defaults.stream_error_rate)
+    parser.add_argument('--hang-rate', type=float, default=defaults.hang_rate)
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    profile = StandInProfile(
+        latency=args.latency,
+        chunk_interval=args.chunk_interval,
+        chunk_tokens=args.chunk_tokens,
+        output_tokens=args.output_tokens,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_codes=tuple(int(code) for code in args.error_codes.split(',')),
+        stream_error_rate=args.stream_error_rate,
+        hang_rate=args.hang_rate,
+        seed=args.seed
+    )
+    server = StandInServer((args.host, args.port), profile)
+    print(f"✓ Stand-in LLM serving on {server.url} (latency {profile.latency}, error rate {profile.error_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Shared GenerativeModel Registry
+Reuse Gemini model objects across requests and open the API connection before the first one
+
+Usage:
+    from model_registry import get_model, warm_up
+
+    warm_up(MODEL_ID)                                   # at startup, after genai.configure()
+    model = get_model(MODEL_ID, generation_config, safety_settings, system_instruction)
+    response = model.generate_content(prompt)
+"""
+
+import dataclasses
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Set, Tuple
+
+import google.generativeai as genai
+
+# Enough for every pattern and settings combination a demo app produces
+MAX_MODELS = 256
+
+_models: "OrderedDict[Tuple, genai.GenerativeModel]" = OrderedDict()
+_lock = threading.Lock()
+_warmed: Set[str] = set()
+
+
+def _canonical(value: Any) -> Optional[str]:
+    """Stable text form of a config (dict, GenerationConfig dataclass or list of settings)"""
+    if value is None:
+        return None
+    if dataclasses.is_dataclass(value):
+        value = dataclasses.asdict(value)
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def get_model(
+    model_id: str,
+    generation_config: Any = None,
+    safety_settings: Any = None,
+    system_instruction: Optional[str] = None
+) -> genai.GenerativeModel:
+    """
+    Shared model for these settings, created on first use.
+
+    GenerativeModel objects hold no per-conversation state, so one per
+    distinct (model, generation config, safety settings, system
+    instruction) serves every request and thread; callers should stop
+    building a new one per message. The least recently used models are
+    dropped beyond MAX_MODELS.
+    """
+    key = (model_id, _canonical(generation_config), _canonical(safety_settings), system_instruction)
+    with _lock:
+        model = _models.get(key)
+        if model is not None:
+            _models.move_to_end(key)
+            return model
+
+        model = genai.GenerativeModel(
+            model_name=model_id,
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+            system_instruction=system_instruction
+        )
+        _models[key] = model
+        while len(_models) > MAX_MODELS:
+            _models.popitem(last=False)
+        return model
+
+
+def warm_up(model_id: str, background: bool = True) -> Optional[threading.Thread]:
+    """
+    Open the API connection ahead of the first request.
+
+    Sends one count_tokens call (not billed), which creates the SDK's
+    client and its connection - DNS, TLS and HTTP/2 setup - so the first
+    member's request doesn't pay for them. Runs once per model id, in a
+    daemon thread unless background is False. Failures (no API key yet,
+    offline) are ignored: the first request then connects as usual.
+
+    Call after genai.configure(), which replaces the client.
+    """
+    with _lock:
+        if model_id in _warmed:
+            return None
+        _warmed.add(model_id)
+
+    def run():
+        try:
+            get_model(model_id).count_tokens("warm-up")
+        except Exception:
+            pass
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def clear():
+    """Forget every shared model (e.g. after genai.configure() with a new key)"""
+    with _lock:
+        _models.clear()
+        _warmed.clear()
@@ -0,0 +1,350 @@
+"""
+Client-Side Rate Scheduler
+Keep model calls under the per-minute request (RPM) and token (TPM) quotas, most urgent traffic first
+
+Usage:
+    from rate_scheduler import Priority, gemini_scheduler, estimate_tokens
+
+    ticket = gemini_scheduler.acquire(estimate_tokens(prompt, 1024), Priority.INTERACTIVE, timeout=30)
+    try:
+        response = model.generate_content(prompt)
+    except Exception as e:
+        gemini_scheduler.release(ticket, quota_error=is_quota_error(e))
+        raise
+    gemini_scheduler.release(ticket, used_tokens=response.usage_metadata.total_token_count)
+
+ResilientCaller (resilient_call.py) does this around every attempt, so bots
+using gemini_caller are scheduled without further changes.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from enum import IntEnum
+from typing import Dict, Optional
+
+try:
+    from google.api_core import exceptions as api_exceptions
+except ImportError:
+    api_exceptions = None
+
+QUOTA_ERRORS = ()
+if api_exceptions is not None:
+    QUOTA_ERRORS = (api_exceptions.TooManyRequests, api_exceptions.ResourceExhausted)
+
+
+def is_quota_error(error: BaseException) -> bool:
+    """True for 429 / RESOURCE_EXHAUSTED responses, from any client library"""
+    return isinstance(error, QUOTA_ERRORS) or getattr(error, 'code', None) == 429 \
+        or getattr(error, 'status_code', None) == 429
+
+
+def estimate_tokens(prompt: str, max_output_tokens: int = 0) -> int:
+    """Tokens to reserve for a call: about 4 characters per prompt token, plus the most it may generate"""
+    return len(prompt) // 4 + 1 + max_output_tokens
+
+
+class Priority(IntEnum):
+    """Scheduling lanes - a lower value always goes first"""
+    CRISIS = 0        # follow-ups in a conversation where crisis was detected
+    INTERACTIVE = 1   # a member waiting for a chat reply
+    BATCH = 2         # offline jobs, re-scans, cache warming
+    EVAL = 3          # benchmarks, evals, load tests
+
+
+class QueueFull(Exception):
+    """Raised when the scheduler queue is full and the request is not urgent enough to displace anyone"""
+
+    def __init__(self, name: str, priority: Priority):
+        self.priority = priority
+        super().__init__(f"{name} is busy ({priority.name.lower()} queue full)")
+
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60 per second up to capacity; the level may go negative (debt)"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.per_minute = per_minute
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float, per_minute: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * per_minute / 60.0)
+        self._updated = now
+
+    def wait_time(self, amount: float, per_minute: float) -> float:
+        """Seconds until amount is available (refill() first); amounts above capacity wait for a full bucket"""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing * 60.0 / per_minute)
+
+
+class Ticket:
+    """One granted (or waiting) request"""
+    __slots__ = ('priority', 'tokens', 'seq', 'granted', 'rejected')
+
+    def __init__(self, priority: Priority, tokens: int, seq: int):
+        self.priority = priority
+        self.tokens = tokens
+        self.seq = seq
+        self.granted = False
+        self.rejected = False
+
+    def __lt__(self, other: 'Ticket') -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class RateScheduler:
+    """
+    Admit calls at the rate the quota allows, in priority order.
+
+    Two token buckets - one for requests, one for estimated tokens -
+    refill at the configured per-minute limits. Waiting calls form one
+    bounded queue ordered by Priority, then arrival: only the head of
+    the queue may take from the buckets, so a crisis follow-up or an
+    interactive reply never waits behind batch or eval traffic. When the
+    queue is full, a new call displaces the newest call of a lower lane,
+    or is rejected with QueueFull if there is none.
+
+    The limits adapt: a quota error (429) halves the effective rate and
+    empties the request bucket, and the rate then recovers linearly, back
+    at the configured limits within recovery_seconds without quota errors. So
+    a wrong limit or a quota shared with other clients costs a few 429s,
+    not a storm of them.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rpm: float,
+        tpm: float,
+        max_queue: int = 200,
+        min_fraction: float = 0.1,
+        recovery_seconds: float = 120.0
+    ):
+        """
+        Args:
+            name: Upstream name, used in errors
+            rpm / tpm: Requests and tokens per minute the quota allows
+            max_queue: Calls allowed to wait at once, across all lanes
+            min_fraction: Lowest fraction of the limits quota errors can push the rate to
+            recovery_seconds: Time to climb back from a cut to the full limits
+        """
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_queue = max_queue
+        self.min_fraction = min_fraction
+        self.recovery_seconds = recovery_seconds
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self._queue = []
+        self._seq = itertools.count()
+        self._cut_fraction = 1.0
+        self._cut_at = 0.0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._async_waiters = set()
+        self._counters = {'granted': 0, 'rejected': 0, 'timed_out': 0, 'quota_errors': 0}
+        self._waited = {lane: 0.0 for lane in Priority}
+
+    def set_limits(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        """Change the per-minute limits at runtime, e.g. for a paid tier without setting GEMINI_RPM / GEMINI_TPM"""
+        with self._lock:
+            if rpm is not None:
+                self.rpm = self._requests.per_minute = self._requests.capacity = rpm
+                self._requests.level = min(self._requests.level, rpm)
+            if tpm is not None:
+                self.tpm = self._tokens.per_minute = self._tokens.capacity = tpm
+                self._tokens.level = min(self._tokens.level, tpm)
+            self._notify()
+
+    def _notify(self):
+        """Wake every waiter, threads and coroutines alike. Lock held."""
+        self._changed.notify_all()
+        for loop, waiter in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def _fraction(self, now: float) -> float:
+        """Current share of the configured limits (1.0 unless cut by recent quota errors)"""
+        if self._cut_fraction >= 1.0:
+            return 1.0
+        return min(1.0, self._cut_fraction + (now - self._cut_at) / self.recovery_seconds)
+
+    def _enqueue(self, tokens: int, priority: Priority) -> Ticket:
+        ticket = Ticket(Priority(priority), tokens, next(self._seq))
+        if len(self._queue) >= self.max_queue:
+            victim = max(self._queue)
+            if not ticket < victim:
+                self._counters['rejected'] += 1
+                raise QueueFull(self.name, ticket.priority)
+            self._queue.remove(victim)
+            heapq.heapify(self._queue)
+            victim.rejected = True
+            self._counters['rejected'] += 1
+            self._notify()
+        heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _poll(self, ticket: Ticket) -> float:
+        """Grant ticket if it is at the head and the buckets allow; else seconds worth waiting. Lock held."""
+        if ticket.rejected:
+            raise QueueFull(self.name, ticket.priority)
+        now = time.monotonic()
+        fraction = self._fraction(now)
+        rpm, tpm = self.rpm * fraction, self.tpm * fraction
+        self._requests.refill(now, rpm)
+        self._tokens.refill(now, tpm)
+        head = self._queue[0]
+        wait = max(self._requests.wait_time(1, rpm), self._tokens.wait_time(head.tokens, tpm))
+        if head is not ticket or wait > 0:
+            return max(wait, 0.005)
+        heapq.heappop(self._queue)
+        self._requests.level -= 1
+        self._tokens.level -= ticket.tokens
+        ticket.granted = True
+        self._counters['granted'] += 1
+        self._notify()
+        return 0.0
+
+    def _give_up(self, ticket: Ticket):
+        """Remove a ticket that stopped waiting. Lock held."""
+        if ticket in self._queue:
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            self._notify()
+
+    def acquire(self, tokens: int = 0, priority: Priority = Priority.INTERACTIVE,
+                timeout: Optional[float] = None) -> Ticket:
+        """
+        Block until the call may go ahead.
+
+        Raises:
+            QueueFull: the queue is full of calls at least as urgent, or this one was displaced
+            TimeoutError: not admitted within timeout seconds
+        """
+        started = time.monotonic()
+        expires = None if timeout is None else started + timeout
+        with self._lock:
+            ticket = self._enqueue(tokens, priority)
+            try:
+                while True:
+                    wait = self._poll(ticket)
+                    if not wait:
+                        self._waited[ticket.priority] += time.monotonic() - started
+                        return ticket
+                    if expires is not None:
+                        if time.monotonic() >= expires:
+                            self._counters['timed_out'] += 1
+                            raise TimeoutError(f"{self.name} rate limit: not admitted within {timeout:.2f}s")
+                        wait = min(wait, expires - time.monotonic())
+                    self._changed.wait(max(wait, 0.0))
+            except BaseException:
+                self._give_up(ticket)
+                raise
+
+    def try_acquire(self, tokens: int = 0, priority: Priority = Priority.INTERACTIVE) -> Optional[Ticket]:
+        """Admit the call only if that is possible right now and nobody is waiting (e.g. for a hedged duplicate)"""
+        with self._lock:
+            if self._queue:
+                return None
+            ticket = self._enqueue(tokens, priority)
+            if self._poll(ticket):
+                self._give_up(ticket)
+                return None
+            return ticket
+
+    async def aacquire(self, tokens: int = 0, priority: Priority = Priority.INTERACTIVE,
+                       timeout: Optional[float] = None) -> Ticket:
+        """Async acquire(): waits on a future the scheduler resolves on any change, so a queued call holds no thread"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with self._lock:
+            ticket = self._enqueue(tokens, priority)
+        waiter = None
+        try:
+            while True:
+                with self._lock:
+                    if waiter is not None:
+                        self._async_waiters.discard((loop, waiter))
+                    wait = self._poll(ticket)
+                    if not wait:
+                        self._waited[ticket.priority] += loop.time() - started
+                        return ticket
+                    if timeout is not None:
+                        remaining = started + timeout - loop.time()
+                        if remaining <= 0:
+                            self._counters['timed_out'] += 1
+                            raise TimeoutError(f"{self.name} rate limit: not admitted within {timeout:.2f}s")
+                        wait = min(wait, remaining)
+                    # Registered under the same lock as the poll, so no release can slip in between
+                    waiter = loop.create_future()
+                    self._async_waiters.add((loop, waiter))
+                await asyncio.wait([waiter], timeout=wait)
+        except BaseException:
+            with self._lock:
+                self._give_up(ticket)
+            raise
+        finally:
+            if waiter is not None:
+                with self._lock:
+                    self._async_waiters.discard((loop, waiter))
+
+    def release(self, ticket: Ticket, used_tokens: Optional[int] = None, quota_error: bool = False):
+        """
+        Report how a granted call went.
+
+        used_tokens (from the response's usage metadata) settles the
+        token reservation: unused tokens go back to the bucket, overruns
+        are charged. quota_error cuts the rate.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if used_tokens is not None:
+                self._tokens.level = min(self._tokens.capacity, self._tokens.level + ticket.tokens - used_tokens)
+            if quota_error:
+                self._counters['quota_errors'] += 1
+                self._cut_fraction = max(self.min_fraction, self._fraction(now) / 2)
+                self._cut_at = now
+                self._requests.level = min(self._requests.level, 0.0)
+            self._notify()
+
+    @property
+    def stats(self) -> Dict:
+        """Admission counters, queue depth and total queueing time per lane, and the current rate"""
+        with self._lock:
+            fraction = self._fraction(time.monotonic())
+            stats = dict(self._counters)
+            stats['queued'] = {lane.name.lower(): sum(1 for t in self._queue if t.priority == lane) for lane in Priority}
+            stats['waited_s'] = {lane.name.lower(): round(seconds, 2) for lane, seconds in self._waited.items()}
+        stats['rpm'] = round(self.rpm * fraction, 1)
+        stats['tpm'] = round(self.tpm * fraction)
+        return stats
+
+
+# Load .env if available - the limits below are read at import, possibly before the app loads it
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except Exception:
+    pass
+
+# Shared by every bot in the process. The defaults are the FREE-TIER limits of
+# gemini-2.5-flash-lite (15 requests, 250,000 tokens per minute): on another model or
+# a paid tier set GEMINI_RPM / GEMINI_TPM (see .env.example) or call set_limits().
+gemini_scheduler = RateScheduler(
+    "gemini",
+    rpm=float(os.getenv("GEMINI_RPM", "15")),
+    tpm=float(os.getenv("GEMINI_TPM", "250000"))
+)
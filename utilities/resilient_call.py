@@ -0,0 +1,535 @@
+"""
+Resilient Model Calls
+Deadlines, retries with jittered backoff, hedged requests and a circuit breaker for Gemini calls
+
+Usage:
+    from resilient_call import gemini_caller
+
+    response = gemini_caller.call(
+        lambda timeout: model.generate_content(prompt, request_options={'timeout': timeout})
+    )
+    response = await gemini_caller.acall(
+        lambda timeout: model.generate_content_async(prompt, request_options={'timeout': timeout})
+    )
+    # Batch traffic waits behind interactive chat for its share of the rate limits
+    response = gemini_caller.call(fn, priority=Priority.BATCH, tokens=estimate_tokens(prompt, 1024))
+    print(gemini_caller.metrics)
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from rate_scheduler import Priority, QueueFull, RateScheduler, Ticket, gemini_scheduler, is_quota_error
+
+try:
+    from google.api_core import exceptions as api_exceptions
+except ImportError:
+    api_exceptions = None
+
+T = TypeVar('T')
+
+# Upstream trouble worth another attempt: rate limiting, overload, server errors, timeouts
+RETRYABLE_ERRORS = (ConnectionError, TimeoutError, asyncio.TimeoutError)
+if api_exceptions is not None:
+    RETRYABLE_ERRORS += (
+        api_exceptions.TooManyRequests,
+        api_exceptions.ResourceExhausted,
+        api_exceptions.InternalServerError,
+        api_exceptions.BadGateway,
+        api_exceptions.ServiceUnavailable,
+        api_exceptions.GatewayTimeout,
+        api_exceptions.DeadlineExceeded,
+    )
+
+
+class CircuitOpen(Exception):
+    """Raised without calling upstream while the circuit breaker is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        self.retry_in = retry_in
+        super().__init__(f"{name} is unavailable (circuit open, retry in {retry_in:.0f}s)")
+
+
+class CircuitBreaker:
+    """
+    Fail fast while upstream is unhealthy.
+
+    Opens after failure_threshold consecutive retryable failures; while
+    open every call is rejected at once. After reset_timeout one trial
+    call is let through (half-open): success closes the circuit, failure
+    opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.times_opened = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def enter(self) -> Tuple[Optional[float], bool]:
+        """(None, is_trial) when a call may proceed, otherwise (seconds until the next trial, False)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return None, False
+            retry_in = self._opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and retry_in <= 0:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return None, True
+            return max(retry_in, 0.0), False
+
+    def allow(self) -> Optional[float]:
+        """None when a call may proceed, otherwise seconds until the next trial"""
+        return self.enter()[0]
+
+    def abandon_trial(self):
+        """
+        The trial call ended without an outcome (cancelled, interrupted):
+        let the next call be the trial, instead of waiting forever for one.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_running = False
+
+    def record(self, success: bool):
+        with self._lock:
+            self._trial_running = False
+            if success:
+                self._failures = 0
+                self.state = self.CLOSED
+                return
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _hedge_pool() -> ThreadPoolExecutor:
+    """Shared pool for hedged sync attempts, created on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedged-call")
+    return _pool
+
+
+def _used_tokens(response: Any) -> Optional[int]:
+    """Total tokens reported by a response (llm_backends.Completion or Gemini's), when it has them"""
+    try:
+        if hasattr(response, 'total_tokens'):
+            return response.total_tokens
+        return response.usage_metadata.total_token_count or None
+    except Exception:
+        # No usage reported, or a stream not yet consumed
+        return None
+
+
+class ResilientCaller:
+    """
+    Call wrapper that bounds and smooths upstream latency.
+
+    Every call gets a deadline; the callable receives the seconds left
+    and should pass them on as the request timeout, so an abandoned
+    attempt also stops upstream. Retryable errors (RETRYABLE_ERRORS) are
+    retried with full-jitter exponential backoff while the deadline
+    allows; other errors (bad request, permission, safety blocks) are
+    raised at once.
+
+    With hedging on, an attempt still running after the recent p95
+    latency gets a duplicate, and whichever finishes first wins - the
+    slowest few percent of calls then cost about twice as much but stop
+    setting the tail. Only hedge idempotent calls, like generation.
+
+    With a scheduler, every attempt first waits for its turn under the
+    rate limits (rate_scheduler.py) in its priority lane, reports quota
+    errors back to it, and a hedged duplicate is only sent when there is
+    quota to spare.
+    """
+
+    def __init__(
+        self,
+        name: str = "gemini",
+        deadline: float = 30.0,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_initial_delay: float = 2.0,
+        breaker: Optional[CircuitBreaker] = None,
+        scheduler: Optional[RateScheduler] = None
+    ):
+        """
+        Args:
+            name: Upstream name, used in errors
+            deadline: Default seconds per call, across all attempts
+            max_attempts: Attempts per call, including the first
+            base_delay / max_delay: Backoff before retry n is uniform in [0, min(max_delay, base_delay * 2**n)]
+            hedge: Send a hedged duplicate for slow attempts (per-call override in call/acall)
+            hedge_quantile: Latency quantile after which the duplicate is sent
+            hedge_initial_delay: Hedge delay until enough latencies have been seen
+            breaker: Circuit breaker (default: 5 failures, 30 s reset)
+            scheduler: Rate scheduler every attempt is admitted by (default: none)
+        """
+        self.name = name
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_initial_delay = hedge_initial_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.scheduler = scheduler
+        self._latencies = deque(maxlen=500)
+        self._counters = {'calls': 0, 'successes': 0, 'failures': 0, 'retries': 0,
+                          'hedges_sent': 0, 'hedges_won': 0, 'rejected_by_breaker': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def hedge_delay(self) -> float:
+        """Seconds before a hedged duplicate is sent: the recent latency quantile"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < 20:
+            return self.hedge_initial_delay
+        return latencies[min(len(latencies) - 1, int(len(latencies) * self.hedge_quantile))]
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _admit(self) -> bool:
+        """Pass the circuit breaker; True when this call is its half-open trial"""
+        retry_in, trial = self.breaker.enter()
+        if retry_in is not None:
+            self._count('rejected_by_breaker')
+            raise CircuitOpen(self.name, retry_in)
+        self._count('calls')
+        return trial
+
+    def _succeeded(self, started: float):
+        with self._lock:
+            self._latencies.append(time.monotonic() - started)
+            self._counters['successes'] += 1
+        self.breaker.record(True)
+
+    def _failed(self, error: BaseException):
+        self._count('failures')
+        # Only upstream trouble counts against its health - not our own bad requests
+        if isinstance(error, RETRYABLE_ERRORS):
+            self.breaker.record(False)
+        else:
+            self.breaker.record(True)
+
+    def _settle(self, ticket: Optional[Ticket], result: Any = None, error: Optional[BaseException] = None):
+        """Report an attempt's token use or quota error to the scheduler"""
+        if ticket is None:
+            return
+        if error is not None:
+            self.scheduler.release(ticket, quota_error=is_quota_error(error))
+        else:
+            self.scheduler.release(ticket, used_tokens=_used_tokens(result))
+
+    def _not_admitted(self, last_error: Optional[BaseException]):
+        """
+        The scheduler turned an attempt away (queue full, deadline passed in
+        the queue). That is our own back-pressure, not upstream health, so
+        the breaker only hears about an upstream error from an earlier attempt.
+        """
+        if last_error is not None:
+            self._failed(last_error)
+
+    def _hedge_ticket(self, priority: Priority, tokens: int) -> Tuple[bool, Optional[Ticket]]:
+        """(may hedge, the duplicate's ticket) - with a scheduler, only when there is quota to spare"""
+        if self.scheduler is None:
+            return True, None
+        ticket = self.scheduler.try_acquire(tokens, priority)
+        return ticket is not None, ticket
+
+    def _settle_when_done(self, ticket: Optional[Ticket], future):
+        """Settle a hedged duplicate's ticket when it finishes - won, lost, failed or cancelled"""
+        if ticket is None:
+            return
+
+        def settle(done):
+            if done.cancelled():
+                self.scheduler.release(ticket)
+            elif done.exception() is not None:
+                self._settle(ticket, error=done.exception())
+            else:
+                self._settle(ticket, done.result())
+
+        future.add_done_callback(settle)
+
+    def call(
+        self,
+        fn: Callable[[float], T],
+        deadline: Optional[float] = None,
+        hedge: Optional[bool] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        tokens: int = 0
+    ) -> T:
+        """
+        Call fn(timeout) with deadline, retries, optional hedging and the circuit breaker.
+
+        priority and tokens (the estimated tokens of prompt plus
+        response) are what the scheduler admits the call by.
+
+        Raises:
+            CircuitOpen: upstream is failing; nothing was sent
+            QueueFull: the scheduler queue is full of more urgent calls; nothing was sent
+            TimeoutError: the deadline passed
+            The last error, when it is not retryable or attempts ran out
+        """
+        trial = self._admit()
+        try:
+            return self._call(fn, deadline, hedge, priority, tokens)
+        except BaseException:
+            # Outcomes are recorded before errors leave _call; this covers interrupts
+            if trial:
+                self.breaker.abandon_trial()
+            raise
+
+    def _call(self, fn: Callable[[float], T], deadline: Optional[float], hedge: Optional[bool],
+              priority: Priority, tokens: int) -> T:
+        expires = time.monotonic() + (self.deadline if deadline is None else deadline)
+        hedge = self.hedge if hedge is None else hedge
+        attempt, last_error = 0, None
+        while True:
+            try:
+                ticket = self._acquire(expires, priority, tokens)
+            except (QueueFull, TimeoutError):
+                # Nothing was sent: no retry, and no breaker failure for our own queue
+                self._not_admitted(last_error)
+                raise
+            # Latency is measured from admission, so queueing doesn't move the hedge delay
+            started = time.monotonic()
+            try:
+                remaining = expires - started
+                result = self._hedged(fn, remaining, priority, tokens) if hedge else fn(remaining)
+            except Exception as e:
+                self._settle(ticket, error=e)
+                last_error = e
+                delay = self._backoff(attempt)
+                attempt += 1
+                if (not isinstance(e, RETRYABLE_ERRORS) or attempt >= self.max_attempts
+                        or time.monotonic() + delay >= expires):
+                    self._failed(e)
+                    raise
+                self._count('retries')
+                time.sleep(delay)
+                continue
+            self._settle(ticket, result)
+            self._succeeded(started)
+            return result
+
+    def _acquire(self, expires: float, priority: Priority, tokens: int) -> Optional[Ticket]:
+        """Wait for the scheduler (if any) until expires; TimeoutError or QueueFull when not admitted"""
+        ticket = None
+        if self.scheduler is not None:
+            ticket = self.scheduler.acquire(tokens, priority, timeout=max(0.0, expires - time.monotonic()))
+        if expires <= time.monotonic():
+            if ticket is not None:
+                self.scheduler.release(ticket, used_tokens=0)
+            raise TimeoutError(f"{self.name} call exceeded its deadline")
+        return ticket
+
+    def _hedged(self, fn: Callable[[float], T], remaining: float, priority: Priority, tokens: int) -> T:
+        """One attempt, duplicated if it is still running after hedge_delay() and the quota allows"""
+        expires = time.monotonic() + remaining
+        pool = _hedge_pool()
+        primary = pool.submit(fn, remaining)
+        done, _ = wait([primary], timeout=min(self.hedge_delay(), remaining))
+        if done:
+            return primary.result()
+        may_hedge, hedge_ticket = self._hedge_ticket(priority, tokens)
+        if not may_hedge:
+            done, _ = wait([primary], timeout=max(0.0, expires - time.monotonic()))
+            if done:
+                return primary.result()
+            raise TimeoutError(f"{self.name} call exceeded its deadline")
+
+        self._count('hedges_sent')
+        hedge = pool.submit(fn, max(0.0, expires - time.monotonic()))
+        self._settle_when_done(hedge_ticket, hedge)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, expires - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count('hedges_won')
+                    # The loser ends at its own request timeout; its result is dropped
+                    return future.result()
+                error = future.exception()
+        if error is not None and not pending:
+            raise error
+        raise TimeoutError(f"{self.name} call exceeded its deadline")
+
+    async def acall(
+        self,
+        fn: Callable[[float], Awaitable[T]],
+        deadline: Optional[float] = None,
+        hedge: Optional[bool] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        tokens: int = 0
+    ) -> T:
+        """Async call(): fn(timeout) returns an awaitable; a losing hedge or timed-out attempt is cancelled"""
+        trial = self._admit()
+        try:
+            return await self._acall(fn, deadline, hedge, priority, tokens)
+        except BaseException:
+            # A cancelled trial (wait_for expiring, the last single-flight waiter leaving)
+            # records no outcome - without this the breaker would wait for it forever
+            if trial:
+                self.breaker.abandon_trial()
+            raise
+
+    async def _acall(self, fn: Callable[[float], Awaitable[T]], deadline: Optional[float], hedge: Optional[bool],
+                     priority: Priority, tokens: int) -> T:
+        loop = asyncio.get_running_loop()
+        expires = loop.time() + (self.deadline if deadline is None else deadline)
+        hedge = self.hedge if hedge is None else hedge
+        attempt, last_error = 0, None
+        while True:
+            try:
+                ticket = await self._aacquire(expires, priority, tokens)
+            except (QueueFull, TimeoutError):
+                self._not_admitted(last_error)
+                raise
+            started = time.monotonic()
+            try:
+                remaining = expires - loop.time()
+                if hedge:
+                    result = await self._ahedged(fn, remaining, priority, tokens)
+                else:
+                    result = await asyncio.wait_for(fn(remaining), remaining)
+            except asyncio.CancelledError:
+                # The caller gave up between grant and reply: hand the reservation back
+                if ticket is not None:
+                    self.scheduler.release(ticket, used_tokens=0)
+                raise
+            except Exception as e:
+                self._settle(ticket, error=e)
+                last_error = e
+                delay = self._backoff(attempt)
+                attempt += 1
+                if (not isinstance(e, RETRYABLE_ERRORS) or attempt >= self.max_attempts
+                        or loop.time() + delay >= expires):
+                    self._failed(e)
+                    raise
+                self._count('retries')
+                await asyncio.sleep(delay)
+                continue
+            self._settle(ticket, result)
+            self._succeeded(started)
+            return result
+
+    async def _aacquire(self, expires: float, priority: Priority, tokens: int) -> Optional[Ticket]:
+        """Async _acquire(): expires is on the event loop's clock"""
+        loop = asyncio.get_running_loop()
+        ticket = None
+        if self.scheduler is not None:
+            ticket = await self.scheduler.aacquire(tokens, priority, timeout=max(0.0, expires - loop.time()))
+        if expires <= loop.time():
+            if ticket is not None:
+                self.scheduler.release(ticket, used_tokens=0)
+            raise TimeoutError(f"{self.name} call exceeded its deadline")
+        return ticket
+
+    async def _ahedged(
+        self,
+        fn: Callable[[float], Awaitable[T]],
+        remaining: float,
+        priority: Priority,
+        tokens: int
+    ) -> T:
+        loop = asyncio.get_running_loop()
+        expires = loop.time() + remaining
+        primary = asyncio.ensure_future(fn(remaining))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=min(self.hedge_delay(), remaining))
+            if not done:
+                may_hedge, hedge_ticket = self._hedge_ticket(priority, tokens)
+                if may_hedge:
+                    self._count('hedges_sent')
+                    hedge = asyncio.ensure_future(fn(max(0.0, expires - loop.time())))
+                    self._settle_when_done(hedge_ticket, hedge)
+                    tasks.add(hedge)
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, timeout=max(0.0, expires - loop.time()),
+                                                 return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise TimeoutError(f"{self.name} call exceeded its deadline")
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._count('hedges_won')
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @property
+    def metrics(self) -> Dict:
+        """Retry, hedge and breaker counters plus recent latency percentiles"""
+        with self._lock:
+            metrics = dict(self._counters)
+            latencies = sorted(self._latencies)
+        if latencies:
+            metrics['p50_ms'] = round(latencies[len(latencies) // 2] * 1000, 1)
+            metrics['p95_ms'] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1)
+        metrics['hedge_delay_ms'] = round(self.hedge_delay() * 1000, 1)
+        metrics['breaker_state'] = self.breaker.state
+        metrics['breaker_opened'] = self.breaker.times_opened
+        if self.scheduler is not None:
+            metrics['scheduler'] = self.scheduler.stats
+        return metrics
+
+
+# Shared by every bot in the process, so the breaker and the rate limits see all traffic to Gemini
+gemini_caller = ResilientCaller("gemini", scheduler=gemini_scheduler)
+
+_callers: Dict[str, ResilientCaller] = {"gemini": gemini_caller}
+
+
+def caller_for(backend_kind: str) -> ResilientCaller:
+    """
+    Process-wide caller for an llm_backends backend kind.
+
+    Only Gemini's has rate limits configured; the others (OpenAI, the
+    local stand-in) get deadlines, retries and a breaker, but no scheduler.
+    """
+    with _pool_lock:
+        if backend_kind not in _callers:
+            _callers[backend_kind] = ResilientCaller(backend_kind)
+        return _callers[backend_kind]
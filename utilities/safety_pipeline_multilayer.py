@@ -1,8 +1,21 @@
-from google.cloud import dlp_v2
-from presidio_analyzer import AnalyzerEngine
-from presidio_anonymizer import AnonymizerEngine
-import openai
-from typing import Dict, List, Tuple
+from typing import Dict, Tuple
+
+# Each layer's client is only needed when that layer is switched on
+try:
+    from google.cloud import dlp_v2
+except ImportError:
+    dlp_v2 = None
+
+try:
+    from presidio_analyzer import AnalyzerEngine
+    from presidio_anonymizer import AnonymizerEngine
+except ImportError:
+    AnalyzerEngine = AnonymizerEngine = None
+
+try:
+    import openai
+except ImportError:
+    openai = None
 
 class ProductionSafetyPipeline:
     """
@@ -16,13 +29,27 @@ class ProductionSafetyPipeline:
         openai_api_key: str,
         use_google_dlp: bool = True,
         use_presidio: bool = True,
-        use_openai_moderation: bool = True
+        use_openai_moderation: bool = True,
+        moderation_backend=None
     ):
+        """
+        moderation_backend (optional) is an llm_backends backend whose
+        moderate() replaces the OpenAI client - e.g. the local stand-in
+        server for load tests.
+        """
         # Initialize services
         self.use_google_dlp = use_google_dlp
         self.use_presidio = use_presidio
         self.use_openai_moderation = use_openai_moderation
         
+        if use_google_dlp and dlp_v2 is None:
+            raise ImportError("Google DLP needs google-cloud-dlp: pip install google-cloud-dlp")
+        if use_presidio and AnalyzerEngine is None:
+            raise ImportError("Presidio needs presidio-analyzer and presidio-anonymizer")
+        if use_openai_moderation and moderation_backend is None and openai is None:
+            raise ImportError("OpenAI moderation needs openai: pip install openai")
+        self.moderation_backend = moderation_backend
+        
         if use_google_dlp:
             self.dlp_client = dlp_v2.DlpServiceClient()
             self.gcp_parent = f"projects/{gcp_project_id}"
@@ -31,7 +58,7 @@ class ProductionSafetyPipeline:
             self.presidio_analyzer = AnalyzerEngine()
             self.presidio_anonymizer = AnonymizerEngine()
         
-        if use_openai_moderation:
+        if use_openai_moderation and moderation_backend is None:
             self.openai_client = openai.OpenAI(api_key=openai_api_key)
     
     def validate_input(
@@ -207,7 +234,22 @@ class ProductionSafetyPipeline:
         return anonymized.text
     
     def _moderate_content(self, text: str) -> Dict:
-        """Check for harmful content using OpenAI Moderation"""
+        """
+        Check for harmful content using OpenAI Moderation
+        
+        "categories" maps each category scoring above 0.5 to its score.
+        A moderation_backend that reports no scores (e.g. the local
+        stand-in server) gives the list of flagged category names instead.
+        """
+        
+        if self.moderation_backend is not None:
+            result = self.moderation_backend.moderate(text)
+            if result.scores is None:
+                return {"flagged": result.flagged, "categories": list(result.categories)}
+            return {
+                "flagged": result.flagged,
+                "categories": {cat: score for cat, score in result.scores.items() if score > 0.5}
+            }
         
         response = self.openai_client.moderations.create(input=text)
         result = response.results[0]
@@ -222,31 +264,32 @@ class ProductionSafetyPipeline:
         }
 
 # Usage Example
-pipeline = ProductionSafetyPipeline(
-    gcp_project_id="your-project",
-    openai_api_key="your-key",
-    use_google_dlp=True,
-    use_presidio=True,
-    use_openai_moderation=True
-)
+if __name__ == "__main__":
+    pipeline = ProductionSafetyPipeline(
+        gcp_project_id="your-project",
+        openai_api_key="your-key",
+        use_google_dlp=True,
+        use_presidio=True,
+        use_openai_moderation=True
+    )
 
-# Test with problematic input
-test_input = """
+    # Test with problematic input
+    test_input = """
 Hi, I'm John Smith. Email me at john@company.com or call 555-123-4567.
 My SSN is 123-45-6789. Also, I hate [harmful content here].
 """
 
-is_safe, processed_text, details = pipeline.validate_input(
-    test_input,
-    block_on_pii=True,
-    block_on_harmful=True
-)
+    is_safe, processed_text, details = pipeline.validate_input(
+        test_input,
+        block_on_pii=True,
+        block_on_harmful=True
+    )
 
-if not is_safe:
-    print("❌ Input blocked!")
-    print(f"  PII detected: {details['pii_detected']}")
-    print(f"  Harmful content: {details['harmful_content']}")
-    print(f"  Redacted text: {details['redacted_text']}")
-else:
-    print("✅ Input is safe")
-    # Proceed to LLM
\ No newline at end of file
+    if not is_safe:
+        print("❌ Input blocked!")
+        print(f"  PII detected: {details['pii_detected']}")
+        print(f"  Harmful content: {details['harmful_content']}")
+        print(f"  Redacted text: {details['redacted_text']}")
+    else:
+        print("✅ Input is safe")
+        # Proceed to LLM
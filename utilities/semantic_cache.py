@@ -0,0 +1,333 @@
+"""
+Semantic Response Cache
+Answer near-duplicate questions ("how to join WCC" / "how can I become a member of WCC?")
+from a local vector index - no embedding API, no network calls
+
+Requires NumPy (pip install numpy).
+
+Usage:
+    cache = SemanticCache(threshold=0.9)
+    hit = cache.lookup(question, scope=bot_settings)
+    if hit is None:
+        answer = call_model(question)
+        cache.add(question, answer, scope=bot_settings)
+
+    cache.save("semantic_cache")                               # writer process
+    shared = SemanticCache.load("semantic_cache")              # each worker: memory-mapped, read-only
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Words that carry no topic - "how do I join" and "how to join" should look alike.
+# Direction and negation words (to/from, in/out, for, not, ...) stay: "transfer
+# credits to WCC" and "transfer credits from WCC" are different questions.
+STOPWORDS = frozenset("""
+    a an the and or but if of as is are was were be been being
+    am do does did can could would should will shall may might must i me my we us our you your it its
+    this that these there here what which who whom how when where why please hi hello hey tell know
+    want wanted like get some any
+""".split())
+
+# Domain phrasings folded to one canonical word before vectorizing - hashing
+# cannot know that "become a member" means "join"; extend for your own FAQs
+SYNONYMS = [
+    # "How do I join" / "how to join": the "to" of "how to" is not a direction
+    (r"\bhow (?:do|can|could|should|would|will) (?:i|we|you)\b|\bhow to\b", "how"),
+    # "can't join" must not look like "can join" once "can" is dropped as a stopword
+    (r"n['\u2019]t\b|\bcannot\b", " not"),
+    (r"\bwomen coding community\b", "wcc"),
+    (r"\bbecome (?:an? )?(?:\w+ )?member\b|\b(?:sign(?:ing)? ?up|register)(?: for)?\b|\benrol+(?: in)?\b|\bmembership\b", "join"),
+    (r"\bmeetups?\b|\bsessions?\b|\bcoming up\b", "event"),
+    (r"\bhelp out\b|\bcontribute\b|\bget involved\b", "volunteer"),
+]
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Questions are stored verbatim and written to disk by save(), so ones that look
+# personal are never stored: emails, phone / ID / card numbers, self-introductions.
+# A coarse net, not a redactor - redact upstream where guardrails run (session 2).
+_PII = re.compile(
+    r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"
+    r"|\+?\d[\d\s().-]{7,}\d"
+    r"|\b(?:my name is|i am called|i'm called|call me)\b",
+    re.IGNORECASE
+)
+
+
+def contains_pii(text: str) -> bool:
+    """Whether text looks like it carries personal details (see _PII)"""
+    return _PII.search(text) is not None
+
+
+def _stem(word: str) -> str:
+    """Strip the commonest English suffixes (members/member, joining/join)"""
+    for suffix in ('ing', 'ers', 'ed', 'es', 's'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+class HashingVectorizer:
+    """
+    Bag-of-features text vectors via the hashing trick.
+
+    Known phrasings are first folded to canonical words (SYNONYMS). Features
+    are content words, adjacent word pairs and character
+    trigrams of each word (which tolerate typos and inflections), hashed
+    into `dim` signed buckets and L2-normalized, so the dot product of two
+    vectors is their cosine similarity. No vocabulary is fitted, so
+    vectors from different processes and index files are comparable.
+    """
+
+    def __init__(self, dim: int = 1024, synonyms: Optional[List[Tuple[str, str]]] = None):
+        self.dim = dim
+        self.synonyms = [(re.compile(pattern), canonical)
+                         for pattern, canonical in (SYNONYMS if synonyms is None else synonyms)]
+
+    def features(self, text: str) -> List[tuple]:
+        """(feature, weight) pairs for a text"""
+        text = text.lower()
+        for pattern, canonical in self.synonyms:
+            text = pattern.sub(canonical, text)
+        words = [_stem(word) for word in _WORD.findall(text) if len(word) > 1 and word not in STOPWORDS]
+        features = [(f"w:{word}", 1.0) for word in words]
+        features += [(f"b:{first} {second}", 0.7) for first, second in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            features += [(f"c:{padded[i:i + 3]}", 0.3) for i in range(len(padded) - 2)]
+        return features
+
+    def __call__(self, text: str) -> "np.ndarray":
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self.features(text):
+            digest = zlib.crc32(feature.encode('utf-8'))
+            # The top bit picks the sign so colliding features tend to cancel out
+            vector[digest % self.dim] += -weight if digest & 0x80000000 else weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SemanticHit(NamedTuple):
+    response: str
+    similarity: float
+    question: str
+
+
+def scope_id(scope: str) -> int:
+    """Compact id for a cache scope (the model settings an answer is only valid for)"""
+    return zlib.crc32(scope.encode('utf-8'))
+
+
+class SemanticCache:
+    """
+    Cosine-similarity cache of answers, keyed on question meaning.
+
+    Vectors live in one float32 matrix, so a lookup is a single
+    matrix-vector product over every entry. Entries are valid only
+    within their scope (e.g. pattern type + model + generation config),
+    and a hit needs a similarity of at least `threshold`; below it the
+    question counts as new. Expired entries are skipped and compacted
+    away on save or when the cache is full.
+
+    Saved caches are .npy arrays plus a JSON sidecar; load() memory-maps
+    the arrays read-only, so a worker starts without parsing them and
+    every worker on a host shares the same pages. The first add() to a
+    loaded cache copies the arrays into private memory.
+    """
+
+    FORMAT = 1
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        max_entries: int = 10000,
+        ttl_seconds: float = 24 * 3600,
+        vectorizer: Optional[Callable[[str], "np.ndarray"]] = None,
+        dim: int = 1024
+    ):
+        """
+        Args:
+            threshold: Lowest cosine similarity served as a hit (1.0 = identical wording once folded);
+                hashing features cannot tell every near-miss apart, so keep it high - test_semantic_cache.py
+                pins the paraphrases it must serve and the different questions it must not
+            max_entries: Entries kept; the oldest are dropped first
+            ttl_seconds: Default lifetime of an entry
+            vectorizer: text -> L2-normalized float32 vector of length dim
+                (default: HashingVectorizer); a local embedding model can be plugged in here
+            dim: Vector length
+        """
+        if np is None:
+            raise ImportError("SemanticCache requires NumPy (pip install numpy)")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.vectorizer = vectorizer or HashingVectorizer(dim)
+        self.dim = dim
+        self.hits = 0
+        self.misses = 0
+        self.read_only = False
+
+        self._lock = threading.Lock()
+        self._size = 0
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._scopes = np.zeros(0, dtype=np.uint32)
+        self._expires = np.zeros(0, dtype=np.float64)
+        self._questions: List[str] = []
+        self._responses: List[str] = []
+
+    def __len__(self) -> int:
+        return self._size
+
+    def nearest(self, question: str, scope: str = "") -> Optional[SemanticHit]:
+        """The most similar live entry in scope, whatever its similarity (useful for tuning threshold)"""
+        query = self.vectorizer(question)
+        with self._lock:
+            if not self._size:
+                return None
+            scores = self._vectors[:self._size] @ query
+            valid = (self._scopes[:self._size] == scope_id(scope)) & (self._expires[:self._size] >= time.time())
+            if not valid.any():
+                return None
+            best = int(np.argmax(np.where(valid, scores, -np.inf)))
+            return SemanticHit(self._responses[best], float(scores[best]), self._questions[best])
+
+    def lookup(self, question: str, scope: str = "") -> Optional[SemanticHit]:
+        """Return the most similar live answer in scope, or None when nothing reaches the threshold"""
+        hit = self.nearest(question, scope)
+        if hit is None or hit.similarity < self.threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return hit
+
+    def add(self, question: str, response: str, scope: str = "", ttl_seconds: Optional[float] = None) -> bool:
+        """
+        Store an answer (only store answers that passed your output checks).
+
+        Returns False, storing nothing, when the question looks personal (contains_pii).
+        """
+        if self.read_only:
+            raise PermissionError("This cache was loaded read-only; load it with read_only=False to add entries")
+        if contains_pii(question):
+            return False
+        vector = self.vectorizer(question)
+        expires = time.time() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            if self._size == self.max_entries:
+                self._compact(keep=self.max_entries - 1)
+            self._reserve(self._size + 1)
+            row = self._size
+            self._vectors[row] = vector
+            self._scopes[row] = scope_id(scope)
+            self._expires[row] = expires
+            self._questions.append(question)
+            self._responses.append(response)
+            self._size += 1
+        return True
+
+    def _reserve(self, size: int):
+        """Grow the arrays geometrically (and off any memory map); call with the lock held"""
+        if size <= len(self._vectors) and not isinstance(self._vectors, np.memmap):
+            return
+        capacity = max(size, min(self.max_entries, max(16, 2 * len(self._vectors))))
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        scopes = np.zeros(capacity, dtype=np.uint32)
+        expires = np.zeros(capacity, dtype=np.float64)
+        vectors[:self._size] = self._vectors[:self._size]
+        scopes[:self._size] = self._scopes[:self._size]
+        expires[:self._size] = self._expires[:self._size]
+        self._vectors, self._scopes, self._expires = vectors, scopes, expires
+
+    def _compact(self, keep: Optional[int] = None):
+        """Drop expired entries, then the oldest beyond `keep`; call with the lock held"""
+        live = np.flatnonzero(self._expires[:self._size] >= time.time())
+        if keep is not None and len(live) > keep:
+            live = live[len(live) - keep:]
+        self._vectors = np.array(self._vectors[live], dtype=np.float32)
+        self._scopes = np.array(self._scopes[live], dtype=np.uint32)
+        self._expires = np.array(self._expires[live], dtype=np.float64)
+        self._questions = [self._questions[i] for i in live]
+        self._responses = [self._responses[i] for i in live]
+        self._size = len(live)
+
+    def save(self, path):
+        """Write the live entries to a directory (each file replaced atomically)"""
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._compact()
+            arrays = {'vectors': self._vectors, 'scopes': self._scopes, 'expires': self._expires}
+            meta = {'format': self.FORMAT, 'dim': self.dim, 'size': self._size,
+                    'questions': self._questions, 'responses': self._responses}
+
+        # Sidecar last: readers key off it, and it names the row count the arrays must have
+        for name, array in arrays.items():
+            temporary = directory / f"{name}.{os.getpid()}.tmp.npy"
+            np.save(temporary, array)
+            os.replace(temporary, directory / f"{name}.npy")
+        temporary = directory / f"meta.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(temporary, directory / "meta.json")
+
+    @classmethod
+    def load(cls, path, read_only: bool = True, **kwargs) -> "SemanticCache":
+        """
+        Open a saved cache with its arrays memory-mapped.
+
+        kwargs are passed to the constructor (threshold, ttl_seconds, ...);
+        dim comes from the saved cache.
+        """
+        directory = Path(path)
+        with open(directory / "meta.json", encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format') != cls.FORMAT:
+            raise ValueError(f"Unsupported semantic cache format in {directory}: {meta.get('format')}")
+
+        cache = cls(dim=meta['dim'], **kwargs)
+        size = meta['size']
+        cache._vectors = np.load(directory / "vectors.npy", mmap_mode='r')
+        cache._scopes = np.load(directory / "scopes.npy", mmap_mode='r')
+        cache._expires = np.load(directory / "expires.npy", mmap_mode='r')
+        if len(cache._vectors) < size or cache._vectors.shape[1] != cache.dim:
+            raise ValueError(f"Semantic cache arrays in {directory} do not match meta.json")
+        cache._questions = meta['questions']
+        cache._responses = meta['responses']
+        cache._size = size
+        cache.read_only = read_only
+        return cache
+
+    @property
+    def stats(self) -> dict:
+        """Hit / miss counters"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': self._size
+        }
+
+
+if __name__ == "__main__":
+    cache = SemanticCache()
+    cache.add("How can I join WCC?", "Joining WCC is free - join our Slack community!")
+    cache.add("What events does WCC run?", "Workshops, mentorship sessions and meetups.")
+
+    for question in ["how to join wcc", "How can I become a member of WCC?", "How do I sign up for WCC?",
+                     "Which events are coming up?", "Can't I join WCC?", "What is the weather today?"]:
+        nearest = cache.nearest(question)
+        verdict = f"HIT: {nearest.response}" if nearest.similarity >= cache.threshold else "miss"
+        print(f"{question:32} nearest: {nearest.question!r} ({nearest.similarity:.2f}) -> {verdict}")
@@ -0,0 +1,128 @@
+"""
+Single-Flight Request Coalescing
+Concurrent identical requests share one upstream call and its result
+
+Usage:
+    from single_flight import shared_flight, shared_async_flight
+
+    text = shared_flight.do(key, lambda: model.generate_content(prompt).text)
+    text = await shared_async_flight.do(key, lambda: fetch_text_async(prompt))
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key (threaded code).
+
+    The first caller for a key runs fn; callers arriving while it runs
+    wait for it and get the same result - or the same exception. The key
+    is released as soon as the call finishes, so later requests start a
+    fresh call (caching finished results is the response cache's job).
+    Only share calls whose result does not depend on who asked, and
+    return immutable values (e.g. response text, not the response object).
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    @property
+    def stats(self) -> dict:
+        return {'upstream_calls': self.leaders, 'coalesced': self.shared, 'in_flight': len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """
+    Coalesce concurrent calls with the same key (asyncio code).
+
+    The shared call runs as its own task and every caller awaits it
+    through asyncio.shield, so a caller that is cancelled (client
+    disconnect, timeout) leaves the call running for the others. The
+    call is cancelled only when every caller has gone. In-flight calls
+    are tracked per event loop.
+    """
+
+    def __init__(self):
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, list]]" = \
+            weakref.WeakKeyDictionary()
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        calls = self._loops.setdefault(asyncio.get_running_loop(), {})
+        entry = calls.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(fn())
+            # [task, number of callers still waiting]
+            entry = calls[key] = [task, 0]
+            task.add_done_callback(lambda _: calls.pop(key, None) if calls.get(key) is entry else None)
+            self.leaders += 1
+        else:
+            self.shared += 1
+
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and entry[1] == 1:
+                # The last caller left - nobody wants the result any more
+                task.cancel()
+            raise
+        finally:
+            entry[1] -= 1
+
+    @property
+    def stats(self) -> dict:
+        in_flight = sum(len(calls) for calls in list(self._loops.values()))
+        return {'upstream_calls': self.leaders, 'coalesced': self.shared, 'in_flight': in_flight}
+
+
+# Shared by every bot in the process - keys must include everything that shapes the result
+shared_flight = SingleFlight()
+shared_async_flight = AsyncSingleFlight()
@@ -0,0 +1,72 @@
+"""
+Semantic cache hit / miss regression tests
+
+Run from this folder (needs NumPy):
+    python -m pytest test_semantic_cache.py
+    python test_semantic_cache.py
+"""
+
+from semantic_cache import SemanticCache
+
+# Same question, different wording - served from the cache
+PARAPHRASES = [
+    ("How can I join WCC?", "how to join wcc"),
+    ("How can I join WCC?", "How can I become a member of WCC?"),
+    ("How can I join WCC?", "How do I sign up for WCC?"),
+    ("How can I join WCC?", "How do I join Women Coding Community?"),
+    ("What events does WCC run?", "Which meetups does WCC run?"),
+    ("How do I volunteer at WCC?", "How can I help out at WCC?"),
+    ("How do I become a mentor?", "How can I become a mentor?"),
+]
+
+# Close wording, different question - must reach the model
+NEAR_MISSES = [
+    ("How do I transfer credits to WCC?", "How do I transfer credits from WCC?"),
+    ("What is tuition for in-district students?", "What is tuition for out-of-district students?"),
+    ("How do I apply for financial aid?", "What is the deadline to apply for financial aid?"),
+    ("Can I join WCC?", "Can't I join WCC?"),
+    ("How can I join WCC?", "How can I join a community college?"),
+    ("How can I join WCC?", "How can I leave WCC?"),
+    ("What events does WCC run?", "What events does WCC run in London?"),
+]
+
+
+def _cache_with(question):
+    cache = SemanticCache()
+    cache.add(question, f"answer to {question}")
+    return cache
+
+
+def test_paraphrases_hit():
+    for cached, asked in PARAPHRASES:
+        hit = _cache_with(cached).lookup(asked)
+        assert hit is not None and hit.question == cached, (cached, asked)
+
+
+def test_near_misses_miss():
+    for cached, asked in NEAR_MISSES:
+        cache = _cache_with(cached)
+        assert cache.lookup(asked) is None, (cached, asked, cache.nearest(asked).similarity)
+
+
+def test_scope_separates_answers():
+    cache = SemanticCache()
+    cache.add("How can I join WCC?", "answer", scope="gemini-pro")
+    assert cache.lookup("how to join wcc", scope="gemini-flash") is None
+    assert cache.lookup("how to join wcc", scope="gemini-pro") is not None
+
+
+def test_personal_questions_not_stored():
+    cache = SemanticCache()
+    for question in ["My email is jane@example.com, how do I join?", "Text me on 555-123-4567 about events",
+                     "My name is Priya - can I volunteer?"]:
+        assert cache.add(question, "answer") is False, question
+    assert len(cache) == 0
+    assert cache.add("How can I join WCC?", "answer") is True
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")